@@ -0,0 +1,155 @@
+"""
+Client-leg audio codecs
+
+The relay always talks PCM16 to adapters; these codecs only apply to the
+client <-> relay leg, where bandwidth is the dominant cost.
+
+- pcm_s16le: raw PCM16 (input) / WAV-wrapped PCM16 (output), as before
+- pcm_mulaw: G.711 mu-law, 8 bits per sample, pure NumPy table lookups
+- opus: optional, requires `opuslib` and the system libopus. Payloads carry
+  one or more 20 ms packets, each prefixed with a 2-byte big-endian length.
+"""
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+
+PCM16 = "pcm_s16le"
+MULAW = "pcm_mulaw"
+OPUS = "opus"
+
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+try:
+    import opuslib
+except Exception:  # Missing module or missing libopus shared library
+    opuslib = None
+
+
+class CodecError(ValueError):
+    """Undecodable client payload (corrupt packet, truncated length prefix)"""
+
+
+# --- G.711 mu-law tables ---
+
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 32635
+
+
+def _build_mulaw_tables():
+    # Encode table indexed by the uint16 view of every int16 value
+    values = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32)
+    sign = (values < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(values), _MULAW_CLIP) + _MULAW_BIAS
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    encode = (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exp = (codes >> 4) & 0x07
+    mant = codes & 0x0F
+    linear = (((mant << 3) + _MULAW_BIAS) << exp) - _MULAW_BIAS
+    decode = np.where(codes & 0x80, -linear, linear).astype(np.int16)
+    return encode, decode
+
+
+_MULAW_ENCODE, _MULAW_DECODE = _build_mulaw_tables()
+
+
+class AudioCodec:
+    """PCM16 passthrough; base class for the compressed codecs"""
+
+    name = PCM16
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def encode(self, samples: np.ndarray) -> bytes:
+        return np.asarray(samples, dtype="<i2").tobytes()
+
+    def decode(self, data: bytes) -> np.ndarray:
+        usable = len(data) - (len(data) % 2)
+        return np.frombuffer(data[:usable], dtype="<i2").astype(np.int16)
+
+
+class MuLawCodec(AudioCodec):
+    """G.711 mu-law: one table lookup per sample in each direction"""
+
+    name = MULAW
+
+    def encode(self, samples: np.ndarray) -> bytes:
+        return _MULAW_ENCODE[np.asarray(samples, dtype=np.int16).view(np.uint16)].tobytes()
+
+    def decode(self, data: bytes) -> np.ndarray:
+        return _MULAW_DECODE[np.frombuffer(data, dtype=np.uint8)]
+
+
+class OpusCodec(AudioCodec):
+    """Opus (VOIP profile) with 20 ms frames; partial frames are buffered until complete"""
+
+    name = OPUS
+
+    def __init__(self, sample_rate: int, bitrate: int = 24000):
+        if opuslib is None:
+            raise RuntimeError("Opus codec not available (install opuslib and libopus)")
+        if sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus does not support {sample_rate} Hz")
+        super().__init__(sample_rate)
+        self._frame = sample_rate // 50
+        self._encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self._encoder.bitrate = bitrate
+        self._decoder = opuslib.Decoder(sample_rate, 1)
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    def encode(self, samples: np.ndarray) -> bytes:
+        buf = np.concatenate((self._pending, np.asarray(samples, dtype=np.int16)))
+        whole = len(buf) - (len(buf) % self._frame)
+        packets: List[bytes] = []
+        for start in range(0, whole, self._frame):
+            frame = buf[start:start + self._frame].astype("<i2").tobytes()
+            packet = self._encoder.encode(frame, self._frame)
+            packets.append(struct.pack(">H", len(packet)) + packet)
+        self._pending = buf[whole:]
+        return b"".join(packets)
+
+    def decode(self, data: bytes) -> np.ndarray:
+        frames: List[np.ndarray] = []
+        offset = 0
+        while offset + 2 <= len(data):
+            (size,) = struct.unpack_from(">H", data, offset)
+            offset += 2
+            if offset + size > len(data):
+                raise CodecError(f"Truncated Opus packet ({len(data) - offset} of {size} bytes)")
+            packet = data[offset:offset + size]
+            offset += size
+            try:
+                pcm = self._decoder.decode(packet, self._frame)
+            except opuslib.OpusError as e:
+                raise CodecError(f"Corrupt Opus packet: {e}") from e
+            frames.append(np.frombuffer(pcm, dtype="<i2").astype(np.int16))
+        return np.concatenate(frames) if frames else np.zeros(0, dtype=np.int16)
+
+
+CODECS = {
+    PCM16: AudioCodec,
+    MULAW: MuLawCodec,
+    OPUS: OpusCodec,
+}
+
+
+def available_encodings(sample_rate: Optional[int] = None) -> List[str]:
+    """Client encodings this relay can negotiate (optionally for a given rate)"""
+    names = [PCM16, MULAW]
+    if opuslib is not None and (sample_rate is None or sample_rate in OPUS_SAMPLE_RATES):
+        names.append(OPUS)
+    return names
+
+
+def create_codec(name: str, sample_rate: int) -> Optional[AudioCodec]:
+    """Codec instance for a compressed encoding, or None for plain PCM16"""
+    if name == PCM16:
+        return None
+    if name not in available_encodings(sample_rate):
+        raise ValueError(f"Unsupported encoding: {name}")
+    return CODECS[name](sample_rate)
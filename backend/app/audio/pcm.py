@@ -0,0 +1,65 @@
+"""
+PCM helpers shared by the relay's audio stages.
+
+Client audio arrives as base64 PCM16 (little endian, mono); adapters emit
+base64 WAV (PCM16 mono with a RIFF header). These helpers convert between
+those wire formats and int16 NumPy arrays.
+"""
+import io
+import wave
+import base64
+from typing import Tuple
+
+import numpy as np
+
+
+def pcm16_from_base64(data_b64: str) -> np.ndarray:
+    """Decode base64 PCM16LE into an int16 array (odd trailing byte is dropped)"""
+    raw = base64.b64decode(data_b64)
+    usable = len(raw) - (len(raw) % 2)
+    return np.frombuffer(raw[:usable], dtype="<i2").astype(np.int16)
+
+
+def pcm16_to_base64(samples: np.ndarray) -> str:
+    """Encode an int16 array as base64 PCM16LE"""
+    return base64.b64encode(np.asarray(samples, dtype="<i2").tobytes()).decode("ascii")
+
+
+def wav_base64_to_pcm16(wav_b64: str, default_rate: int = 24000) -> Tuple[np.ndarray, int]:
+    """
+    Decode an adapter audio payload into (samples, sample_rate).
+    Payloads without a RIFF header are treated as raw PCM16 at default_rate.
+    """
+    raw = base64.b64decode(wav_b64)
+    if raw[:4] != b"RIFF":
+        usable = len(raw) - (len(raw) % 2)
+        return np.frombuffer(raw[:usable], dtype="<i2").astype(np.int16), default_rate
+
+    with wave.open(io.BytesIO(raw), "rb") as wf:
+        rate = wf.getframerate()
+        channels = wf.getnchannels()
+        frames = wf.readframes(wf.getnframes())
+
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.int16)
+    if channels > 1:
+        # Downmix to mono
+        usable = len(samples) - (len(samples) % channels)
+        samples = samples[:usable].reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+def pcm16_to_wav_base64(samples: np.ndarray, sample_rate: int) -> str:
+    """Wrap int16 mono samples in a WAV container and base64 encode it"""
+    with io.BytesIO() as wav_io:
+        with wave.open(wav_io, mode="wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+        wav_bytes = wav_io.getvalue()
+    return base64.b64encode(wav_bytes).decode("ascii")
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    """Round and clip float samples back into the int16 range"""
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
@@ -0,0 +1,127 @@
+"""
+Multi-resolution waveform peak index
+
+Built incrementally from the recorder's stereo frames and stored next to the
+recording as a compressed .npz. Each level holds, per channel, the absolute
+peak and the RMS of fixed-size blocks; every level is `factor` times coarser
+than the previous one, so the report page can fetch just the resolution it
+draws instead of the full audio.
+"""
+import wave
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class PeakIndexBuilder:
+    """Accumulates base-level peak/RMS blocks; coarser levels are derived on save"""
+
+    def __init__(self, sample_rate: int, channels: int = 2, block_size: int = 256,
+                 levels: int = 5, factor: int = 4):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.levels = levels
+        self.factor = factor
+        self._remainder = np.zeros((0, channels), dtype=np.int16)
+        self._peaks: List[np.ndarray] = []
+        self._rms: List[np.ndarray] = []
+
+    def add(self, frames: np.ndarray) -> None:
+        """Consume interleaved frames of shape (n, channels)"""
+        if len(frames) == 0:
+            return
+        buf = np.concatenate((self._remainder, frames)) if len(self._remainder) else frames
+        whole = len(buf) - (len(buf) % self.block_size)
+        if whole:
+            self._add_blocks(buf[:whole])
+        self._remainder = buf[whole:].copy()
+
+    def _add_blocks(self, frames: np.ndarray) -> None:
+        blocks = frames.reshape(-1, self.block_size, self.channels).astype(np.int32)
+        self._peaks.append(np.abs(blocks).max(axis=1).clip(0, 32767).astype(np.int16))
+        rms = np.sqrt((blocks.astype(np.float64) ** 2).mean(axis=1))
+        self._rms.append(rms.clip(0, 32767).astype(np.int16))
+
+    def build(self) -> Dict[str, np.ndarray]:
+        """Finish the trailing partial block and derive every zoom level"""
+        if len(self._remainder):
+            self._add_blocks(self._pad(self._remainder, self.block_size))
+            self._remainder = self._remainder[:0]
+
+        peaks = np.concatenate(self._peaks) if self._peaks else np.zeros((0, self.channels), np.int16)
+        rms = np.concatenate(self._rms) if self._rms else np.zeros((0, self.channels), np.int16)
+
+        arrays = {
+            "sample_rate": np.array(self.sample_rate),
+            "block_sizes": np.array([self.block_size * self.factor ** i for i in range(self.levels)]),
+        }
+        for level in range(self.levels):
+            arrays[f"peak_{level}"] = peaks
+            arrays[f"rms_{level}"] = rms
+            peaks, rms = self._downsample(peaks, rms)
+        return arrays
+
+    def save(self, path: str) -> None:
+        # Write through a file object so numpy does not append its own .npz suffix
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **self.build())
+
+    def _downsample(self, peaks: np.ndarray, rms: np.ndarray):
+        if len(peaks) == 0:
+            return peaks, rms
+        p = self._pad(peaks, self.factor).reshape(-1, self.factor, self.channels)
+        r = self._pad(rms, self.factor).astype(np.float64).reshape(-1, self.factor, self.channels)
+        return p.max(axis=1), np.sqrt((r ** 2).mean(axis=1)).astype(np.int16)
+
+    @staticmethod
+    def _pad(arr: np.ndarray, multiple: int) -> np.ndarray:
+        extra = (-len(arr)) % multiple
+        if not extra:
+            return arr
+        return np.concatenate((arr, np.zeros((extra,) + arr.shape[1:], dtype=arr.dtype)))
+
+
+def build_peak_index_from_wav(wav_path: str, index_path: str, chunk_frames: int = 65536) -> None:
+    """Backfill an index for an existing recording, reading it in bounded chunks"""
+    with wave.open(wav_path, "rb") as wf:
+        channels = wf.getnchannels()
+        builder = PeakIndexBuilder(wf.getframerate(), channels=channels)
+        while True:
+            raw = wf.readframes(chunk_frames)
+            if not raw:
+                break
+            builder.add(np.frombuffer(raw, dtype="<i2").reshape(-1, channels))
+    builder.save(index_path)
+
+
+def load_peak_level(index_path: str, max_points: Optional[int] = None) -> dict:
+    """
+    Pick the finest level with at most `max_points` blocks (coarsest if none fit)
+    and quantize it to int8 (0-127) per channel.
+    """
+    with np.load(index_path) as data:
+        block_sizes = [int(b) for b in data["block_sizes"]]
+        level = len(block_sizes) - 1
+        if max_points:
+            for i in range(len(block_sizes)):
+                if len(data[f"peak_{i}"]) <= max_points:
+                    level = i
+                    break
+        else:
+            level = 0
+        peaks = data[f"peak_{level}"]
+        rms = data[f"rms_{level}"]
+        sample_rate = int(data["sample_rate"])
+
+    def quantize(arr: np.ndarray) -> np.ndarray:
+        return (arr.astype(np.int32) * 127 // 32767).astype(np.int8)
+
+    return {
+        "sample_rate": sample_rate,
+        "samples_per_point": block_sizes[level],
+        "level": level,
+        "levels": block_sizes,
+        "peaks": [quantize(peaks[:, c]) for c in range(peaks.shape[1])],
+        "rms": [quantize(rms[:, c]) for c in range(rms.shape[1])],
+    }
@@ -0,0 +1,243 @@
+"""
+Stereo session recorder - time-aligned mixdown of user and model audio
+
+Left channel = user (microphone), right channel = model (adapter output).
+Both streams are placed on the relay's monotonic clock, resampled to a common
+output rate and written incrementally to a WAV file, so memory stays bounded
+by the alignment window rather than the session length. A waveform peak
+index is built alongside the WAV as frames are written. File writes are
+batched and run on a per-recorder writer thread, never on the event loop.
+
+Recordings live on local disk under `recordings_dir`. On Cloud Run that disk
+is per instance and lost on restart, so a recording is only reliably
+available until the instance is recycled; `recordings_retention_days` bounds
+how long they are kept everywhere else.
+"""
+import asyncio
+import os
+import re
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Optional
+
+import numpy as np
+
+from app.audio.peaks import PeakIndexBuilder
+from app.audio.resampler import StreamingResampler
+from app.config import settings
+
+
+RECORDING_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+WAV_SUFFIX = ".wav"
+PEAKS_SUFFIX = ".peaks.npz"
+
+
+def recording_path(user_id: str, recording_id: str, suffix: str = WAV_SUFFIX) -> str:
+    """Location of a user's recording on disk (recordings are namespaced per user)"""
+    if not RECORDING_ID_PATTERN.match(recording_id or ""):
+        raise ValueError(f"Invalid recording id: {recording_id!r}")
+    return os.path.join(settings.recordings_dir, user_id, f"{recording_id}{suffix}")
+
+
+class _Track:
+    """One channel of the mixdown: pending samples not yet written to disk"""
+
+    def __init__(self, out_rate: int):
+        self.out_rate = out_rate
+        self.pending: Deque[np.ndarray] = deque()
+        self.pending_len = 0
+        self.resamplers = {}
+
+    @property
+    def length(self) -> int:
+        return self.pending_len
+
+    def resample(self, samples: np.ndarray, rate: int) -> np.ndarray:
+        resampler = self.resamplers.get(rate)
+        if resampler is None:
+            resampler = StreamingResampler(rate, self.out_rate)
+            self.resamplers[rate] = resampler
+        return resampler.process(samples)
+
+    def append(self, samples: np.ndarray) -> None:
+        if len(samples):
+            self.pending.append(samples)
+            self.pending_len += len(samples)
+
+    def pad_to(self, length: int) -> None:
+        if length > self.pending_len:
+            self.append(np.zeros(length - self.pending_len, dtype=np.int16))
+
+    def take(self, count: int) -> np.ndarray:
+        """Remove and return the first `count` pending samples (only those are copied)"""
+        self.pad_to(count)
+        parts = []
+        needed = count
+        while needed:
+            chunk = self.pending[0]
+            if len(chunk) <= needed:
+                parts.append(self.pending.popleft())
+                needed -= len(chunk)
+            else:
+                parts.append(chunk[:needed])
+                self.pending[0] = chunk[needed:]
+                needed = 0
+        self.pending_len -= count
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+
+
+class StereoRecorder:
+    """
+    Incremental stereo mixdown of a voice session.
+
+    Chunks are positioned by their arrival time on `clock` (time.monotonic by
+    default). When a stream falls behind the clock by more than `gap_tolerance`
+    seconds, silence is inserted; bursts that arrive faster than real time
+    (typical for model audio) are appended back to back. Everything older than
+    `max_lag` seconds is flushed to disk, padding the quiet channel with silence.
+    Flushes are held back until `write_batch` seconds are ready and then handed
+    to the writer thread; `close` waits for it, so call it off the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: int = 24000,
+        max_lag: float = 2.0,
+        gap_tolerance: float = 0.25,
+        max_buffer_seconds: float = 60.0,
+        write_batch: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        peaks_path: Optional[str] = None,
+    ):
+        self.path = path
+        self.peaks_path = peaks_path
+        self.sample_rate = sample_rate
+        self._clock = clock
+        self._t0 = clock()
+        self._max_lag = int(max_lag * sample_rate)
+        self._gap_tolerance = int(gap_tolerance * sample_rate)
+        self._max_buffer = int(max_buffer_seconds * sample_rate)
+        self._write_batch = int(write_batch * sample_rate)
+
+        self._user = _Track(sample_rate)
+        self._model = _Track(sample_rate)
+        self._written = 0  # Frames already on disk
+        self._closed = False
+        self._peaks = PeakIndexBuilder(sample_rate, channels=2) if peaks_path else None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recorder")  # Keeps writes in order
+        self._error: Optional[Exception] = None
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._wav = wave.open(path, "wb")
+        self._wav.setnchannels(2)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio flushed so far (queued for, or already on, disk)"""
+        return self._written / self.sample_rate
+
+    def push_user(self, samples: np.ndarray, sample_rate: int, at: Optional[float] = None) -> None:
+        """Add microphone audio. `at` is the arrival time, i.e. the end of the captured chunk."""
+        at = self._clock() if at is None else at
+        start = at - len(samples) / sample_rate
+        self._push(self._user, samples, sample_rate, start)
+
+    def push_model(self, samples: np.ndarray, sample_rate: int, at: Optional[float] = None) -> None:
+        """Add model audio. `at` is the arrival time, treated as the start of playback."""
+        at = self._clock() if at is None else at
+        self._push(self._model, samples, sample_rate, at)
+
+    def _push(self, track: _Track, samples: np.ndarray, sample_rate: int, start: float) -> None:
+        if self._closed:
+            return
+
+        resampled = track.resample(samples, sample_rate)
+        expected = int((start - self._t0) * self.sample_rate) - self._written
+        if expected - track.length > self._gap_tolerance:
+            # Stream was idle: fill the gap with silence
+            track.pad_to(expected)
+        track.append(resampled)
+
+        self._drain()
+
+    def _drain(self) -> None:
+        now = int((self._clock() - self._t0) * self.sample_rate) - self._written
+        ready = min(self._user.length, self._model.length)
+        # Do not wait forever for a quiet channel
+        ready = max(ready, now - self._max_lag)
+        # Hard memory bound if one channel races far ahead of the other
+        ready = max(ready, max(self._user.length, self._model.length) - self._max_buffer)
+        if ready >= self._write_batch:
+            self._write(ready)
+
+    def _write(self, count: int) -> None:
+        frames = np.empty((count, 2), dtype="<i2")
+        frames[:, 0] = self._user.take(count)
+        frames[:, 1] = self._model.take(count)
+        self._written += count
+        self._io.submit(self._write_frames, frames)
+
+    def _write_frames(self, frames: np.ndarray) -> None:
+        # Writer thread. After a failure the rest of the session is dropped
+        if self._error:
+            return
+        try:
+            self._wav.writeframes(frames.tobytes())
+            if self._peaks:
+                self._peaks.add(frames)
+        except Exception as e:
+            self._error = e
+            print(f"Recorder write error ({self.path}): {e}")
+
+    def _finalize(self) -> None:
+        self._wav.close()
+        if self._peaks and not self._error:
+            self._peaks.save(self.peaks_path)
+
+    def close(self) -> None:
+        """Flush everything that is still pending, finalize the WAV header and wait for the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        remaining = max(self._user.length, self._model.length)
+        if remaining > 0:
+            self._write(remaining)
+        try:
+            self._io.submit(self._finalize).result()
+        finally:
+            self._io.shutdown()
+
+
+def sweep_recordings(root: str, max_age_days: float, now: Optional[float] = None) -> int:
+    """Delete recordings and peak indexes older than `max_age_days`; returns the number of files removed"""
+    cutoff = (time.time() if now is None else now) - max_age_days * 86400
+    removed = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith((WAV_SUFFIX, PEAKS_SUFFIX)):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass  # Removed concurrently or still being written
+    return removed
+
+
+async def run_recording_retention(interval: float = 3600.0) -> None:
+    """Background task: apply `recordings_retention_days` now and then every `interval` seconds"""
+    while True:
+        try:
+            removed = await asyncio.to_thread(sweep_recordings, settings.recordings_dir, settings.recordings_retention_days)
+            if removed:
+                print(f"Recording retention: removed {removed} files")
+        except Exception as e:
+            print(f"Recording retention error: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,100 @@
+"""
+Streaming polyphase resampler
+
+Converts PCM16 between arbitrary integer sample rates (e.g. 48 kHz browser
+capture -> 16 kHz Gemini input, 24 kHz model output -> 16 kHz client). The
+filter state is carried across chunks, so a stream can be fed in pieces of
+any size without clicks at chunk boundaries.
+"""
+from functools import lru_cache
+from math import gcd
+from typing import Tuple
+
+import numpy as np
+
+from app.audio.pcm import to_int16
+
+
+# Rates the relay accepts from clients; anything else falls back to the adapter default
+SUPPORTED_CLIENT_RATES: Tuple[int, ...] = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+
+@lru_cache(maxsize=32)
+def _design_bank(up: int, down: int, taps_per_phase: int, rolloff: float, beta: float) -> np.ndarray:
+    """
+    Windowed-sinc low-pass prototype split into `up` polyphase branches.
+    Returns an array of shape (up, taps_per_phase) where bank[p, j] = h[p + j * up].
+    """
+    length = taps_per_phase * up
+    # Cutoff in cycles/sample at the upsampled rate: half the narrower band
+    cutoff = 0.5 * rolloff / max(up, down)
+    n = np.arange(length) - (length - 1) / 2.0
+    h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(length, beta)
+    # Unity DC gain per output sample after zero-stuffing
+    h *= up / h.sum()
+    return h.reshape(taps_per_phase, up).T.astype(np.float32).copy()
+
+
+class StreamingResampler:
+    """
+    Stateful rational-ratio (up/down) polyphase resampler for mono int16 audio.
+
+    Each output sample k sits at position k * down on the upsampled grid; its
+    input index is (k * down) // up and its filter branch is (k * down) % up.
+    All outputs of a chunk are computed in one gather + multiply-accumulate.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 32,
+                 rolloff: float = 0.92, beta: float = 8.0):
+        if in_rate <= 0 or out_rate <= 0:
+            raise ValueError(f"Invalid resampling rates: {in_rate} -> {out_rate}")
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+
+        g = gcd(in_rate, out_rate)
+        self._up = out_rate // g
+        self._down = in_rate // g
+        self._taps = taps_per_phase
+        self._bank = _design_bank(self._up, self._down, taps_per_phase, rolloff, beta)
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._next = 0  # Upsampled-grid position of the next output, relative to the next chunk
+
+    @property
+    def passthrough(self) -> bool:
+        return self.in_rate == self.out_rate
+
+    def reset(self) -> None:
+        self._history[:] = 0
+        self._next = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample one chunk; returns int16 samples at out_rate"""
+        if self.passthrough:
+            return np.asarray(samples, dtype=np.int16)
+
+        n_in = len(samples)
+        if n_in == 0:
+            return np.zeros(0, dtype=np.int16)
+
+        span = n_in * self._up
+        count = -(-(span - self._next) // self._down) if span > self._next else 0
+
+        ext = np.concatenate((self._history, samples.astype(np.float32)))
+        if count:
+            positions = self._next + self._down * np.arange(count, dtype=np.int64)
+            phases = positions % self._up
+            # Index of input sample j taps back, in `ext` coordinates
+            base = positions // self._up + (self._taps - 1)
+            idx = base[:, None] - np.arange(self._taps)[None, :]
+            out = np.einsum("ij,ij->i", ext[idx], self._bank[phases])
+        else:
+            out = np.zeros(0, dtype=np.float32)
+
+        self._next += count * self._down - span
+        self._history = ext[-(self._taps - 1):].copy()
+        return to_int16(out)
+
+
+def resample_pcm16(samples: np.ndarray, in_rate: int, out_rate: int) -> np.ndarray:
+    """One-shot helper for whole buffers"""
+    return StreamingResampler(in_rate, out_rate).process(samples)
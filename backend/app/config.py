@@ -3,7 +3,7 @@ Application configuration using pydantic-settings
 """
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List
-from typing import List, Optional # Added Optional import
+from typing import Dict, List, Optional # Added Optional import
 import os
 
 
@@ -24,6 +24,83 @@ class Settings(BaseSettings):
     gcp_project_id: str = ""
     gcs_bucket_name: str = "voice-model-lab"
     
+    # Session Recordings
+    record_sessions: bool = True # Stereo mixdown (L=user, R=model) per session
+    recordings_dir: str = "./recordings"
+    recording_sample_rate: int = 24000
+    recordings_retention_days: float = 30 # Older recordings are deleted (0 keeps them forever); the Cloud Run disk is per instance and wiped on restart anyway
+    
+    # Blob Store (avatars)
+    blob_backend: str = "auto" # local, gcs (uses gcs_bucket_name) or auto: local only with a SQLite DB
+    blob_local_dir: str = "./blobs"
+    blob_gcs_prefix: str = "blobs/"
+    thumbnail_dir: str = "./thumbnails" # Resized avatar variants (needs Pillow)
+    thumbnail_cache_mb: int = 256 # LRU-evicted beyond this
+    
+    # Voice Previews
+    preview_cache_dir: str = "./previews"
+    preview_cache_mb: int = 128 # On disk, LRU-evicted beyond this
+    preview_memory_mb: int = 16 # Hot clips kept in process memory
+    preview_max_text_chars: int = 200 # Longer preview text is refused (every distinct text is a paid TTS call)
+    
+    # Relay
+    transcript_coalesce_ms: int = 50 # Merge transcription deltas per role (0 = send every delta)
+    transcript_persist_interval: float = 3.0 # Seconds between batched transcript inserts
+    ws_ingress_burst_seconds: float = 2.0 # Client audio accepted ahead of real time (e.g. after a network stall)
+    ws_ingress_catchup_factor: float = 2.0 # Max forwarding speed for that backlog, as a multiple of real time
+    ws_ingress_drop_limit_seconds: float = 30.0 # Close the socket once this much audio is dropped within the window below
+    ws_ingress_drop_window_seconds: float = 60.0
+    
+    # Database
+    db_compression: str = "zlib" # Large JSON/text columns: zlib, zstd (needs zstandard) or none
+    db_compression_threshold: int = 512 # Bytes; smaller values are stored uncompressed
+    cache_version_poll_seconds: float = 1.0 # How stale another worker's list cache may be after an edit
+    list_cache_mb: int = 64 # Cached list bodies per worker (per user), LRU-evicted beyond this
+    
+    # Auth
+    user_cache_ttl: float = 60.0 # Seconds a resolved user is reused for WS connects
+    user_cache_negative_ttl: float = 10.0 # Seconds an unknown username is remembered
+    user_cache_size: int = 1024
+    principal_cache_ttl: float = 30.0 # Seconds a REST token -> user resolution is reused
+    password_workers: int = 2 # bcrypt threads (each verify ~100-300 ms CPU)
+    password_queue_limit: int = 16 # Pending verifies beyond this get 503
+    login_attempts_per_ip_per_minute: float = 30
+    login_attempts_per_user_per_minute: float = 10
+    login_burst: int = 5 # Per username
+    trusted_proxy_hops: int = 1 # X-Forwarded-For entries added by trusted proxies: 1 = Cloud Run's front end. 2 (behind Firebase Hosting) only if direct run.app access is blocked, else clients can spoof their IP; 0 ignores the header
+    
+    # Outbound HTTP (provider REST calls, shared per-host clients)
+    http2_enabled: bool = True # Used only if the 'h2' package is installed
+    http_max_connections_per_host: int = 20
+    http_max_keepalive_per_host: int = 10
+    http_keepalive_expiry: float = 60.0
+    http_timeout: float = 30.0 # Default; endpoints pass their own where needed
+    http_connect_timeout: float = 5.0
+    
+    # Generation tools (scenario/image generate)
+    generation_cache_ttl: float = 0 # Seconds an identical request reuses a result (0 = only share in-flight calls)
+    generation_cache_size: int = 32 # Results held (images are ~1 MB each)
+    
+    # Background Jobs
+    job_workers: int = 8 # Jobs run concurrently per process (all providers)
+    job_provider_concurrency: Dict[str, int] = {"gemini": 4, "openai": 2}
+    job_default_provider_concurrency: int = 2
+    job_poll_seconds: float = 2.0 # Queue check interval (submits in this process wake it at once)
+    job_stale_seconds: float = 300 # A running job without heartbeat this long is requeued
+    job_max_attempts: int = 3
+    avatar_batch_concurrency: int = 3 # Image calls in flight per batch job
+    image_requests_per_minute: Dict[str, float] = {"imagen": 10, "gemini": 30} # Per process, all batches
+    
+    # Quotas (per user by role; per provider across users)
+    quota_backend: str = "memory" # memory (per process) or redis (shared, needs the 'redis' package)
+    redis_url: str = "redis://localhost:6379/0"
+    quota_lease_seconds: float = 60 # Redis slots expire this long after their instance stops renewing
+    quota_sessions_per_user: Dict[str, int] = {"admin": 5, "user": 2} # Concurrent realtime WS sessions
+    quota_tool_calls_per_minute: Dict[str, float] = {"admin": 60, "user": 20} # Generation requests and preview cache misses
+    quota_tool_burst: Dict[str, int] = {"admin": 10, "user": 5}
+    quota_tool_concurrency_per_user: Dict[str, int] = {"admin": 6, "user": 3} # Tool calls in flight
+    quota_provider_concurrency: Dict[str, int] = {} # Sessions + tool calls in flight per provider (gemini, openai, grok, tongyi, doubao, elevenlabs), e.g. {"gemini": 50}; unlisted = unlimited
+    
     # Server
     cors_origins: List[str] = [
         "http://localhost:3000",
@@ -0,0 +1,174 @@
+"""
+Content-addressed blob store for images (avatars)
+
+Blobs are keyed by the SHA-256 of their bytes plus a file extension, e.g.
+"3f5a...e1.png", so identical uploads are stored once and a key never
+changes meaning. Rows keep only the short URL returned by `blob_url`.
+
+The local backend is for single-machine development only: on Cloud Run the
+disk is per instance and wiped on restart, so a shared (non-SQLite) database
+defaults to GCS.
+"""
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+
+from app.config import settings
+from app.database import is_sqlite
+
+
+BLOB_KEY_PATTERN = re.compile(r"^([0-9a-f]{64})\.(png|jpg|jpeg|webp|gif)$")
+DATA_URI_PATTERN = re.compile(r"^data:(image/[a-z0-9.+-]+);base64,(.*)$", re.DOTALL)
+
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+
+def make_key(data: bytes, content_type: str) -> str:
+    ext = EXTENSIONS.get(content_type)
+    if not ext:
+        raise ValueError(f"Unsupported blob content type: {content_type}")
+    return f"{hashlib.sha256(data).hexdigest()}.{ext}"
+
+
+def content_type_for(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class BlobStore(ABC):
+    """Minimal put/get interface shared by the filesystem and GCS backends"""
+
+    def put(self, data: bytes, content_type: str) -> str:
+        key = make_key(data, content_type)
+        if not self.exists(key):
+            self._write(key, data, content_type)
+        return key
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def _write(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+
+class LocalBlobStore(BlobStore):
+    """Files under root/<first two hex chars>/<key>"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # Atomic: readers never see a partial blob
+
+
+class GCSBlobStore(BlobStore):
+    """Objects under gs://<bucket>/<prefix><key>"""
+
+    def __init__(self, bucket_name: str, prefix: str = "blobs/"):
+        from google.cloud import storage
+        self._bucket = storage.Client().bucket(bucket_name)
+        self._prefix = prefix
+
+    def exists(self, key: str) -> bool:
+        return self._bucket.blob(self._prefix + key).exists()
+
+    def get(self, key: str) -> Optional[bytes]:
+        from google.api_core.exceptions import NotFound
+        try:
+            return self._bucket.blob(self._prefix + key).download_as_bytes()
+        except NotFound:
+            return None
+
+    def _write(self, key: str, data: bytes, content_type: str) -> None:
+        blob = self._bucket.blob(self._prefix + key)
+        blob.cache_control = "public, max-age=31536000, immutable"
+        blob.upload_from_string(data, content_type=content_type)
+
+
+_store: Optional[BlobStore] = None
+
+
+def blob_backend() -> str:
+    if settings.blob_backend == "auto":
+        return "local" if is_sqlite else "gcs"
+    return settings.blob_backend
+
+
+def create_blob_store(backend: str) -> BlobStore:
+    if backend == "gcs":
+        return GCSBlobStore(settings.gcs_bucket_name, settings.blob_gcs_prefix)
+    if backend == "local":
+        return LocalBlobStore(settings.blob_local_dir)
+    raise ValueError(f"Unknown blob backend '{backend}' (local, gcs or auto)")
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        backend = blob_backend()
+        if backend == "local" and not is_sqlite:
+            print("Blob store: 'local' with a shared database; blobs are only on this instance's disk")
+        _store = create_blob_store(backend)
+    return _store
+
+
+def blob_url(key: str) -> str:
+    return f"/api/blobs/{key}"
+
+
+def parse_data_uri(value: str) -> Optional[Tuple[bytes, str]]:
+    """(bytes, content_type) for a base64 image data: URI, else None"""
+    match = DATA_URI_PATTERN.match(value or "")
+    if not match:
+        return None
+    try:
+        return base64.b64decode(match.group(2), validate=False), match.group(1)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def externalize_image(value: Optional[str]) -> Optional[str]:
+    """Move an inline data: URI into the blob store; other values pass through"""
+    if not value or not value.startswith("data:"):
+        return value
+    parsed = parse_data_uri(value)
+    if not parsed:
+        return value
+    data, content_type = parsed
+    if content_type not in EXTENSIONS:
+        return value
+    return blob_url(get_blob_store().put(data, content_type))
@@ -0,0 +1,93 @@
+"""
+Byte-bounded LRU file cache
+
+Files live flat under `root`; recency is the file mtime (touched on every
+hit), so the eviction order survives restarts. Writes are atomic renames, so
+concurrent writers of the same name are harmless (they write identical
+bytes for content-derived names). The index is loaded once per process, so
+a name missing from it is looked up on disk before reporting a miss: files
+written by other workers sharing `root` are adopted into the index.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class DiskLRU:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None  # name -> bytes, oldest first
+        self._total = 0
+
+    def _load_index(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        files = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if ".tmp-" in name or not os.path.isfile(path):
+                continue
+            st = os.stat(path)
+            files.append((st.st_mtime, name, st.st_size))
+        files.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in files)
+        self._total = sum(self._entries.values())
+
+    def get(self, name: str) -> Optional[bytes]:
+        path = os.path.join(self.root, name)
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+            if name not in self._entries:
+                # Possibly written by another worker since the index was loaded
+                if ".tmp-" in name or not os.path.isfile(path):
+                    return None
+                try:
+                    size = os.path.getsize(path)
+                except FileNotFoundError:
+                    return None
+                self._entries[name] = size
+                self._total += size
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+                self._entries.move_to_end(name)
+                return data
+            except FileNotFoundError:
+                # Removed behind our back (e.g. by another worker's eviction)
+                self._total -= self._entries.pop(name)
+                return None
+
+    def put(self, name: str, data: bytes) -> None:
+        path = os.path.join(self.root, name)
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if name in self._entries:
+                self._total -= self._entries.pop(name)
+            self._entries[name] = len(data)
+            self._total += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
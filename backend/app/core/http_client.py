@@ -0,0 +1,91 @@
+"""
+Shared outbound HTTP clients for provider REST calls
+
+One `httpx.AsyncClient` per upstream host, created on first use and closed
+on app shutdown, so TLS sessions and keep-alive connections are reused
+across requests instead of a fresh handshake per call. A client per host
+gives each provider its own connection limit. HTTP/2 is used when `h2` is
+installed (Google endpoints multiplex over one connection then).
+
+Reuse is measured with httpcore's trace hook: every request is counted, and
+so is every new TCP connection / TLS handshake, exposed via `stats()`.
+"""
+from typing import Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class _HostStats:
+    __slots__ = ("requests", "connections", "tls_handshakes")
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+
+class HttpClientPool:
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, _HostStats] = {}
+
+    def client(self, url_or_host: str) -> httpx.AsyncClient:
+        """Shared client for the host of `url_or_host` (do not close it)"""
+        host = urlsplit(url_or_host).hostname if "://" in url_or_host else url_or_host
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = self._create(host)
+            self._clients[host] = client
+        return client
+
+    def _create(self, host: str) -> httpx.AsyncClient:
+        stats = self._stats.setdefault(host, _HostStats())
+
+        async def trace(event: str, info: dict):
+            if event == "connection.connect_tcp.complete":
+                stats.connections += 1
+            elif event == "connection.start_tls.complete":
+                stats.tls_handshakes += 1
+
+        async def on_request(request: httpx.Request):
+            stats.requests += 1
+            request.extensions["trace"] = trace
+
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE and settings.http2_enabled,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections_per_host,
+                max_keepalive_connections=settings.http_max_keepalive_per_host,
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout),
+            event_hooks={"request": [on_request]},
+        )
+
+    def stats(self) -> dict:
+        hosts = {}
+        for host, s in self._stats.items():
+            hosts[host] = {
+                "requests": s.requests,
+                "connections": s.connections,
+                "tlsHandshakes": s.tls_handshakes,
+                "reuseRatio": round(1 - s.connections / s.requests, 3) if s.requests else None,
+            }
+        return {"http2": HTTP2_AVAILABLE and settings.http2_enabled, "hosts": hosts}
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+http_pool = HttpClientPool()
@@ -0,0 +1,355 @@
+"""
+Background jobs for slow provider calls
+
+Image and scenario generation take 30-60 s. Instead of holding the HTTP
+request open, clients submit a job, get its id back at once, and poll it
+(or listen on /ws/jobs). Jobs are rows in the `jobs` table, so any worker
+process can answer a poll; each process runs a dispatcher that claims queued
+rows with a conditional UPDATE (exactly one process wins a row) and runs
+them as asyncio tasks, at most `job_workers` at a time and at most
+`job_provider_concurrency[provider]` per provider.
+
+Running jobs heartbeat `updated_at`. A job whose process died stops
+heartbeating and is requeued after `job_stale_seconds`, up to
+`job_max_attempts` claims. On shutdown, jobs still running here are put
+back in the queue. Cancelling a job marks the row; the process running it
+notices on its next heartbeat (at once if it is this process) and cancels
+the task, which aborts the provider call.
+
+A job runs holding the same per-user and per-provider in-flight slots as
+an interactive tool call (`quotas.acquire_tool_slot`), so queued work and
+interactive calls share one provider budget. A job refused a slot is put
+back in the queue without using up an attempt and retried on a later poll.
+
+Jobs run after the submitting request has returned, so the host must keep
+CPU allocated between requests and keep an instance up: on Cloud Run,
+`--no-cpu-throttling --min-instances 1` (set by deploy.ps1).
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Type
+
+from pydantic import BaseModel
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.core.quotas import QuotaExceeded, quotas
+from app.database import AsyncSessionLocal
+from app.models import Job, User
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+LOST_ERROR = "Worker lost too many times"
+
+
+class JobError(Exception):
+    """Expected failure of a job; the message is shown to the client as is"""
+
+
+class JobContext:
+    """What a handler gets: the job's identity and params, plus progress reporting"""
+
+    def __init__(self, job_id: str, user_id: str, params: dict):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.params = params
+
+    async def load_user(self) -> User:
+        async with AsyncSessionLocal() as db:
+            user = await db.get(User, self.user_id)
+        if user is None:
+            raise JobError("User not found")  # Deleted after submitting
+        return user
+
+    async def progress(self, **progress: Any) -> None:
+        """Store e.g. progress(done=3, total=10); also counts as a heartbeat"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job).where(Job.id == self.job_id, Job.status == RUNNING)
+                .values(progress=progress, updated_at=datetime.utcnow())
+            )
+            await db.commit()
+        await job_queue.notify(self.user_id, {"id": self.job_id, "status": RUNNING, "progress": progress})
+
+
+Handler = Callable[[JobContext], Awaitable[dict]]
+
+
+class JobQueue:
+    def __init__(self, workers: int, provider_limits: Dict[str, int], default_limit: int,
+                 poll_seconds: float, stale_seconds: float, max_attempts: int):
+        self.workers = workers
+        self.provider_limits = provider_limits
+        self.default_limit = default_limit
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self._handlers: Dict[str, tuple] = {}  # kind -> (handler, provider, params model)
+        self._tasks: Dict[str, asyncio.Task] = {}  # job id -> task, jobs running in this process
+        self._providers: Dict[str, str] = {}  # job id -> provider
+        self._running = Counter()  # provider -> jobs running here
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}  # user id -> WS queues
+        self._wake: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.completed = Counter()  # status -> jobs finished here
+        self.deferred = 0  # Claims put back in the queue for lack of a quota slot
+
+    def register(self, kind: str, handler: Handler, provider: str,
+                 params_model: Optional[Type[BaseModel]] = None) -> None:
+        """`params_model` validates (and normalizes) params at submit time"""
+        self._handlers[kind] = (handler, provider, params_model)
+
+    def limit(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.default_limit)
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        if self._dispatcher is None:
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self) -> None:
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        self._dispatcher = None
+        job_ids = list(self._tasks)
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        if job_ids:
+            # Hand interrupted jobs to another process (or to this one after a restart)
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Job).where(Job.id.in_(job_ids), Job.status == RUNNING)
+                    .values(status=QUEUED, updated_at=datetime.utcnow())
+                )
+                await db.commit()
+
+    # --- Client side ---
+
+    async def submit(self, user_id: str, kind: str, params: dict) -> Job:
+        """Queue a job; raises KeyError for an unknown kind, ValidationError for bad params"""
+        _, provider, params_model = self._handlers[kind]
+        if params_model is not None:
+            params = params_model.model_validate(params).model_dump()
+        async with AsyncSessionLocal() as db:
+            job = Job(user_id=user_id, kind=kind, provider=provider, status=QUEUED, params=params)
+            db.add(job)
+            await db.commit()
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def get(self, job_id: str, user_id: str) -> Optional[Job]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Job).where(Job.id == job_id, Job.user_id == user_id))
+            return result.scalar_one_or_none()
+
+    async def cancel(self, job_id: str, user_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; returns the job (unchanged if it had already finished)"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job).where(Job.id == job_id, Job.user_id == user_id, Job.status.in_((QUEUED, RUNNING)))
+                .values(status=CANCELLED, finished_at=datetime.utcnow())
+            )
+            await db.commit()
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        job = await self.get(job_id, user_id)
+        if job is not None and job.status == CANCELLED:
+            await self.notify(user_id, {"id": job_id, "status": CANCELLED})
+        return job
+
+    # --- Push (WS listeners in this process) ---
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=100)
+        self._listeners.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._listeners.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._listeners[user_id]
+
+    async def notify(self, user_id: str, event: dict) -> None:
+        for queue in self._listeners.get(user_id, ()):
+            if not queue.full():
+                queue.put_nowait(event)
+
+    # --- Worker side ---
+
+    async def _dispatch_loop(self) -> None:
+        last_maintenance = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_maintenance >= self.stale_seconds / 5:
+                    last_maintenance = time.monotonic()
+                    await self._heartbeat()
+                    await self._requeue_stale()
+                await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job Dispatcher Error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _claim(self) -> None:
+        free = self.workers - len(self._tasks)
+        if free <= 0:
+            return
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Job.id, Job.provider).where(Job.status == QUEUED)
+                .order_by(Job.created_at).limit(free * 4)
+            )).all()
+
+            for job_id, provider in rows:
+                if free <= 0:
+                    break
+                if self._running[provider] >= self.limit(provider):
+                    continue
+                claimed = await db.execute(
+                    update(Job).where(Job.id == job_id, Job.status == QUEUED)
+                    .values(status=RUNNING, started_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+                            attempts=Job.attempts + 1)
+                )
+                await db.commit()
+                if claimed.rowcount != 1:
+                    continue  # Another process got it
+                free -= 1
+                self._running[provider] += 1
+                self._providers[job_id] = provider
+                self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _run(self, job_id: str) -> None:
+        status, result, error = FAILED, None, None
+        user_id = None
+        lease = None
+        deferred = False
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await db.get(Job, job_id)
+                user_id, kind, params = job.user_id, job.kind, job.params or {}
+                user = await db.get(User, user_id)
+            if user is None:
+                raise JobError("User not found")
+            handler = self._handlers[kind][0]
+            try:
+                lease = await quotas.acquire_tool_slot(user, self._providers[job_id])
+            except QuotaExceeded:
+                deferred = True
+                return
+            result = await handler(JobContext(job_id, user_id, params))
+            status = SUCCEEDED
+        except asyncio.CancelledError:
+            status = CANCELLED
+        except JobError as e:
+            error = str(e)
+        except Exception as e:
+            print(f"Job {job_id} Exception: {e}")
+            error = getattr(e, "detail", None) or str(e) or type(e).__name__
+        finally:
+            if lease is not None:
+                await lease.release()
+            self._tasks.pop(job_id, None)
+            self._running[self._providers.pop(job_id)] -= 1
+            if self._wake is not None and not deferred:
+                self._wake.set()  # A slot is free
+            if deferred:
+                await self._defer(job_id)
+
+        if status == CANCELLED and self._dispatcher is None:
+            return  # Shutting down; stop() requeues it
+        async with AsyncSessionLocal() as db:
+            # Only a running row is finalized: a cancel that raced the result wins
+            await db.execute(
+                update(Job).where(Job.id == job_id, Job.status == RUNNING)
+                .values(status=status, result=result, error=error, finished_at=datetime.utcnow())
+            )
+            await db.commit()
+        self.completed[status] += 1
+        if user_id is not None:
+            await self.notify(user_id, {"id": job_id, "status": status})
+
+    async def _defer(self, job_id: str) -> None:
+        """Back to the queue (over quota); the claim does not count as an attempt"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job).where(Job.id == job_id, Job.status == RUNNING)
+                .values(status=QUEUED, started_at=None, updated_at=datetime.utcnow(),
+                        attempts=Job.attempts - 1)
+            )
+            await db.commit()
+        self.deferred += 1
+
+    async def _heartbeat(self) -> None:
+        if not self._tasks:
+            return
+        async with AsyncSessionLocal() as db:
+            for job_id in list(self._tasks):
+                touched = await db.execute(
+                    update(Job).where(Job.id == job_id, Job.status == RUNNING)
+                    .values(updated_at=datetime.utcnow())
+                )
+                if touched.rowcount != 1:
+                    # Cancelled through another process
+                    task = self._tasks.get(job_id)
+                    if task is not None:
+                        task.cancel()
+            await db.commit()
+
+    async def _requeue_stale(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        async with AsyncSessionLocal() as db:
+            stale = (Job.status == RUNNING, Job.updated_at < cutoff)
+            exhausted = (await db.execute(
+                select(Job.id, Job.user_id).where(*stale, Job.attempts >= self.max_attempts)
+            )).all()
+            failed = []
+            for job_id, user_id in exhausted:
+                result = await db.execute(
+                    update(Job).where(Job.id == job_id, *stale)
+                    .values(status=FAILED, error=LOST_ERROR, finished_at=datetime.utcnow())
+                )
+                if result.rowcount == 1:
+                    failed.append((job_id, user_id))
+            await db.execute(update(Job).where(*stale).values(status=QUEUED))
+            await db.commit()
+        for job_id, user_id in failed:
+            await self.notify(user_id, {"id": job_id, "status": FAILED, "error": LOST_ERROR})
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._tasks),
+            "runningByProvider": {p: n for p, n in self._running.items() if n},
+            "completed": dict(self.completed),
+            "deferred": self.deferred,
+            "listeners": sum(len(q) for q in self._listeners.values()),
+        }
+
+
+job_queue = JobQueue(
+    workers=settings.job_workers,
+    provider_limits=settings.job_provider_concurrency,
+    default_limit=settings.job_default_provider_concurrency,
+    poll_seconds=settings.job_poll_seconds,
+    stale_seconds=settings.job_stale_seconds,
+    max_attempts=settings.job_max_attempts,
+)
@@ -0,0 +1,159 @@
+"""
+Versioned in-process cache for read-mostly list endpoints
+
+Each cached table has a row in `cache_versions`. Write handlers call
+`bump_version` inside their transaction; readers compare the version they
+cached under with the current one, polled at most every
+`cache_version_poll_seconds` per worker, so an edit on one worker is seen by
+all others within that window. Cached bodies are the serialized JSON plus a
+strong ETag, so hits skip both the DB and serialization, and clients holding
+the ETag get a 304. Bodies are per user, so the cache is an LRU bounded by
+`list_cache_mb`.
+
+The `cache_versions` rows are created at startup (`seed_versions`): if the
+first bump inserted them, two concurrent first writes would both insert and
+one of the user's writes would fail on the primary key.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import CacheVersion
+
+# Tables whose list responses are cached (each has a cache_versions row)
+CACHED_TABLES = ("scenarios", "roles")
+
+
+class CachedBody:
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+class VersionedListCache:
+    def __init__(self, poll_seconds: float, max_bytes: int):
+        self.poll_seconds = poll_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._versions: Dict[str, Tuple[int, float]] = {}  # table -> (version, checked_at)
+        self._entries: "OrderedDict[Tuple[str, Hashable], CachedBody]" = OrderedDict()  # LRU order
+        self._total = 0  # Bytes of cached bodies
+        self.hits = 0
+        self.misses = 0
+
+    async def version(self, db: AsyncSession, table: str) -> int:
+        now = time.monotonic()
+        with self._lock:
+            known = self._versions.get(table)
+        if known and now - known[1] < self.poll_seconds:
+            return known[0]
+
+        result = await db.execute(select(CacheVersion.version).where(CacheVersion.name == table))
+        version = result.scalar() or 0
+        with self._lock:
+            self._versions[table] = (version, now)
+        return version
+
+    async def get_or_build(self, db: AsyncSession, table: str, scope: Hashable,
+                           build: Callable[[], Awaitable[bytes]]) -> CachedBody:
+        version = await self.version(db, table)
+        key = (table, scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = CachedBody(version, await build())
+        with self._lock:
+            # Drop every scope cached under an older version of this table
+            for k in [k for k, e in self._entries.items() if k[0] == table and e.version != version]:
+                self._total -= len(self._entries.pop(k).body)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= len(old.body)
+            if len(entry.body) <= self.max_bytes:
+                self._entries[key] = entry
+                self._total += len(entry.body)
+                while self._total > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total -= len(evicted.body)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def forget(self, table: str) -> None:
+        """Force the next read on this worker to re-check the DB version"""
+        with self._lock:
+            self._versions.pop(table, None)
+
+
+list_cache = VersionedListCache(settings.cache_version_poll_seconds, settings.list_cache_mb * 1024 * 1024)
+
+
+def seed_versions(engine) -> None:
+    """Create the cache_versions rows once, outside any user transaction"""
+    with engine.connect() as conn:
+        existing = set(conn.execute(select(CacheVersion.name)).scalars())
+        for table in CACHED_TABLES:
+            if table in existing:
+                continue
+            try:
+                conn.execute(insert(CacheVersion).values(name=table, version=0))
+                conn.commit()
+            except IntegrityError:
+                conn.rollback()  # Another worker seeded it first
+
+
+def bump_version(db: Session, table: str) -> None:
+    """Increment a table's version in the caller's transaction (commit follows)"""
+    updated = db.query(CacheVersion).filter(CacheVersion.name == table).update(
+        {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        # Only for a table missing from CACHED_TABLES (seeded rows always update)
+        db.add(CacheVersion(name=table, version=1))
+    db.info.setdefault("bumped_tables", set()).add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_bumped_tables(session):
+    # After commit, so a concurrent reader cannot re-cache the old version as fresh
+    for table in session.info.pop("bumped_tables", ()):
+        list_cache.forget(table)
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match lists `etag` (weak comparison) or is '*'"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cached_json_response(request: Request, entry: CachedBody) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if not_modified(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
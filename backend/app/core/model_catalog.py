@@ -0,0 +1,118 @@
+"""
+Static catalog of realtime model capabilities
+
+Adapter capabilities (names, audio formats, voice lists) only change with a
+deploy, so they are read once at startup instead of instantiating an
+adapter per request. What does vary is whether a model is usable for a
+given user: a server key or the user's own key for its provider. Key
+presence is a bitmap with one bit per model (server keys are fixed at
+startup; the user's bits come from their settings), and the /api/models
+body is built and ETagged once per distinct bitmap, so a request is a
+handful of dict lookups and most polls end in a 304.
+"""
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.list_cache import CachedBody
+from app.registry import ADAPTERS
+
+# Model id prefix -> (user settings field holding a BYOK key, server key configured?)
+PROVIDER_KEYS: List[Tuple[str, str, Callable[[], bool]]] = [
+    ("gemini", "customApiKey", lambda: bool(settings.gemini_api_key)),
+    ("openai", "customOpenaiKey", lambda: bool(settings.openai_api_key)),
+    ("grok", "customXaiKey", lambda: bool(settings.xai_api_key)),
+    ("tongyi", "customQwenKey", lambda: bool(settings.dashscope_api_key or os.getenv("DASHSCOPE_API_KEY"))),
+    ("doubao", "customDoubaoKey", lambda: bool(settings.volc_app_id and settings.volc_access_key)),
+    ("elevenlabs", "customElevenLabsKey", lambda: bool(settings.elevenlabs_api_key and settings.elevenlabs_agent_id)),
+]
+
+
+def provider_for(model_id: str) -> str:
+    """Quota/provider key for a model ('gemini', 'openai', ...), shared with tool calls"""
+    for prefix, _, _ in PROVIDER_KEYS:
+        if model_id.startswith(prefix):
+            return prefix
+    return model_id
+
+
+def provider_keys(model_id: str) -> Optional[Tuple[str, Callable[[], bool]]]:
+    for prefix, user_field, has_server_key in PROVIDER_KEYS:
+        if model_id.startswith(prefix):
+            return user_field, has_server_key
+    return None
+
+
+class ModelCatalog:
+    def __init__(self, adapters: dict):
+        self.ids: List[str] = []
+        self.summaries: List[dict] = []
+        self.details: Dict[str, dict] = {}
+        self.voices: Dict[str, List[dict]] = {}
+        self._user_fields: List[Tuple[int, str]] = []  # (bit, settings field) for models a user key enables
+        self.always_enabled = 0  # Bits of models usable without a user key
+        self._lists: Dict[int, CachedBody] = {}  # enabled bitmap -> /api/models body
+
+        for bit, (model_id, adapter_cls) in enumerate(adapters.items()):
+            cap = adapter_cls().capabilities
+            self.ids.append(model_id)
+            self.summaries.append({
+                "id": cap.id,
+                "name": cap.name,
+                "provider": cap.provider,
+                "defaultVoice": cap.default_voice,
+                "supportsTranscription": cap.supports_transcription,
+            })
+            self.details[model_id] = {
+                "id": cap.id,
+                "name": cap.name,
+                "provider": cap.provider,
+                "isEnabled": cap.is_enabled,
+                "supportedSampleRates": cap.supported_sample_rates,
+                "supportedEncodings": cap.supported_encodings,
+                "defaultSampleRate": cap.default_sample_rate,
+                "defaultEncoding": cap.default_encoding,
+                "availableVoices": cap.available_voices,
+                "defaultVoice": cap.default_voice,
+                "supportsTranscription": cap.supports_transcription,
+                "supportsInterruption": cap.supports_interruption,
+                "maxSessionDuration": cap.max_session_duration,
+            }
+            self.voices[model_id] = cap.available_voices
+
+            keys = provider_keys(model_id)
+            if keys is None:
+                # Unknown provider: the adapter's own flag decides
+                if cap.is_enabled:
+                    self.always_enabled |= 1 << bit
+                continue
+            user_field, has_server_key = keys
+            if has_server_key():
+                self.always_enabled |= 1 << bit
+            else:
+                self._user_fields.append((bit, user_field))
+
+    def enabled_bits(self, user_settings: Optional[dict]) -> int:
+        bits = self.always_enabled
+        if user_settings:
+            for bit, user_field in self._user_fields:
+                if user_settings.get(user_field):
+                    bits |= 1 << bit
+        return bits
+
+    def list_body(self, user_settings: Optional[dict]) -> CachedBody:
+        """The /api/models body for this user; at most one build per distinct bitmap"""
+        bits = self.enabled_bits(user_settings)
+        entry = self._lists.get(bits)
+        if entry is None:
+            models = [
+                {**summary, "isEnabled": bool(bits >> bit & 1)}
+                for bit, summary in enumerate(self.summaries)
+            ]
+            # Version is unused: the catalog never changes while the process runs
+            entry = self._lists[bits] = CachedBody(0, json.dumps(models).encode("utf-8"))
+        return entry
+
+
+model_catalog = ModelCatalog(ADAPTERS)
@@ -0,0 +1,60 @@
+"""
+Password hashing off the event loop
+
+bcrypt costs ~100-300 ms of CPU per call. Running it inline in an async
+handler freezes every WS relay in the process, so verification goes through
+a small thread pool (bcrypt releases the GIL while hashing). The pool has a
+pending-work limit: beyond it callers get `PasswordPoolBusy` immediately
+instead of queueing behind a login storm. `LoginThrottle` adds per-IP and
+per-username token buckets in front of it.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.core.rate_limit import TokenBucket
+from app.core.security import get_password_hash, verify_password
+
+
+class PasswordPoolBusy(Exception):
+    """Too many hash/verify calls already pending"""
+
+
+class PasswordPool:
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LoginThrottle(TokenBucket):
+    """Login attempts per key (IP or username): `per_minute` attempts, bursting to `burst`"""
+
+
+password_pool = PasswordPool(settings.password_workers, settings.password_queue_limit)
+# Whole offices can share an IP (NAT): allow a full minute's attempts as burst
+ip_throttle = LoginThrottle(settings.login_attempts_per_ip_per_minute,
+                           burst=int(settings.login_attempts_per_ip_per_minute))
+user_throttle = LoginThrottle(settings.login_attempts_per_user_per_minute, burst=settings.login_burst)
@@ -0,0 +1,91 @@
+"""
+Voice preview audio, cached by (TTS model, voice, text)
+
+A preview for a given voice and text never changes, so clips are
+content-addressed: the key is a SHA-256 of the three inputs and doubles as
+the HTTP ETag. A small in-memory LRU (bounded in bytes) fronts a DiskLRU so
+repeat clicks on the same voice are served without touching the provider or
+the disk; the disk tier survives restarts and is shared by workers.
+Concurrent misses for the same clip share one synthesis (`preview_flight`).
+"""
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import settings
+from app.core.disk_cache import DiskLRU
+from app.core.single_flight import SingleFlight
+
+PREVIEW_MEDIA_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+}
+
+
+def preview_key(model: str, voice: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+class PreviewCache:
+    def __init__(self, root: str, disk_bytes: int, memory_bytes: int):
+        self.memory_bytes = memory_bytes
+        self._files = DiskLRU(root, disk_bytes)
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()  # "<key>.<ext>" -> audio
+        self._memory_total = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, name: str, data: bytes) -> None:
+        with self._lock:
+            if name in self._memory:
+                self._memory_total -= len(self._memory.pop(name))
+            if len(data) > self.memory_bytes:
+                return
+            self._memory[name] = data
+            self._memory_total += len(data)
+            while self._memory_total > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_total -= len(evicted)
+
+    async def get(self, key: str, ext: str) -> Optional[bytes]:
+        name = f"{key}.{ext}"
+        with self._lock:
+            data = self._memory.get(name)
+            if data is not None:
+                self._memory.move_to_end(name)
+                self.memory_hits += 1
+                return data
+
+        data = await asyncio.to_thread(self._files.get, name)
+        if data is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(name, data)
+        return data
+
+    async def put(self, key: str, ext: str, data: bytes) -> None:
+        name = f"{key}.{ext}"
+        self._remember(name, data)
+        await asyncio.to_thread(self._files.put, name, data)
+
+    def stats(self) -> dict:
+        return {
+            "memoryHits": self.memory_hits,
+            "diskHits": self.disk_hits,
+            "misses": self.misses,
+            "memoryBytes": self._memory_total,
+            "diskBytes": self._files.total_bytes,
+        }
+
+
+preview_cache = PreviewCache(
+    settings.preview_cache_dir,
+    settings.preview_cache_mb * 1024 * 1024,
+    settings.preview_memory_mb * 1024 * 1024,
+)
+preview_flight = SingleFlight(ttl=0, max_entries=1)  # The cache itself keeps results
@@ -0,0 +1,283 @@
+"""
+Per-user and per-provider quotas
+
+Two kinds of limit, checked before a realtime session or a proxied tool
+call starts:
+
+- concurrency slots: realtime WS sessions and in-flight tool calls per user
+  (by role), and everything in flight per provider across all users;
+- a token bucket of tool requests per user per minute (by role).
+
+Nothing waits: a request over quota is refused at once (WS close 4029,
+HTTP 429 with Retry-After), so one heavy user cannot queue up provider
+capacity that everyone shares. Background jobs are the exception: their
+rate token is taken at submit, and a job refused its in-flight slots goes
+back to the queue until one is free (see core/jobs.py). If the backend is unreachable, limits are
+not enforced rather than failing every request.
+
+State lives in memory by default, which is exact for a single instance. With
+`quota_backend=redis` (needs the 'redis' package) slots and buckets are
+shared by all instances; a slot is a lease renewed while held, so an
+instance that dies frees its slots after `quota_lease_seconds`.
+"""
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.rate_limit import TokenBucket
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def as_http(self) -> HTTPException:
+        # Slots have no predictable free time; a short retry is a fair hint
+        retry_after = int(self.retry_after) + 1 if self.retry_after else 5
+        return HTTPException(status_code=429, detail=self.detail, headers={"Retry-After": str(retry_after)})
+
+
+class MemoryQuotaBackend:
+    def __init__(self):
+        self._slots: Dict[str, Set[str]] = {}  # key -> lease ids
+        self._buckets: Dict[Tuple[float, int], TokenBucket] = {}  # (rate, burst) -> buckets by key
+
+    async def acquire(self, key: str, limit: int, lease_id: str, ttl: float) -> bool:
+        holders = self._slots.setdefault(key, set())
+        if len(holders) >= limit:
+            return False
+        holders.add(lease_id)
+        return True
+
+    async def release(self, key: str, lease_id: str) -> None:
+        holders = self._slots.get(key)
+        if holders is not None:
+            holders.discard(lease_id)
+            if not holders:
+                del self._slots[key]
+
+    async def refresh(self, key: str, lease_id: str, ttl: float) -> None:
+        pass
+
+    async def take(self, key: str, per_minute: float, burst: int) -> Optional[float]:
+        bucket = self._buckets.get((per_minute, burst))
+        if bucket is None:
+            bucket = self._buckets[(per_minute, burst)] = TokenBucket(per_minute, burst)
+        return bucket.acquire(key)
+
+    def in_use(self) -> Dict[str, int]:
+        return {key: len(holders) for key, holders in self._slots.items()}
+
+
+# Slots: sorted set of lease id -> expiry; expired leases are dropped before counting
+_ACQUIRE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+# Token bucket in a hash: tokens and last update; returns the wait in seconds (0 = allowed)
+_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisQuotaBackend:
+    def __init__(self, url: str, prefix: str = "quota:"):
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+        self._acquire = self._redis.register_script(_ACQUIRE)
+        self._take = self._redis.register_script(_TAKE)
+
+    async def acquire(self, key: str, limit: int, lease_id: str, ttl: float) -> bool:
+        now = time.time()
+        args = [now, limit, now + ttl, lease_id, int(ttl) + 1]
+        return bool(await self._acquire(keys=[self.prefix + key], args=args))
+
+    async def release(self, key: str, lease_id: str) -> None:
+        await self._redis.zrem(self.prefix + key, lease_id)
+
+    async def refresh(self, key: str, lease_id: str, ttl: float) -> None:
+        # XX: only extend a lease that still exists
+        await self._redis.zadd(self.prefix + key, {lease_id: time.time() + ttl}, xx=True)
+        await self._redis.expire(self.prefix + key, int(ttl) + 1)
+
+    async def take(self, key: str, per_minute: float, burst: int) -> Optional[float]:
+        if per_minute <= 0:
+            return 60.0
+        wait = float(await self._take(keys=[self.prefix + "rate:" + key],
+                                      args=[per_minute / 60.0, burst, time.time()]))
+        return wait or None
+
+    def in_use(self) -> Dict[str, int]:
+        return {}  # Shared state; inspect Redis directly
+
+
+class Lease:
+    """Held quota slots; release exactly once (renews shared-backend leases meanwhile)"""
+
+    def __init__(self, backend, keys: List[str], lease_id: str, ttl: float):
+        self._backend = backend
+        self.keys = keys
+        self.lease_id = lease_id
+        self._ttl = ttl
+        self._renewer: Optional[asyncio.Task] = None
+        if not isinstance(backend, MemoryQuotaBackend):
+            self._renewer = asyncio.create_task(self._renew())
+
+    async def _renew(self) -> None:
+        while True:
+            await asyncio.sleep(self._ttl / 3)
+            try:
+                for key in self.keys:
+                    await self._backend.refresh(key, self.lease_id, self._ttl)
+            except Exception as e:
+                print(f"Quota lease renew error: {e}")
+
+    async def release(self) -> None:
+        if self._renewer is not None:
+            self._renewer.cancel()
+            self._renewer = None
+        keys, self.keys = self.keys, []
+        for key in keys:
+            try:
+                await self._backend.release(key, self.lease_id)
+            except Exception as e:
+                print(f"Quota release error: {e}")
+
+
+@asynccontextmanager
+async def tool_quota(user, provider: str):
+    """Hold a tool-call quota slot for the block; HTTP 429 if over quota"""
+    try:
+        lease = await quotas.acquire_tool_call(user, provider)
+    except QuotaExceeded as e:
+        raise e.as_http()
+    try:
+        yield
+    finally:
+        await lease.release()
+
+
+def for_role(limits: dict, role: Optional[str]):
+    """Per-role setting; unknown roles get the 'user' limit"""
+    return limits.get(role or "user", limits.get("user"))
+
+
+class QuotaService:
+    def __init__(self, backend, lease_seconds: float):
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self.refused: Dict[str, int] = {}  # reason -> count
+
+    def _refuse(self, reason: str, detail: str, retry_after: Optional[float] = None):
+        self.refused[reason] = self.refused.get(reason, 0) + 1
+        raise QuotaExceeded(detail, retry_after)
+
+    async def _acquire_all(self, slots: List[Tuple[str, Optional[int], str, str]]) -> Lease:
+        """slots: (key, limit or None for unlimited, refusal reason, message); all or nothing"""
+        lease_id = uuid.uuid4().hex
+        held: List[str] = []
+        for key, limit, reason, detail in slots:
+            if limit is None:
+                continue
+            try:
+                acquired = await self.backend.acquire(key, limit, lease_id, self.lease_seconds)
+            except Exception as e:
+                print(f"Quota backend error (not enforced): {e}")
+                continue
+            if not acquired:
+                for taken in held:
+                    await self.backend.release(taken, lease_id)
+                self._refuse(reason, detail)
+            held.append(key)
+        return Lease(self.backend, held, lease_id, self.lease_seconds)
+
+    async def acquire_session(self, user, provider: str) -> Lease:
+        """Slot for one realtime WS session (per user by role, per provider)"""
+        per_user = for_role(settings.quota_sessions_per_user, user.role)
+        return await self._acquire_all([
+            (f"sessions:user:{user.id}", per_user, "sessions_per_user",
+             f"Too many concurrent voice sessions (limit {per_user})"),
+            (f"inflight:provider:{provider}", settings.quota_provider_concurrency.get(provider), "provider",
+             f"Provider '{provider}' is at capacity, try again shortly"),
+        ])
+
+    async def check_rate(self, user) -> None:
+        """Take one tool request from the user's per-minute bucket"""
+        per_minute = for_role(settings.quota_tool_calls_per_minute, user.role)
+        burst = for_role(settings.quota_tool_burst, user.role)
+        if per_minute is None:
+            return
+        try:
+            retry_after = await self.backend.take(f"tools:user:{user.id}", per_minute, burst)
+        except Exception as e:
+            print(f"Quota backend error (not enforced): {e}")
+            return
+        if retry_after is not None:
+            self._refuse("tool_rate", "Too many generation requests, slow down", retry_after)
+
+    async def acquire_tool_call(self, user, provider: str) -> Lease:
+        """Rate token plus an in-flight slot (per user by role, per provider)"""
+        await self.check_rate(user)
+        return await self.acquire_tool_slot(user, provider)
+
+    async def acquire_tool_slot(self, user, provider: str) -> Lease:
+        """In-flight slot only: background jobs, whose rate token was taken at submit"""
+        per_user = for_role(settings.quota_tool_concurrency_per_user, user.role)
+        return await self._acquire_all([
+            (f"tools:inflight:user:{user.id}", per_user, "tools_per_user",
+             f"Too many generation requests in progress (limit {per_user})"),
+            (f"inflight:provider:{provider}", settings.quota_provider_concurrency.get(provider), "provider",
+             f"Provider '{provider}' is at capacity, try again shortly"),
+        ])
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis" if isinstance(self.backend, RedisQuotaBackend) else "memory",
+            "inUse": self.backend.in_use(),
+            "refused": dict(self.refused),
+        }
+
+
+def create_quota_backend():
+    if settings.quota_backend == "redis":
+        if aioredis is None:
+            print("Quota backend 'redis' needs the 'redis' package; using per-process limits")
+        else:
+            return RedisQuotaBackend(settings.redis_url)
+    return MemoryQuotaBackend()
+
+
+quotas = QuotaService(create_quota_backend(), settings.quota_lease_seconds)
@@ -0,0 +1,57 @@
+"""
+Token buckets for request rates
+
+`TokenBucket` keeps one bucket per key (IP, username, provider, ...) with a
+shared rate; `acquire` never blocks and returns how long to wait instead,
+`wait` sleeps until a token is available. Buckets are in-process: with N
+workers the effective limit is N times the configured one.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket per key: `per_minute` requests, bursting to `burst`"""
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 10000, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [tokens, updated_at]
+
+    def acquire(self, key: str) -> Optional[float]:
+        """Take one token; returns None if allowed, else seconds until the next one"""
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return None
+        return (1 - bucket[0]) / self.rate if self.rate > 0 else 60.0
+
+    async def wait(self, key: str) -> None:
+        while (delay := self.acquire(key)) is not None:
+            await asyncio.sleep(delay)
+
+
+class ProviderRateLimits:
+    """Outbound request rate per provider, each with its own requests-per-minute"""
+
+    def __init__(self, per_minute: Dict[str, float], default_per_minute: float, burst: int = 1):
+        self._buckets = {name: TokenBucket(rate, burst) for name, rate in per_minute.items()}
+        self._default = TokenBucket(default_per_minute, burst)
+
+    async def wait(self, provider: str) -> None:
+        await self._buckets.get(provider, self._default).wait(provider)
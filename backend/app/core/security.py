@@ -3,6 +3,7 @@ from typing import Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
+import uuid
 
 # Secret key for JWT. In production, this should be in .env
 # Using a fixed key for dev if not found
@@ -20,6 +21,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# Verified against when the username does not exist, so the response takes
+# as long as a wrong password would (same scheme and cost as real hashes)
+DUMMY_PASSWORD_HASH = get_password_hash(uuid.uuid4().hex)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -27,8 +32,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     
-    # Ensure standard claims
+    # Ensure standard claims (jti keys the server-side principal cache)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
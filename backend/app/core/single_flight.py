@@ -0,0 +1,89 @@
+"""
+De-duplication of slow, paid generation calls
+
+Double-clicks and client retries in the editors send byte-identical
+scenario/image generation requests. Requests are keyed by a hash of
+(kind, model, body, user); while one is in flight, identical ones wait for
+its result instead of calling the provider again. The call runs as its own
+task, so the first requester disconnecting does not fail the others.
+
+Optionally the result is kept for `generation_cache_ttl` seconds, so a
+retry right after completion is answered from memory too. Failures are
+never cached.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from app.config import settings
+
+
+def request_key(kind: str, model: str, body: Any, scope: Any) -> str:
+    raw = json.dumps([kind, model, body, scope], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self, ttl: float, max_entries: int, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, result)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.requests = 0
+        self.cache_hits = 0
+        self.shared = 0  # Joined a call already in flight
+        self.upstream_calls = 0
+
+    def _cached(self, key: str) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        if self._clock() >= entry[0]:
+            del self._results[key]
+            return False, None
+        self._results.move_to_end(key)
+        return True, entry[1]
+
+    def _store(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if self.ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        self._results[key] = (self._clock() + self.ttl, task.result())
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        self.requests += 1
+        found, result = self._cached(key)
+        if found:
+            self.cache_hits += 1
+            return result
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        saved = self.cache_hits + self.shared
+        return {
+            "requests": self.requests,
+            "upstreamCalls": self.upstream_calls,
+            "cacheHits": self.cache_hits,
+            "sharedInFlight": self.shared,
+            "hitRate": round(saved / self.requests, 3) if self.requests else None,
+            "inFlight": len(self._inflight),
+            "cached": len(self._results),
+        }
+
+
+generation_flight = SingleFlight(settings.generation_cache_ttl, settings.generation_cache_size)
@@ -0,0 +1,91 @@
+"""
+Resized avatar variants, rendered on first request and cached on disk
+
+Variants are derived from immutable blobs, so a cached file never goes stale;
+the cache only has to stay within `thumbnail_cache_mb`. Eviction is LRU by
+last access (file mtime is touched on every hit, so the order survives
+restarts). Pillow is optional: without it callers fall back to the original.
+"""
+import io
+from typing import Optional
+
+from app.config import settings
+from app.core.blobstore import get_blob_store
+from app.core.disk_cache import DiskLRU
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Raised by render_thumbnail for blobs that are not a renderable image:
+# undecodable data, or more pixels than Pillow's decompression-bomb limit
+UNREADABLE_IMAGE_ERRORS = (OSError, Image.DecompressionBombError) if Image is not None else (OSError,)
+
+
+THUMBNAIL_SIZES = (64, 128, 256)
+THUMBNAIL_FORMATS = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+def thumbnails_available() -> bool:
+    return Image is not None
+
+
+def render_thumbnail(data: bytes, size: int, fmt: str) -> bytes:
+    """Fit within size x size (aspect kept, never upscaled) and re-encode"""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((size, size), Image.LANCZOS)
+
+        out = io.BytesIO()
+        if fmt == "jpeg":
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(out, "JPEG", quality=85, optimize=True, progressive=True)
+        else:
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            img.save(out, "WEBP", quality=80, method=4)
+        return out.getvalue()
+
+
+class ThumbnailCache:
+    """Rendered variants in a byte-bounded DiskLRU"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self._files = DiskLRU(root, max_bytes)
+
+    def get(self, key: str, size: int, fmt: str) -> Optional[bytes]:
+        """Variant bytes for blob `key`, or None if the blob does not exist"""
+        digest = key.split(".", 1)[0]
+        name = f"{digest}_{size}.{fmt}"
+
+        data = self._files.get(name)
+        if data is not None:
+            return data
+
+        original = get_blob_store().get(key)
+        if original is None:
+            return None
+        # Concurrent misses for one variant render and write the same bytes
+        data = render_thumbnail(original, size, fmt)
+        self._files.put(name, data)
+        return data
+
+
+_cache: Optional[ThumbnailCache] = None
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    global _cache
+    if _cache is None:
+        _cache = ThumbnailCache(settings.thumbnail_dir, settings.thumbnail_cache_mb * 1024 * 1024)
+    return _cache
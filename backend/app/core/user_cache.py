@@ -0,0 +1,159 @@
+"""
+Short-lived caches of authenticated users
+
+The WS relay resolves the token subject for every connection and every REST
+call resolves its bearer token. A cached `UserSnapshot` (plain attributes,
+safe to share across sessions) avoids a database round trip each time;
+unknown users are cached too, for a shorter time, so a storm of bad tokens
+cannot hammer the database. Concurrent misses for the same key share one
+lookup.
+
+Entries are dropped explicitly when a profile changes. Out-of-process edits
+(scripts/passwd_user.py, scripts/set_user_active.py) bump `token_version`,
+which revokes older tokens once the TTL has run out.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+
+
+class UserSnapshot:
+    """Detached copy of the User columns the relay and routers read"""
+    __slots__ = ("id", "username", "role", "is_active", "avatar_url", "settings", "token_version")
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.is_active = user.is_active
+        self.avatar_url = user.avatar_url
+        self.settings = user.settings
+        self.token_version = user.token_version or 0
+
+
+class TTLCache:
+    """LRU map with per-entry expiry; `None` values are cached negatives"""
+
+    def __init__(self, ttl: float, negative_ttl: float, max_size: int, clock=time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Any], bool]) -> None:
+        for key in [k for k, (_, v) in self._entries.items() if v is not None and predicate(v)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await load()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.put(key, value)
+        future.set_result(value)
+        return value
+
+
+# username -> snapshot (WS connects)
+ws_user_cache = TTLCache(
+    ttl=settings.user_cache_ttl,
+    negative_ttl=settings.user_cache_negative_ttl,
+    max_size=settings.user_cache_size,
+)
+
+# token jti (or "sub:<username>" for tokens without one) -> snapshot (REST)
+principal_cache = TTLCache(
+    ttl=settings.principal_cache_ttl,
+    negative_ttl=settings.user_cache_negative_ttl,
+    max_size=settings.user_cache_size * 4,
+)
+
+
+async def load_user_snapshot(username: str) -> Optional[UserSnapshot]:
+    from app.database import AsyncSessionLocal
+    from app.routers.auth import get_user_async
+
+    async with AsyncSessionLocal() as db:
+        user = await get_user_async(db, username=username)
+        return UserSnapshot(user) if user else None
+
+
+async def _resolve(cache: TTLCache, key: Hashable, username: str,
+                   token_version: int) -> Optional[UserSnapshot]:
+    user = await cache.get_or_load(key, lambda: load_user_snapshot(username))
+    if user is not None and token_version > user.token_version:
+        # Token issued after this snapshot was cached (re-login after a bump): reload once
+        cache.invalidate(key)
+        user = await cache.get_or_load(key, lambda: load_user_snapshot(username))
+    if user is None or token_version != user.token_version:
+        return None  # Unknown user or revoked token
+    return user
+
+
+async def resolve_user(username: str, token_version: int = 0) -> Optional[UserSnapshot]:
+    """Cached username -> UserSnapshot for WS connects, queried on the async engine"""
+    return await _resolve(ws_user_cache, username, username, token_version)
+
+
+async def resolve_principal(payload: dict) -> Optional[UserSnapshot]:
+    """
+    Cached bearer token -> UserSnapshot. None if the user is unknown or the
+    token's `ver` claim is older than the user's token_version (revoked).
+    """
+    username = payload.get("sub")
+    key = payload.get("jti") or f"sub:{username}"
+    return await _resolve(principal_cache, key, username, payload.get("ver", 0))
+
+
+def invalidate_user(*usernames: Optional[str]) -> None:
+    for username in usernames:
+        if username:
+            ws_user_cache.invalidate(username)
+            principal_cache.invalidate_where(lambda u: u.username == username)
@@ -1,7 +1,10 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import ssl
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,14 +14,28 @@ load_dotenv()
 # Default fallback: SQLite local file
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
 
+# Connection pool (per process; ignored for SQLite files)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+pool_args = {} if is_sqlite else {
+    "pool_size": POOL_SIZE,
+    "max_overflow": MAX_OVERFLOW,
+    "pool_timeout": POOL_TIMEOUT,
+}
+
 # SQLite needs specific connect_args to check for same thread
-connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+connect_args = {"check_same_thread": False} if is_sqlite else {}
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
+    SQLALCHEMY_DATABASE_URL,
     connect_args=connect_args,
     pool_pre_ping=True,
-    pool_recycle=3600
+    pool_recycle=POOL_RECYCLE,
+    **pool_args
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -31,3 +48,45 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# --- Async engine (same models, non-blocking drivers) ---
+
+def to_async_url(url: str):
+    """
+    Map the sync URL onto its asyncio driver: pymysql -> aiomysql, sqlite ->
+    aiosqlite. aiomysql takes an SSLContext instead of pymysql's ssl_* query
+    parameters, so those are turned into connect_args.
+    """
+    u = make_url(url)
+    async_connect_args = {}
+    if u.get_backend_name() == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    elif u.get_backend_name() == "mysql":
+        ssl_params = {k: v for k, v in u.query.items() if k.startswith("ssl")}
+        if ssl_params:
+            async_connect_args["ssl"] = ssl.create_default_context(cafile=ssl_params.get("ssl_ca"))
+            u = u.difference_update_query(list(ssl_params))
+        u = u.set(drivername="mysql+aiomysql")
+    return u, async_connect_args
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+if ASYNC_DATABASE_URL:
+    async_url, async_connect_args = make_url(ASYNC_DATABASE_URL), {}
+else:
+    async_url, async_connect_args = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(
+    async_url,
+    connect_args=async_connect_args,
+    pool_pre_ping=True,
+    pool_recycle=POOL_RECYCLE,
+    **pool_args
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+# Dependency for async routes (reads on the event loop, no threadpool worker held)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
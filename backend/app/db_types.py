@@ -0,0 +1,159 @@
+"""
+Custom column types
+
+CompressedText / CompressedJSON store values as a tagged binary payload:
+
+    b"\\x00" + codec + body      codec: b"r" raw UTF-8, b"z" zlib, b"s" zstd
+
+Values below the size threshold are stored raw (compression would not pay
+off). Rows written before the migration (plain TEXT / JSON, no leading NUL
+byte) are still read transparently.
+
+On MySQL/TiDB the tagged payload can only be written once
+scripts/migrate_compressed_columns.py has changed the columns to LONGBLOB:
+a JSON column rejects it as invalid JSON, a TEXT column as invalid utf8mb4.
+Until `check_compressed_columns` (run at startup) has seen every such
+column as a BLOB, values are written as plain text / JSON, which both the
+old and the new column types accept. So the code can be deployed before the
+migration; writes are compressed from the first start after it (re-run the
+migration to compress rows written in between).
+"""
+import json
+import zlib
+
+from sqlalchemy import inspect
+from sqlalchemy.types import TypeDecorator, UserDefinedType
+
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+MARKER = b"\x00"
+RAW = b"r"
+ZLIB = b"z"
+ZSTD = b"s"
+
+
+class _Blob(UserDefinedType):
+    """Binary column without driver-level result processing (legacy str rows pass through)"""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "BLOB"
+
+
+class _LongBlob(_Blob):
+    def get_col_spec(self, **kw):
+        return "LONGBLOB"
+
+
+# MySQL only (SQLite is dynamically typed): False until the columns are known to be BLOBs
+_blob_columns_ready = False
+
+
+def compressed_columns(metadata):
+    """(table, column) for every CompressedText / CompressedJSON column in `metadata`"""
+    return [
+        (table.name, column.name)
+        for table in metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, CompressedText)
+    ]
+
+
+def check_compressed_columns(engine, metadata) -> bool:
+    """Enable compressed writes on MySQL/TiDB if every compressed column is a BLOB"""
+    global _blob_columns_ready
+    if engine.dialect.name != "mysql":
+        return True
+    inspector = inspect(engine)
+    pending = []
+    for table, column in compressed_columns(metadata):
+        types = {c["name"]: str(c["type"]).upper() for c in inspector.get_columns(table)}
+        if "BLOB" not in types.get(column, ""):
+            pending.append(f"{table}.{column}")
+    _blob_columns_ready = not pending
+    if pending:
+        print(f"Compressed columns not migrated yet ({', '.join(pending)}); "
+              "writing plain values until scripts/migrate_compressed_columns.py has run")
+    return _blob_columns_ready
+
+
+def writes_compressed(dialect) -> bool:
+    return dialect.name != "mysql" or _blob_columns_ready
+
+
+def compress_payload(data: bytes, codec: str = None, threshold: int = None) -> bytes:
+    codec = codec or settings.db_compression
+    threshold = settings.db_compression_threshold if threshold is None else threshold
+
+    if codec == "none" or len(data) < threshold:
+        return MARKER + RAW + data
+    if codec == "zstd" and zstandard is not None:
+        return MARKER + ZSTD + zstandard.ZstdCompressor(level=6).compress(data)
+    return MARKER + ZLIB + zlib.compress(data, 6)
+
+
+def decompress_payload(value) -> bytes:
+    if isinstance(value, str):
+        # Legacy TEXT/JSON row read through a driver that decodes text
+        return value.encode("utf-8")
+    value = bytes(value)
+    if not value.startswith(MARKER):
+        return value
+
+    tag, body = value[1:2], value[2:]
+    if tag == RAW:
+        return body
+    if tag == ZLIB:
+        return zlib.decompress(body)
+    if tag == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Column is zstd-compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise ValueError(f"Unknown compressed column tag: {tag!r}")
+
+
+class CompressedText(TypeDecorator):
+    """Text stored compressed; LONGBLOB on MySQL/TiDB, BLOB elsewhere"""
+    impl = _Blob
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(_LongBlob())
+        return dialect.type_descriptor(_Blob())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not writes_compressed(dialect):
+            return value
+        return compress_payload(value.encode("utf-8"))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_payload(value).decode("utf-8")
+
+
+class CompressedJSON(CompressedText):
+    """JSON document stored compressed (serialized compactly, non-ASCII kept as UTF-8)"""
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        if not writes_compressed(dialect):
+            return text
+        return compress_payload(text.encode("utf-8"))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return json.loads(decompress_payload(value).decode("utf-8"))
@@ -1,17 +1,30 @@
 """
 Voice Model Lab - FastAPI Backend
 """
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.routers import models, websocket, history, users, data_manage, auth
-from app.database import engine
+from app.routers import models, websocket, history, users, data_manage, auth, blobs, jobs
+from app.database import async_engine, engine
+from app.core.http_client import http_pool
+from app.core.single_flight import generation_flight
+from app.core.jobs import job_queue
+from app.core.quotas import quotas
+from app.core.password_pool import password_pool
 from app import models as db_models
+from app.db_types import check_compressed_columns
+from app.core.list_cache import seed_versions
+from app.audio.recorder import run_recording_retention
+from app.relay.ingress import ingress_totals
 
 # Init DB tables (Robust)
 try:
     db_models.Base.metadata.create_all(bind=engine)
+    check_compressed_columns(engine, db_models.Base.metadata)
+    seed_versions(engine)
 except Exception as e:
     print(f"DB Init Error: {e}")
     # Continue startup even if DB fails, to allow debugging via API
@@ -30,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers
@@ -39,6 +53,26 @@ app.include_router(websocket.router, tags=["websocket"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(data_manage.router, prefix="/api/data", tags=["data"])
+app.include_router(blobs.router, prefix="/api/blobs", tags=["blobs"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+    if settings.recordings_retention_days > 0:
+        app.state.recording_retention = asyncio.create_task(run_recording_retention())
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await job_queue.stop()
+    retention = getattr(app.state, "recording_retention", None)
+    if retention:
+        retention.cancel()
+    await async_engine.dispose()
+    password_pool.shutdown()
+    await http_pool.aclose()
 
 
 @app.get("/")
@@ -87,6 +121,36 @@ async def debug_config():
     }
 
 
+@app.get("/api/debug/http-pool")
+async def debug_http_pool():
+    """Outbound connection reuse per provider host"""
+    return http_pool.stats()
+
+
+@app.get("/api/debug/generation-cache")
+async def debug_generation_cache():
+    """Scenario/image generation requests answered without a provider call"""
+    return generation_flight.stats()
+
+
+@app.get("/api/debug/jobs")
+async def debug_jobs():
+    """Background jobs running in this process"""
+    return job_queue.stats()
+
+
+@app.get("/api/debug/quotas")
+async def debug_quotas():
+    """Quota slots in use (memory backend) and refusals by reason"""
+    return quotas.stats()
+
+
+@app.get("/api/debug/ingress")
+async def debug_ingress():
+    """Client audio accepted, paced and dropped by the WS relay (all sessions)"""
+    return ingress_totals.stats()
+
+
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
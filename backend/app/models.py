@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .database import Base
+from .db_types import CompressedJSON, CompressedText
 from datetime import datetime
 import uuid
 
@@ -12,11 +13,12 @@ class User(Base):
 
     id = Column(String(36), primary_key=True, default=generate_uuid)
     username = Column(String(100), unique=True, index=True, nullable=False) # Login ID
-    avatar_url = Column(Text(4294967295), nullable=True) # URL path or Base64 data (LONGTEXT)
+    avatar_url = Column(Text(4294967295), nullable=True) # URL path (/api/blobs/...); legacy rows may hold Base64 data (LONGTEXT)
     settings = Column(JSON, nullable=True) # User-specific settings
     hashed_password = Column(String(255), nullable=True) # Password hash
     role = Column(String(50), default="user") # 'admin' or 'user'
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=0) # Bump to revoke issued tokens (password change, deactivation)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -36,14 +38,14 @@ class Scenario(Base):
     theme = Column(String(50)) # blue, purple, orange
     tags = Column(JSON) # List[str]
     
-    # Large Content
-    workflow = Column(Text)
-    knowledge_points = Column(Text)
+    # Large Content (compressed, see db_types)
+    workflow = Column(CompressedText)
+    knowledge_points = Column(CompressedText)
     scoring_criteria = Column(Text)
     scoring_dimensions = Column(JSON) # List[dict]
     
     # Source Content
-    script_content = Column(Text) # Raw text/script
+    script_content = Column(CompressedText) # Raw text/script
     generation_prompt = Column(Text) # Custom prompt used for generation
     
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -59,7 +61,7 @@ class Role(Base):
     name = Column(String(100)) # English ID
     name_cn = Column(String(100), index=True) # Chinese Name
     title = Column(String(100))
-    avatar_url = Column(Text(4294967295)) # Replaces Base64 (LONGTEXT)
+    avatar_url = Column(Text(4294967295)) # /api/blobs/<sha256>.<ext>; legacy rows may hold Base64 (LONGTEXT)
     avatar_seed = Column(String(100)) # Fallback seed
     
     description = Column(Text)
@@ -89,8 +91,8 @@ class SessionRecord(Base):
     end_time = Column(DateTime, default=datetime.utcnow)
     duration_seconds = Column(Integer, default=0)
     
-    messages = Column(JSON, nullable=True)
-    ai_analysis = Column(JSON, nullable=True)
+    messages = Column(CompressedJSON, nullable=True)
+    ai_analysis = Column(CompressedJSON, nullable=True)
     
     audio_url = Column(String(512), nullable=True)
     
@@ -98,6 +100,69 @@ class SessionRecord(Base):
     
     # Relationships
     user = relationship("User", back_populates="sessions")
+    message_rows = relationship(
+        "SessionMessage",
+        back_populates="session",
+        order_by="SessionMessage.seq",
+        cascade="all, delete-orphan"
+    )
+    __table_args__ = (
+        # Keyset pagination for GET /api/history (newest first per user)
+        Index("ix_session_records_user_start_id", "user_id", "start_time", "id"),
+    )
+
     # Optional: Relationships to Scenario/Role if needed for verification
     # scenario = relationship("Scenario")
     # role = relationship("Role")
+
+class SessionMessage(Base):
+    """Turn-level transcript message, appended by the WS relay while the session runs"""
+    __tablename__ = "session_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String(36), ForeignKey("session_records.id"), nullable=False)
+    seq = Column(Integer, nullable=False) # Order within the session (1-based)
+
+    role = Column(String(20), nullable=False) # 'user' or 'model'
+    content = Column(Text, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    session = relationship("SessionRecord", back_populates="message_rows")
+
+    __table_args__ = (
+        Index("ix_session_messages_session_seq", "session_id", "seq"),
+    )
+
+class CacheVersion(Base):
+    """Per-table change counter; bumped on writes so every worker can drop stale list caches"""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True) # e.g. 'scenarios', 'roles'
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Job(Base):
+    """Background provider call (scenario/image generation), run by the in-process job workers"""
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    kind = Column(String(50), nullable=False) # e.g. 'scenario-generate', 'image-generate'
+    provider = Column(String(50), nullable=False) # Concurrency bucket, e.g. 'gemini'
+    status = Column(String(20), nullable=False, default="queued") # queued, running, succeeded, failed, cancelled
+    params = Column(CompressedJSON, nullable=True) # Request body
+    result = Column(CompressedJSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress = Column(JSON, nullable=True) # {"done": n, "total": m} for multi-step jobs
+    attempts = Column(Integer, nullable=False, default=0) # Claims so far; a crashed worker's job is retried
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) # Heartbeat while running
+
+    __table_args__ = (
+        Index("ix_jobs_status_created", "status", "created_at"), # Queue pickup, oldest first
+        Index("ix_jobs_user_created", "user_id", "created_at"),
+    )
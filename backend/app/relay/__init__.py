@@ -0,0 +1 @@
+# Relay package
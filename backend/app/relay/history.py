@@ -0,0 +1,64 @@
+"""
+Session persistence for the WS relay
+
+Async DB helpers on the asyncio engine, so the event loop (and every other
+session's audio) never blocks on a database round trip.
+"""
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from app.database import AsyncSessionLocal
+from app.models import Role, Scenario, SessionMessage, SessionRecord
+
+
+async def create_session_record(user_id: str, scenario_id: str, role_id: str) -> Optional[str]:
+    """Create the history row up front so transcript messages can reference it"""
+    async with AsyncSessionLocal() as db:
+        if not await db.get(Scenario, scenario_id) or not await db.get(Role, role_id):
+            return None
+        record_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        db.add(SessionRecord(
+            id=record_id,
+            user_id=user_id,
+            scenario_id=scenario_id,
+            role_id=role_id,
+            start_time=now,
+            end_time=now
+        ))
+        await db.commit()
+        return record_id
+
+
+async def append_session_messages(record_id: str, batch: List[dict]) -> None:
+    """Append-only batched insert of finished messages"""
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            SessionMessage(
+                session_id=record_id,
+                seq=m["seq"],
+                role=m["role"],
+                content=m["content"],
+                created_at=m["created_at"]
+            )
+            for m in batch
+        ])
+        await db.commit()
+
+
+async def finalize_session_record(record_id: str, audio_url: Optional[str] = None) -> None:
+    """
+    Record end time / duration even if the client never posts its summary;
+    `audio_url` only once the session's recording has actually been written
+    """
+    async with AsyncSessionLocal() as db:
+        record = await db.get(SessionRecord, record_id)
+        if not record:
+            return
+        record.end_time = datetime.utcnow()
+        if record.start_time:
+            record.duration_seconds = int((record.end_time - record.start_time).total_seconds())
+        if audio_url:
+            record.audio_url = audio_url
+        await db.commit()
@@ -0,0 +1,136 @@
+"""
+Client audio ingress limiting for the WS relay
+
+A client can only produce audio in real time, so the fair limit is a byte
+rate derived from the negotiated format (PCM16 at the client sample rate),
+not a message count. Two token buckets, both in bytes of PCM16 audio:
+
+- sustained: refills at exactly real time and holds `burst_seconds` of
+  audio. A client that buffered during a network stall may send that much
+  ahead of real time; audio beyond it is dropped.
+- catch-up: refills at `catchup_factor` x real time. Backlog within the
+  burst allowance is accepted but paced to that speed (the relay delays the
+  next read, so TCP pushes back on the client) instead of hitting the
+  provider all at once.
+
+Drops are also counted over a sliding `drop_window`, so the relay can close
+a socket that keeps sending faster than real time without punishing a long
+session for a few stalls spread over its lifetime. Counters of every limiter
+also go into the process-wide `ingress_totals` (/api/debug/ingress).
+"""
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+
+class IngressTotals:
+    """Process-wide ingress counters across all WS sessions"""
+
+    def __init__(self):
+        self.limiters = 0  # Created: one per connection plus one per session.create
+        self.accepted_seconds = 0.0
+        self.dropped_chunks = 0
+        self.dropped_seconds = 0.0
+        self.throttled_chunks = 0
+        self.throttle_seconds = 0.0
+        self.closed_sockets = 0  # Closed for exceeding the drop limit
+
+    def stats(self) -> dict:
+        return {
+            "limiters": self.limiters,
+            "acceptedSeconds": round(self.accepted_seconds, 2),
+            "droppedChunks": self.dropped_chunks,
+            "droppedSeconds": round(self.dropped_seconds, 2),
+            "throttledChunks": self.throttled_chunks,
+            "throttleSeconds": round(self.throttle_seconds, 2),
+            "closedSockets": self.closed_sockets,
+        }
+
+
+ingress_totals = IngressTotals()
+
+
+class IngressLimiter:
+    def __init__(self, bytes_per_second: float, burst_seconds: float = 2.0,
+                 catchup_factor: float = 2.0, catchup_window: float = 0.2, drop_window: float = 60.0,
+                 clock=time.monotonic, totals: Optional[IngressTotals] = None):
+        self.bytes_per_second = bytes_per_second
+        self.capacity = bytes_per_second * burst_seconds
+        self.catchup_rate = bytes_per_second * catchup_factor
+        self.catchup_capacity = self.catchup_rate * catchup_window
+        self._clock = clock
+        self._tokens = self.capacity
+        self._catchup_tokens = self.catchup_capacity
+        self._updated = clock()
+        self.drop_window = drop_window
+        self._drops: Deque[Tuple[float, int]] = deque()  # (time, bytes) within drop_window
+        self._window_dropped = 0
+        self._totals = totals
+        if totals:
+            totals.limiters += 1
+
+        self.accepted_bytes = 0
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+        self.throttled_chunks = 0
+        self.throttle_seconds = 0.0
+
+    @classmethod
+    def for_pcm16(cls, sample_rate: int, channels: int = 1, **kwargs) -> "IngressLimiter":
+        return cls(sample_rate * channels * 2, **kwargs)
+
+    def admit(self, nbytes: int) -> Tuple[bool, float]:
+        """(accepted, seconds to wait before reading more) for a chunk of `nbytes` PCM16 bytes"""
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.bytes_per_second)
+        self._catchup_tokens = min(self.catchup_capacity, self._catchup_tokens + elapsed * self.catchup_rate)
+
+        # A chunk bigger than the whole allowance still passes when the bucket is full (goes into debt)
+        if self._tokens < nbytes and self._tokens < self.capacity:
+            self.dropped_chunks += 1
+            self.dropped_bytes += nbytes
+            self._drops.append((now, nbytes))
+            self._window_dropped += nbytes
+            if self._totals:
+                self._totals.dropped_chunks += 1
+                self._totals.dropped_seconds += nbytes / self.bytes_per_second
+            return False, 0.0
+        self._tokens -= nbytes
+        self.accepted_bytes += nbytes
+        if self._totals:
+            self._totals.accepted_seconds += nbytes / self.bytes_per_second
+
+        self._catchup_tokens -= nbytes
+        if self._catchup_tokens >= 0:
+            return True, 0.0
+        delay = -self._catchup_tokens / self.catchup_rate
+        self.throttled_chunks += 1
+        self.throttle_seconds += delay
+        if self._totals:
+            self._totals.throttled_chunks += 1
+            self._totals.throttle_seconds += delay
+        return True, delay
+
+    @property
+    def dropped_seconds(self) -> float:
+        """Audio dropped over the whole session"""
+        return self.dropped_bytes / self.bytes_per_second
+
+    @property
+    def recent_dropped_seconds(self) -> float:
+        """Audio dropped within the last `drop_window` seconds"""
+        cutoff = self._clock() - self.drop_window
+        while self._drops and self._drops[0][0] < cutoff:
+            self._window_dropped -= self._drops.popleft()[1]
+        return self._window_dropped / self.bytes_per_second
+
+    def stats(self) -> dict:
+        return {
+            "acceptedSeconds": round(self.accepted_bytes / self.bytes_per_second, 2),
+            "droppedChunks": self.dropped_chunks,
+            "droppedSeconds": round(self.dropped_seconds, 2),
+            "throttledChunks": self.throttled_chunks,
+            "throttleSeconds": round(self.throttle_seconds, 2),
+        }
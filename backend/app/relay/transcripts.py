@@ -0,0 +1,155 @@
+"""
+Transcript aggregation for the WS relay
+
+Adapters emit token-sized transcription deltas. Sending each one as its own
+JSON message floods the client socket, so deltas are merged per role and
+flushed when the coalescing window expires, at a sentence boundary, when the
+other role starts speaking, or immediately on TURN_COMPLETE.
+
+The same deltas are assembled into turn-level messages that are persisted
+while the session runs, so a crashed client does not lose the transcript.
+"""
+import asyncio
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+
+# Sentence-ending punctuation (CJK and ASCII) that triggers an early flush
+BOUNDARY_CHARS = set("。！？；…!?;\n.")
+
+
+class TranscriptAggregator:
+    """Merges (role, text) deltas; `emit(role, text, is_final)` receives the coalesced chunks"""
+
+    def __init__(self, emit: Callable[[str, str, bool], None], window: float = 0.05, max_chars: int = 200):
+        self._emit = emit
+        self._window = window
+        self._max_chars = max_chars
+        self._buffers: Dict[str, List[str]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._last_role: Optional[str] = None
+
+        # Counters for session logs
+        self.deltas_in = 0
+        self.messages_out = 0
+
+    def add(self, role: str, text: str, is_final: bool = False) -> None:
+        self.deltas_in += 1
+        if self._window <= 0:
+            self._send(role, text, is_final)
+            return
+
+        # Keep the interleaving order the client would have seen without coalescing
+        if self._last_role is not None and self._last_role != role:
+            self.flush(self._last_role)
+        self._last_role = role
+
+        self._buffers.setdefault(role, []).append(text)
+        self._sizes[role] = self._sizes.get(role, 0) + len(text)
+
+        stripped = text.rstrip()
+        at_boundary = bool(stripped) and stripped[-1] in BOUNDARY_CHARS
+        if is_final or at_boundary or self._sizes[role] >= self._max_chars:
+            self.flush(role, is_final)
+        elif role not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[role] = loop.call_later(self._window, self.flush, role)
+
+    def flush(self, role: Optional[str] = None, is_final: bool = False) -> None:
+        """Flush one role, or every role when `role` is None (e.g. on TURN_COMPLETE)"""
+        roles = [role] if role is not None else list(self._buffers.keys())
+        for r in roles:
+            timer = self._timers.pop(r, None)
+            if timer:
+                timer.cancel()
+            parts = self._buffers.pop(r, None)
+            self._sizes.pop(r, None)
+            if parts:
+                self._send(r, "".join(parts), is_final)
+
+    def close(self) -> None:
+        """Drop pending timers (the socket is going away, so nothing is sent)"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._buffers.clear()
+        self._sizes.clear()
+
+    def _send(self, role: str, text: str, is_final: bool) -> None:
+        self.messages_out += 1
+        self._emit(role, text, is_final)
+
+
+class TranscriptAssembler:
+    """
+    Builds turn-level messages from transcription deltas and hands finished
+    messages to `persist` in batches: every `interval` seconds and after each
+    turn. A failed batch is kept and retried on the next flush.
+    """
+
+    def __init__(self, persist: Callable[[List[dict]], Awaitable[None]], interval: float = 3.0):
+        self._persist = persist
+        self._interval = interval
+        self._current: Optional[dict] = None
+        self._pending: List[dict] = []
+        self._seq = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()  # End-of-turn flushes (referenced until done)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def add(self, role: str, text: str) -> None:
+        if self._current and self._current["role"] != role:
+            self._finish()
+        if self._current is None:
+            self._seq += 1
+            self._current = {"seq": self._seq, "role": role, "parts": [], "created_at": datetime.utcnow()}
+        self._current["parts"].append(text)
+
+    def end_turn(self) -> None:
+        self._finish()
+        task = asyncio.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    def _finish(self) -> None:
+        if not self._current:
+            return
+        content = "".join(self._current.pop("parts")).strip()
+        if content:
+            self._current["content"] = content
+            self._pending.append(self._current)
+        self._current = None
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                await self._persist(batch)
+            except Exception as e:
+                print(f"Transcript persist error ({len(batch)} messages, will retry): {e}")
+                self._pending = batch + self._pending
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stop the periodic flush and persist whatever is left"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        self._finish()
+        await self.flush()
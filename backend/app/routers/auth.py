@@ -1,20 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import Annotated
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_async_db
 from app.models import User
-from app.schemas import Token, TokenData, UserInDB
-from app.core.security import verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
+from app.schemas import Token, UserInDB
+from app.core.user_cache import resolve_principal
+from app.core.password_pool import PasswordPoolBusy, ip_throttle, password_pool, user_throttle
+from app.core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM, DUMMY_PASSWORD_HASH
 from jose import JWTError, jwt
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,11 +30,11 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == token_data.username).first()
+    # Cached per token (see core/user_cache.py); the DB is only hit on a miss
+    user = await resolve_principal(payload)
     if user is None:
         raise credentials_exception
     return user
@@ -37,22 +42,59 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
 def get_user(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
+async def get_user_async(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
 
 async def get_current_active_user(current_user: Annotated[User, Depends(get_current_user)]):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def client_ip(request: Request) -> str:
+    # Each proxy appends the address it received from, so only the rightmost
+    # `trusted_proxy_hops` entries are trustworthy; anything left of them was
+    # sent by the client. The leftmost trusted entry is the client's address.
+    # Too high a count lets a client that bypasses a proxy pick its own IP.
+    forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+    if forwarded and settings.trusted_proxy_hops > 0:
+        return forwarded[max(len(forwarded) - settings.trusted_proxy_hops, 0)]
+    return request.client.host if request.client else "unknown"
+
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
+    # Throttle before any DB or bcrypt work
+    retry_after = ip_throttle.acquire(client_ip(request)) or user_throttle.acquire(form_data.username.lower())
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+    user = await get_user_async(db, username=form_data.username)
     
     # Handle legacy unhashed password if needed (optional migration step, skipping for security)
-    # Check password
-    if not user or not user.hashed_password or not verify_password(form_data.password, user.hashed_password):
+    # Check password (bcrypt runs in the password pool, not on the event loop).
+    # Unknown users are checked against a dummy hash so timing does not reveal which usernames exist
+    try:
+        if user and user.hashed_password:
+            valid = await password_pool.verify(form_data.password, user.hashed_password)
+        else:
+            await password_pool.verify(form_data.password, DUMMY_PASSWORD_HASH)
+            valid = False
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login temporarily overloaded, please retry",
+            headers={"Retry-After": "1"},
+        )
+    if not valid:
          raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -61,7 +103,7 @@ async def login_for_access_token(
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
+        data={"sub": user.username, "role": user.role, "ver": user.token_version or 0},
         expires_delta=access_token_expires
     )
     
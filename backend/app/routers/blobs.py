@@ -0,0 +1,80 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from ..core.blobstore import BLOB_KEY_PATTERN, content_type_for, get_blob_store
+from ..core.list_cache import not_modified
+from ..core.thumbnails import (
+    THUMBNAIL_FORMATS, THUMBNAIL_SIZES, UNREADABLE_IMAGE_ERRORS, get_thumbnail_cache, thumbnails_available
+)
+
+router = APIRouter()
+
+# Keys are content hashes, so a URL's bytes can never change
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Stored bytes are user-supplied: never let a browser sniff them into HTML/script
+NOSNIFF = {"X-Content-Type-Options": "nosniff"}
+
+
+def parse_key(key: str) -> str:
+    match = BLOB_KEY_PATTERN.match(key)
+    if not match:
+        raise HTTPException(status_code=400, detail="Invalid blob key")
+    return match.group(1)
+
+
+def serve_original(key: str, digest: str, request: Request) -> Response:
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, **NOSNIFF}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    data = get_blob_store().get(key)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return Response(content=data, media_type=content_type_for(key), headers=headers)
+
+
+@router.get("/{key}")
+def get_blob(key: str, request: Request):
+    """
+    Content-addressed image (avatars). Public so <img> tags can load it without
+    a bearer token; keys are SHA-256 digests and cannot be enumerated.
+    """
+    return serve_original(key, parse_key(key), request)
+
+
+@router.get("/{key}/thumb")
+def get_blob_thumbnail(key: str, request: Request,
+                       size: int = Query(128),
+                       format: Optional[str] = Query(None, description="webp or jpeg; default from Accept")):
+    """Resized variant of an image blob, rendered once and served from the disk cache"""
+    digest = parse_key(key)
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {list(THUMBNAIL_SIZES)}")
+    if format is not None and format not in THUMBNAIL_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(THUMBNAIL_FORMATS)}")
+
+    if not thumbnails_available():
+        # Pillow not installed: the full image still renders, just heavier
+        return serve_original(key, digest, request)
+
+    headers = {"Cache-Control": IMMUTABLE, **NOSNIFF}
+    fmt = format
+    if fmt is None:
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        headers["Vary"] = "Accept"
+
+    etag = f'"{digest}-{size}-{fmt}"'
+    headers["ETag"] = etag
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        data = get_thumbnail_cache().get(key, size, fmt)
+    except UNREADABLE_IMAGE_ERRORS:
+        # Not a decodable image (e.g. a truncated upload) or too many pixels to decode safely
+        raise HTTPException(status_code=422, detail="Blob is not a readable image")
+    if data is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return Response(content=data, media_type=THUMBNAIL_FORMATS[fmt], headers=headers)
@@ -226,13 +226,18 @@ DEFAULT_ROLES = [
     }
 ]
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from ..database import get_async_db, get_db
 from ..models import Scenario, Role, User
 from datetime import datetime
 import json
 from .auth import get_current_active_user
+from ..core.blobstore import externalize_image
+from ..core.list_cache import bump_version, cached_json_response, list_cache
 
 router = APIRouter()
 
@@ -241,9 +246,14 @@ router = APIRouter()
 # We'll just focus on the endpoints
 
 # --- Pydantic Schemas ---
-from ..schemas import ScenarioRead, ScenarioCreate, RoleRead, RoleCreate
+from ..schemas import ScenarioRead, ScenarioCreate, RoleRead, RoleCreate, ScenarioSummary, RoleSummary
 import uuid
 
+scenario_list_adapter = TypeAdapter(list[ScenarioRead])
+role_list_adapter = TypeAdapter(list[RoleRead])
+scenario_summary_adapter = TypeAdapter(list[ScenarioSummary])
+role_summary_adapter = TypeAdapter(list[RoleSummary])
+
 # --- Helper to Check Admin ---
 def check_admin(user: User):
     if user.role != "admin":
@@ -258,13 +268,16 @@ def seed_defaults(reset: bool = False,
     """
     check_admin(current_user)
     
-    from ..models import SessionRecord
+    from ..models import SessionRecord, SessionMessage
     
     if reset:
         # Dangerous: Delete all history to allow deleting scenarios
+        db.query(SessionMessage).delete()
         db.query(SessionRecord).delete()
         db.query(Scenario).filter(Scenario.is_default == True).delete()
         db.query(Role).filter(Role.is_default == True).delete()
+        bump_version(db, "scenarios")
+        bump_version(db, "roles")
         db.commit()
     
     # 1. Ensure Admin (Self-healing if missing)
@@ -314,7 +327,7 @@ def seed_defaults(reset: bool = False,
                 name_cn=r_data.get("name_cn"),
                 title=r_data.get("title"),
                 avatar_seed=r_data.get("avatar_seed"), 
-                avatar_url=r_data.get("avatarImage"), 
+                avatar_url=externalize_image(r_data.get("avatarImage")), 
                 description=r_data.get("description"),
                 focus_areas=r_data.get("focus_areas"),
                 personality=r_data.get("personality"),
@@ -323,20 +336,50 @@ def seed_defaults(reset: bool = False,
             db.add(new_r)
             added_roles += 1
             
+    bump_version(db, "scenarios")
+    bump_version(db, "roles")
     db.commit()
     return {"status": "success", "message": f"Seeded defaults. Roles added: {added_roles}"}
 
 @router.get("/scenarios", response_model=list[ScenarioRead])
-def get_scenarios(db: Session = Depends(get_db),
-                 current_user: User = Depends(get_current_active_user)):
+async def get_scenarios(request: Request,
+                       db: AsyncSession = Depends(get_async_db),
+                       current_user: User = Depends(get_current_active_user)):
     """List all available scenarios (Defaults + User's Own)"""
     # Show defaults AND user's own scenarios
     # OR show all if admin? Let's stick to visible scope: Defaults + Own
-    scenarios = db.query(Scenario).filter(
-        (Scenario.is_default == True) | 
-        (Scenario.user_id == current_user.id)
-    ).all()
-    return scenarios
+    async def build() -> bytes:
+        result = await db.execute(select(Scenario).where(
+            (Scenario.is_default == True) | 
+            (Scenario.user_id == current_user.id)
+        ))
+        scenarios = result.scalars().all()
+        items = [ScenarioRead.model_validate(s) for s in scenarios]
+        return scenario_list_adapter.dump_json(items, by_alias=True)
+
+    entry = await list_cache.get_or_build(db, "scenarios", current_user.id, build)
+    return cached_json_response(request, entry)
+
+# Declared before /scenarios/{scenario_id} so "summary" is not taken as an id
+@router.get("/scenarios/summary", response_model=list[ScenarioSummary])
+async def get_scenario_summaries(request: Request,
+                                db: AsyncSession = Depends(get_async_db),
+                                current_user: User = Depends(get_current_active_user)):
+    """Card fields only; fetch /scenarios/{id} for workflow, knowledge points and script"""
+    async def build() -> bytes:
+        result = await db.execute(select(Scenario).options(load_only(
+            Scenario.id, Scenario.title, Scenario.subtitle, Scenario.description,
+            Scenario.tags, Scenario.theme, Scenario.last_updated, Scenario.is_default
+        )).where(
+            (Scenario.is_default == True) | 
+            (Scenario.user_id == current_user.id)
+        ))
+        scenarios = result.scalars().all()
+        items = [ScenarioSummary.model_validate(s) for s in scenarios]
+        return scenario_summary_adapter.dump_json(items, by_alias=True)
+
+    entry = await list_cache.get_or_build(db, "scenarios", (current_user.id, "summary"), build)
+    return cached_json_response(request, entry)
 
 @router.post("/scenarios", response_model=ScenarioRead)
 def create_scenario(scenario: ScenarioCreate, 
@@ -363,15 +406,17 @@ def create_scenario(scenario: ScenarioCreate,
         generation_prompt=scenario.generationPrompt
     )
     db.add(db_obj)
+    bump_version(db, "scenarios")
     db.commit()
     db.refresh(db_obj)
     return db_obj
 
 @router.get("/scenarios/{scenario_id}", response_model=ScenarioRead)
-def get_scenario(scenario_id: str, 
-                db: Session = Depends(get_db),
-                current_user: User = Depends(get_current_active_user)):
-    db_obj = db.query(Scenario).filter(Scenario.id == scenario_id).first()
+async def get_scenario(scenario_id: str, 
+                      db: AsyncSession = Depends(get_async_db),
+                      current_user: User = Depends(get_current_active_user)):
+    result = await db.execute(select(Scenario).where(Scenario.id == scenario_id))
+    db_obj = result.scalars().first()
     if not db_obj:
         raise HTTPException(status_code=404, detail="Scenario not found")
     
@@ -411,6 +456,7 @@ def update_scenario(scenario_id: str, scenario: ScenarioCreate,
     db_obj.scoring_dimensions = scenario.scoringDimensions
     db_obj.generation_prompt = scenario.generationPrompt
     
+    bump_version(db, "scenarios")
     db.commit()
     db.refresh(db_obj)
     return db_obj
@@ -431,43 +477,90 @@ def delete_scenario(scenario_id: str,
         raise HTTPException(status_code=403, detail="Cannot delete default scenarios")
     
     db.delete(db_obj)
+    bump_version(db, "scenarios")
     db.commit()
     return {"status": "success"}
 
 # Roles
 
 @router.get("/roles", response_model=list[RoleRead])
-def get_roles(db: Session = Depends(get_db),
-             current_user: User = Depends(get_current_active_user)):
+async def get_roles(request: Request,
+                   db: AsyncSession = Depends(get_async_db),
+                   current_user: User = Depends(get_current_active_user)):
     """List all available roles"""
-    roles = db.query(Role).filter(
-        (Role.is_default == True) | 
-        (Role.user_id == current_user.id)
-    ).all()
-    
-    results = []
-    for r in roles:
-        p = r.personality or {}
-        item = RoleRead(
-            id=r.id,
-            name=r.name,
-            name_cn=r.name_cn,
-            title=r.title,
-            description=r.description,
-            avatar_seed=r.avatar_seed,
-            avatar_url=r.avatar_url,
-            focus_areas=r.focus_areas or [],
-            system_prompt_addon=r.system_prompt_addon,
-            generation_prompt=r.generation_prompt,
-            last_updated=r.last_updated,
-            is_default=r.is_default,
-            personality=p, 
-            hostility=p.get('hostility', 50),
-            verbosity=p.get('verbosity', 50),
-            skepticism=p.get('skepticism', 50)
-        )
-        results.append(item)
-    return results
+    async def build() -> bytes:
+        result = await db.execute(select(Role).where(
+            (Role.is_default == True) | 
+            (Role.user_id == current_user.id)
+        ))
+        roles = result.scalars().all()
+        
+        results = []
+        for r in roles:
+            p = r.personality or {}
+            item = RoleRead(
+                id=r.id,
+                name=r.name,
+                name_cn=r.name_cn,
+                title=r.title,
+                description=r.description,
+                avatar_seed=r.avatar_seed,
+                avatar_url=r.avatar_url,
+                focus_areas=r.focus_areas or [],
+                system_prompt_addon=r.system_prompt_addon,
+                generation_prompt=r.generation_prompt,
+                last_updated=r.last_updated,
+                is_default=r.is_default,
+                personality=p, 
+                hostility=p.get('hostility', 50),
+                verbosity=p.get('verbosity', 50),
+                skepticism=p.get('skepticism', 50)
+            )
+            results.append(item)
+        return role_list_adapter.dump_json(results, by_alias=True)
+
+    entry = await list_cache.get_or_build(db, "roles", current_user.id, build)
+    return cached_json_response(request, entry)
+
+# Declared before /roles/{role_id} so "summary" is not taken as an id
+@router.get("/roles/summary", response_model=list[RoleSummary])
+async def get_role_summaries(request: Request,
+                            db: AsyncSession = Depends(get_async_db),
+                            current_user: User = Depends(get_current_active_user)):
+    """Card fields only; fetch /roles/{id} for the prompt add-ons"""
+    async def build() -> bytes:
+        result = await db.execute(select(Role).options(load_only(
+            Role.id, Role.name, Role.name_cn, Role.title, Role.description,
+            Role.avatar_seed, Role.avatar_url, Role.focus_areas, Role.personality,
+            Role.last_updated, Role.is_default
+        )).where(
+            (Role.is_default == True) | 
+            (Role.user_id == current_user.id)
+        ))
+        roles = result.scalars().all()
+        
+        results = []
+        for r in roles:
+            p = r.personality or {}
+            results.append(RoleSummary(
+                id=r.id,
+                name=r.name,
+                name_cn=r.name_cn,
+                title=r.title,
+                description=r.description,
+                avatar_seed=r.avatar_seed,
+                avatar_url=r.avatar_url,
+                focus_areas=r.focus_areas or [],
+                last_updated=r.last_updated,
+                is_default=r.is_default,
+                hostility=p.get('hostility', 50),
+                verbosity=p.get('verbosity', 50),
+                skepticism=p.get('skepticism', 50)
+            ))
+        return role_summary_adapter.dump_json(results, by_alias=True)
+
+    entry = await list_cache.get_or_build(db, "roles", (current_user.id, "summary"), build)
+    return cached_json_response(request, entry)
 
 @router.post("/roles", response_model=RoleRead)
 def create_role(role: RoleCreate, 
@@ -491,13 +584,14 @@ def create_role(role: RoleCreate,
         title=role.title,
         description=role.description,
         avatar_seed=role.avatarSeed,
-        avatar_url=role.avatarImage,
+        avatar_url=externalize_image(role.avatarImage),
         focus_areas=role.focusAreas,
         personality=personality_json, 
         system_prompt_addon=role.systemPromptAddon,
         generation_prompt=role.generationPrompt
     )
     db.add(db_obj)
+    bump_version(db, "roles")
     db.commit()
     db.refresh(db_obj)
     
@@ -521,10 +615,11 @@ def create_role(role: RoleCreate,
     )
 
 @router.get("/roles/{role_id}", response_model=RoleRead)
-def get_role(role_id: str, 
-            db: Session = Depends(get_db),
-            current_user: User = Depends(get_current_active_user)):
-    db_obj = db.query(Role).filter(Role.id == role_id).first()
+async def get_role(role_id: str, 
+                  db: AsyncSession = Depends(get_async_db),
+                  current_user: User = Depends(get_current_active_user)):
+    result = await db.execute(select(Role).where(Role.id == role_id))
+    db_obj = result.scalars().first()
     if not db_obj:
         raise HTTPException(status_code=404, detail="Role not found")
     
@@ -576,12 +671,13 @@ def update_role(role_id: str, role: RoleCreate,
     db_obj.title = role.title
     db_obj.description = role.description
     db_obj.avatar_seed = role.avatarSeed
-    db_obj.avatar_url = role.avatarImage
+    db_obj.avatar_url = externalize_image(role.avatarImage)
     db_obj.focus_areas = role.focusAreas
     db_obj.personality = personality_json
     db_obj.system_prompt_addon = role.systemPromptAddon
     db_obj.generation_prompt = role.generationPrompt
     
+    bump_version(db, "roles")
     db.commit()
     db.refresh(db_obj)
     
@@ -620,5 +716,6 @@ def delete_role(role_id: str,
         raise HTTPException(status_code=403, detail="Cannot delete default roles")
     
     db.delete(db_obj)
+    bump_version(db, "roles")
     db.commit()
     return {"status": "success"}
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from typing import List, Optional, Any, Union
 from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
+import os
+import base64
 import uuid
 import random
 
-from ..database import get_db
-from ..models import SessionRecord, User
+from ..audio.peaks import build_peak_index_from_wav, load_peak_level
+from ..audio.recorder import PEAKS_SUFFIX, recording_path
+from ..database import get_async_db, get_db
+from ..models import SessionMessage, SessionRecord, User
 from .auth import get_current_active_user
 
 router = APIRouter()
@@ -25,6 +32,11 @@ class SessionBase(BaseModel):
     model_config = ConfigDict(populate_by_name=True, from_attributes=True)
 
 class SessionCreate(SessionBase):
+    # Record already created by the WS relay ('historyId' in 'session.created')
+    id: Optional[str] = None
+    # Relay recording to attach (from the 'session.created' WS message)
+    recordingId: Optional[str] = None
+
     @classmethod
     def validate_messages(cls, v):
         if v and len(v) > 500:
@@ -50,28 +62,156 @@ class SessionRead(SessionBase):
     audioUrl: Optional[str] = Field(None, validation_alias="audio_url", serialization_alias="audioUrl")
     model_config = ConfigDict(populate_by_name=True, from_attributes=True)
 
+class SessionSummary(BaseModel):
+    """List projection: everything except the messages / aiAnalysis blobs"""
+    id: str
+    scenarioId: str = Field(validation_alias="scenario_id", serialization_alias="scenarioId")
+    roleId: str = Field(validation_alias="role_id", serialization_alias="roleId")
+    score: int
+    durationSeconds: int = Field(validation_alias="duration_seconds", serialization_alias="durationSeconds")
+    startTime: datetime = Field(validation_alias="start_time", serialization_alias="startTime")
+    endTime: datetime = Field(validation_alias="end_time", serialization_alias="endTime")
+    audioUrl: Optional[str] = Field(None, validation_alias="audio_url", serialization_alias="audioUrl")
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True)
+
 class SessionUpdate(BaseModel):
     score: Optional[int] = None
     aiAnalysis: Optional[dict] = Field(None, validation_alias="ai_analysis", serialization_alias="aiAnalysis")
     messages: Optional[List[dict]] = None
     model_config = ConfigDict(populate_by_name=True)
 
+# --- Helpers ---
+
+def persisted_messages_query(records: List[SessionRecord]):
+    return select(SessionMessage).where(
+        SessionMessage.session_id.in_([r.id for r in records])
+    ).order_by(SessionMessage.session_id, SessionMessage.seq)
+
+def attach_messages(records: List[SessionRecord], rows: List[SessionMessage]) -> List[SessionRead]:
+    rows_by_session = {}
+    for row in rows:
+        rows_by_session.setdefault(row.session_id, []).append({
+            "id": f"{row.session_id}_{row.seq}",
+            "role": row.role,
+            "type": "text",
+            "content": row.content,
+            "timestamp": row.created_at.isoformat() if row.created_at else None
+        })
+
+    results = []
+    for record in records:
+        item = SessionRead.model_validate(record)
+        if record.id in rows_by_session:
+            item.messages = rows_by_session[record.id]
+        results.append(item)
+    return results
+
+def with_persisted_messages(db: Session, records: List[SessionRecord]) -> List[SessionRead]:
+    """
+    Serialize records, taking messages from session_messages when the relay
+    persisted them (one query for the whole page) and from the legacy JSON
+    column otherwise.
+    """
+    rows = db.execute(persisted_messages_query(records)).scalars().all() if records else []
+    return attach_messages(records, rows)
+
+async def with_persisted_messages_async(db: AsyncSession, records: List[SessionRecord]) -> List[SessionRead]:
+    """Async variant of `with_persisted_messages`"""
+    rows = (await db.execute(persisted_messages_query(records))).scalars().all() if records else []
+    return attach_messages(records, rows)
+
+def encode_cursor(record: SessionRecord) -> str:
+    raw = f"{record.start_time.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode("ascii")
+
+def decode_cursor(cursor: str):
+    try:
+        start, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(start), record_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 # --- Endpoints ---
 
-@router.get("", response_model=List[SessionRead])
-def read_sessions(skip: int = 0, limit: int = 100, 
-                 db: Session = Depends(get_db),
-                 current_user: User = Depends(get_current_active_user)):
-    sessions = db.query(SessionRecord).filter(
-        SessionRecord.user_id == current_user.id
-    ).order_by(SessionRecord.start_time.desc()).offset(skip).limit(limit).all()
-    return sessions
+@router.get("", response_model=Union[List[SessionRead], List[SessionSummary]])
+async def read_sessions(response: Response,
+                       skip: int = 0, limit: int = Query(100, ge=1, le=500),
+                       cursor: Optional[str] = None,
+                       fields: Optional[str] = Query(None, pattern="^(full|summary)$"),
+                       db: AsyncSession = Depends(get_async_db),
+                       current_user: User = Depends(get_current_active_user)):
+    """
+    Newest first. Pass the `X-Next-Cursor` response header back as `cursor`
+    for the next page (keyset on start_time, id); `skip` is kept for old clients.
+    `fields=summary` omits messages and aiAnalysis.
+    """
+    query = select(SessionRecord).where(SessionRecord.user_id == current_user.id)
+
+    summary = fields == "summary"
+    if summary:
+        query = query.options(load_only(
+            SessionRecord.id, SessionRecord.scenario_id, SessionRecord.role_id,
+            SessionRecord.score, SessionRecord.duration_seconds,
+            SessionRecord.start_time, SessionRecord.end_time, SessionRecord.audio_url
+        ))
+
+    if cursor:
+        start, record_id = decode_cursor(cursor)
+        query = query.where(or_(
+            SessionRecord.start_time < start,
+            and_(SessionRecord.start_time == start, SessionRecord.id < record_id)
+        ))
+    elif skip:
+        query = query.offset(skip)
+
+    result = await db.execute(query.order_by(
+        SessionRecord.start_time.desc(), SessionRecord.id.desc()
+    ).limit(limit))
+    sessions = result.scalars().all()
+
+    if len(sessions) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(sessions[-1])
+
+    if summary:
+        return [SessionSummary.model_validate(s) for s in sessions]
+    return await with_persisted_messages_async(db, sessions)
 
 @router.post("", response_model=SessionRead)
 def create_session(session: SessionCreate, 
                   db: Session = Depends(get_db),
                   current_user: User = Depends(get_current_active_user)):
     
+    audio_url = None
+    if session.recordingId:
+        try:
+            if os.path.exists(recording_path(current_user.id, session.recordingId)):
+                audio_url = f"/api/history/recordings/{session.recordingId}"
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid recordingId")
+
+    # Finalize a record the relay created during the session (any other id is client-local)
+    db_session = None
+    if session.id:
+        db_session = db.query(SessionRecord).filter(
+            SessionRecord.id == session.id,
+            SessionRecord.user_id == current_user.id
+        ).first()
+    if db_session:
+        db_session.score = session.score
+        db_session.duration_seconds = session.durationSeconds
+        db_session.ai_analysis = session.aiAnalysis
+        if session.endTime:
+            db_session.end_time = session.endTime
+        if audio_url:
+            db_session.audio_url = audio_url
+        # Server-side transcript is authoritative; keep the blob only as a fallback
+        has_rows = db.query(SessionMessage.id).filter(SessionMessage.session_id == db_session.id).first()
+        if not has_rows:
+            db_session.messages = session.messages
+        db.commit()
+        db.refresh(db_session)
+        return with_persisted_messages(db, [db_session])[0]
+
     db_session = SessionRecord(
         id=str(uuid.uuid4()),
         user_id=current_user.id,
@@ -82,12 +222,75 @@ def create_session(session: SessionCreate,
         messages=session.messages,
         ai_analysis=session.aiAnalysis,
         start_time=session.startTime or datetime.utcnow(),
-        end_time=session.endTime or datetime.utcnow()
+        end_time=session.endTime or datetime.utcnow(),
+        audio_url=audio_url
     )
     db.add(db_session)
     db.commit()
     db.refresh(db_session)
-    return db_session
+    return with_persisted_messages(db, [db_session])[0]
+
+@router.get("/recordings/{recording_id}")
+def get_recording(recording_id: str,
+                  current_user: User = Depends(get_current_active_user)):
+    """Stereo session recording (left = user, right = model) written by the WS relay"""
+    try:
+        path = recording_path(current_user.id, recording_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid recording id")
+
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Recording not found")
+
+    return FileResponse(path, media_type="audio/wav", filename=f"{recording_id}.wav")
+
+@router.get("/recordings/{recording_id}/peaks")
+def get_recording_peaks(recording_id: str, response: Response,
+                        points: int = Query(2000, ge=1, le=200000),
+                        current_user: User = Depends(get_current_active_user)):
+    """
+    Precomputed waveform for a recording: per-channel peak and RMS as base64 int8
+    arrays (0-127), at the finest zoom level with at most `points` entries.
+    """
+    try:
+        wav_path = recording_path(current_user.id, recording_id)
+        index_path = recording_path(current_user.id, recording_id, PEAKS_SUFFIX)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid recording id")
+
+    if not os.path.exists(index_path):
+        if not os.path.exists(wav_path):
+            raise HTTPException(status_code=404, detail="Recording not found")
+        # Recordings made before indexing existed: build once, then serve from disk
+        build_peak_index_from_wav(wav_path, index_path)
+
+    level = load_peak_level(index_path, points)
+    response.headers["Cache-Control"] = "private, max-age=3600"
+    return {
+        "sampleRate": level["sample_rate"],
+        "samplesPerPoint": level["samples_per_point"],
+        "level": level["level"],
+        "levels": level["levels"],
+        "channels": ["user", "model"],
+        "length": len(level["peaks"][0]) if level["peaks"] else 0,
+        "peaks": [base64.b64encode(p.tobytes()).decode("ascii") for p in level["peaks"]],
+        "rms": [base64.b64encode(r.tobytes()).decode("ascii") for r in level["rms"]],
+    }
+
+@router.get("/{session_id}", response_model=SessionRead)
+async def read_session(session_id: str,
+                       db: AsyncSession = Depends(get_async_db),
+                       current_user: User = Depends(get_current_active_user)):
+    """Full record including messages and aiAnalysis"""
+    query = select(SessionRecord).where(SessionRecord.id == session_id)
+    if current_user.role != 'admin':
+        query = query.where(SessionRecord.user_id == current_user.id)
+    db_session = (await db.execute(query)).scalars().first()
+
+    if not db_session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return (await with_persisted_messages_async(db, [db_session]))[0]
 
 @router.delete("/{session_id}")
 def delete_session(session_id: str, 
@@ -131,7 +334,7 @@ def update_session(session_id: str, update_data: SessionUpdate,
         
     db.commit()
     db.refresh(db_session)
-    return db_session
+    return with_persisted_messages(db, [db_session])[0]
 
 @router.post("/seed")
 def seed_test_data(db: Session = Depends(get_db),
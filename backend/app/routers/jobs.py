@@ -0,0 +1,67 @@
+"""
+Jobs Router - Submit, poll and cancel background generation jobs
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from ..core.jobs import CANCELLED, FINISHED, job_queue
+from ..core.quotas import QuotaExceeded, quotas
+from ..database import get_async_db
+from ..models import Job, User
+from ..schemas import JobCreate, JobRead
+from .auth import get_current_active_user
+
+router = APIRouter()
+
+
+@router.post("", response_model=JobRead, status_code=202)
+async def submit_job(job_in: JobCreate, current_user: User = Depends(get_current_active_user)):
+    """
+    Queue a job, e.g. {"kind": "image-generate", "params": {"prompt": "..."}}.
+    Params are the body of the matching /api/models/tools/* endpoint. Poll
+    GET /api/jobs/{id} (or listen on /ws/jobs) for the result.
+    """
+    try:
+        await quotas.check_rate(current_user)
+    except QuotaExceeded as e:
+        raise e.as_http()
+    try:
+        return await job_queue.submit(current_user.id, job_in.kind, job_in.params)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{job_in.kind}'")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+
+@router.get("", response_model=List[JobRead])
+async def list_jobs(status: Optional[str] = Query(None),
+                    limit: int = Query(20, ge=1, le=100),
+                    db: AsyncSession = Depends(get_async_db),
+                    current_user: User = Depends(get_current_active_user)):
+    """Current user's jobs, newest first"""
+    query = select(Job).where(Job.user_id == current_user.id)
+    if status:
+        query = query.where(Job.status == status)
+    result = await db.execute(query.order_by(Job.created_at.desc()).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/{job_id}", response_model=JobRead)
+async def read_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    job = await job_queue.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=JobRead)
+async def cancel_job(job_id: str, current_user: User = Depends(get_current_active_user)):
+    job = await job_queue.cancel(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in FINISHED and job.status != CANCELLED:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return job
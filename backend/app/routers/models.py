@@ -1,20 +1,31 @@
 """
 Models API Router - List and get model capabilities
 """
-from fastapi import APIRouter, HTTPException, Response, Body, Depends
+from fastapi import APIRouter, HTTPException, Query, Request, Response, Body, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import User
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
-import httpx
+from ..database import AsyncSessionLocal, get_db
+from ..models import Role, User
+from ..schemas import JobRead
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Tuple
+from pydantic import BaseModel, Field
+import asyncio
 import base64
+import httpx
 import struct
 import json
 from .auth import get_current_active_user
 
 from app.config import settings
-from app.adapters.base import ModelCapabilities
+from app.core.http_client import http_pool
+from app.core.blobstore import externalize_image
+from app.core.jobs import JobContext, JobError, job_queue
+from app.core.list_cache import bump_version, cached_json_response, not_modified
+from app.core.quotas import QuotaExceeded, quotas, tool_quota
+from app.core.rate_limit import ProviderRateLimits
+from app.core.model_catalog import model_catalog
+from app.core.single_flight import generation_flight, request_key
+from app.core.preview_cache import PREVIEW_MEDIA_TYPES, preview_cache, preview_flight, preview_key
 from app.adapters.gemini import GeminiAdapter
 
 def get_user_api_key(db: Session, user: User) -> Optional[str]:
@@ -25,60 +36,13 @@ def get_user_api_key(db: Session, user: User) -> Optional[str]:
 
 router = APIRouter()
 
-# Registry from common module
-from ..registry import ADAPTERS
-
 
 @router.get("", response_model=List[dict])
-async def list_models(response: Response, current_user: User = Depends(get_current_active_user)):
+async def list_models(request: Request, current_user: User = Depends(get_current_active_user)):
     """List all available voice models"""
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    models = []
-    for adapter_id, adapter_cls in ADAPTERS.items():
-        # Instantiate adapter to get capabilities
-        adapter = adapter_cls()
-        cap = adapter.capabilities
-        # Determine if enabled based on keys (Server OR User)
-        is_enabled = cap.is_enabled
-        
-        # Key check logic
-        user_settings = current_user.settings if current_user and current_user.settings else {}
-        
-        if "gemini" in adapter_id.lower():
-            has_server_key = bool(settings.gemini_api_key)
-            has_user_key = bool(user_settings.get("customApiKey"))
-            is_enabled = has_server_key or has_user_key
-        elif "openai" in adapter_id.lower() or "gpt" in adapter_id.lower():
-            has_server_key = bool(settings.openai_api_key)
-            has_user_key = bool(user_settings.get("customOpenaiKey"))
-            is_enabled = has_server_key or has_user_key
-        elif "grok" in adapter_id.lower():
-            has_server_key = bool(settings.xai_api_key)
-            has_user_key = bool(user_settings.get("customXaiKey"))
-            is_enabled = has_server_key or has_user_key
-        elif "tongyi" in adapter_id.lower() or "qwen" in adapter_id.lower():
-            has_server_key = bool(getattr(settings, "dashscope_api_key", None) or os.getenv("DASHSCOPE_API_KEY"))
-            has_user_key = bool(user_settings.get("customQwenKey"))
-            is_enabled = has_server_key or has_user_key
-        elif "doubao" in adapter_id.lower():
-            has_server_key = bool(settings.volc_app_id and settings.volc_access_key)
-            has_user_key = bool(user_settings.get("customDoubaoKey"))
-            is_enabled = has_server_key or has_user_key
-        elif "elevenlabs" in adapter_id.lower():
-            has_server_key = bool(settings.elevenlabs_api_key and settings.elevenlabs_agent_id)
-            has_user_key = bool(user_settings.get("customElevenLabsKey"))
-            is_enabled = has_server_key or has_user_key
-        # Add other providers here as needed (e.g. minimax)
-
-        models.append({
-            "id": cap.id,
-            "name": cap.name,
-            "provider": cap.provider,
-            "isEnabled": is_enabled,
-            "defaultVoice": cap.default_voice,
-            "supportsTranscription": cap.supports_transcription
-        })
-    return models
+    # Enablement depends on the user's own keys, so clients revalidate (ETag) instead of caching
+    entry = model_catalog.list_body(current_user.settings if current_user else None)
+    return cached_json_response(request, entry)
 
 
 @router.get("/scenario", response_model=List[dict])
@@ -100,174 +64,230 @@ async def list_scenario_models():
     ]
 
 
-@router.get("/{model_id}")
-async def get_model(model_id: str):
-    """Get detailed capabilities for a specific model"""
-    if model_id not in ADAPTERS:
-        raise HTTPException(status_code=404, detail=f"Model '{model_id}' not found")
-    
-    adapter_cls = ADAPTERS[model_id]
-    adapter = adapter_cls()
-    cap = adapter.capabilities
-    
-    return {
-        "id": cap.id,
-        "name": cap.name,
-        "provider": cap.provider,
-        "isEnabled": cap.is_enabled,
-        "supportedSampleRates": cap.supported_sample_rates,
-        "supportedEncodings": cap.supported_encodings,
-        "defaultSampleRate": cap.default_sample_rate,
-        "defaultEncoding": cap.default_encoding,
-        "availableVoices": cap.available_voices,
-        "defaultVoice": cap.default_voice,
-        "supportsTranscription": cap.supports_transcription,
-        "supportsInterruption": cap.supports_interruption,
-        "maxSessionDuration": cap.max_session_duration
-    }
-
-
-@router.get("/{model_id}/voices")
-async def get_model_voices(model_id: str):
-    """Get available voices for a specific model"""
-    if model_id not in ADAPTERS:
-        raise HTTPException(status_code=404, detail=f"Model '{model_id}' not found")
-    
-    adapter_cls = ADAPTERS[model_id]
-    adapter = adapter_cls()
-    return adapter.capabilities.available_voices
+DEFAULT_PREVIEW_TEXT = "Hello, this is a voice preview."
 
 
 class PreviewRequest(BaseModel):
     modelId: str
     voiceId: str
-    text: Optional[str] = "Hello, this is a voice preview."
+    text: Optional[str] = DEFAULT_PREVIEW_TEXT
 
 
-@router.post("/preview")
-async def preview_voice(req: PreviewRequest):
-    """Generate a short audio preview for the selected voice"""
-    
-    # 1. OpenAI Handling
-    if req.modelId.startswith("openai") or "gpt" in req.modelId:
-        if not settings.openai_api_key:
-             raise HTTPException(status_code=400, detail="OpenAI API Key not configured")
+OPENAI_TTS_MODEL = "tts-1" # Standard TTS model
+GEMINI_TTS_MODEL = "gemini-2.5-flash-native-audio-preview-09-2025" # Hardcoded best model for audio
+
+# Previews are cached per (model, voice, text); browsers may keep them a day
+PREVIEW_CACHE_CONTROL = "private, max-age=86400"
 
-        try:
-            async with httpx.AsyncClient() as client:
-                # https://platform.openai.com/docs/api-reference/audio/createSpeech
-                res = await client.post(
-                    "https://api.openai.com/v1/audio/speech",
-                    headers={
-                        "Authorization": f"Bearer {settings.openai_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "tts-1", # Standard TTS model
-                        "input": req.text,
-                        "voice": req.voiceId.lower() # OpenAI voices are lowercase
-                    },
-                    timeout=10.0
-                )
-                
-                if res.status_code != 200:
-                    print(f"OpenAI TTS Error: {res.text}")
-                    raise HTTPException(status_code=res.status_code, detail=f"Provider Error: {res.text}")
-                
-                return Response(content=res.content, media_type="audio/mpeg")
-                
-        except Exception as e:
-            print(f"TTS Exception: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
 
-    # 2. Gemini Handling
-    elif req.modelId.startswith("gemini"):
-        if not settings.gemini_api_key:
-             raise HTTPException(status_code=400, detail="Gemini API Key not configured")
+def preview_provider(model_id: str) -> Optional[str]:
+    if model_id.startswith("openai") or "gpt" in model_id:
+        return "openai"
+    if model_id.startswith("gemini"):
+        return "gemini"
+    return None
+
+
+def create_wav_header(pcm_data_len: int, sample_rate: int = 24000) -> bytes:
+    """WAV header for 16-bit mono PCM"""
+    # RIFF chunk
+    header = b'RIFF'
+    header += struct.pack('<I', 36 + pcm_data_len) # File size - 8
+    header += b'WAVE'
+
+    # fmt chunk
+    header += b'fmt '
+    header += struct.pack('<I', 16) # Chunk size (16 for PCM)
+    header += struct.pack('<H', 1)  # Audio format (1 for PCM)
+    header += struct.pack('<H', 1)  # Num channels (1 for Mono)
+    header += struct.pack('<I', sample_rate) # Sample rate
+    header += struct.pack('<I', sample_rate * 2) # Byte rate (SampleRate * NumChannels * BitsPerSample/8)
+    header += struct.pack('<H', 2)  # Block align (NumChannels * BitsPerSample/8)
+    header += struct.pack('<H', 16) # Bits per sample
+
+    # data chunk
+    header += b'data'
+    header += struct.pack('<I', pcm_data_len)
+    return header
+
+
+async def synthesize_openai_preview(voice_id: str, text: str) -> bytes:
+    if not settings.openai_api_key:
+         raise HTTPException(status_code=400, detail="OpenAI API Key not configured")
+
+    try:
+        client = http_pool.client("api.openai.com")
+        # https://platform.openai.com/docs/api-reference/audio/createSpeech
+        res = await client.post(
+            "https://api.openai.com/v1/audio/speech",
+            headers={
+                "Authorization": f"Bearer {settings.openai_api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": OPENAI_TTS_MODEL,
+                "input": text,
+                "voice": voice_id.lower() # OpenAI voices are lowercase
+            },
+            timeout=10.0
+        )
+
+        if res.status_code != 200:
+            print(f"OpenAI TTS Error: {res.text}")
+            raise HTTPException(status_code=res.status_code, detail=f"Provider Error: {res.text}")
+
+        return res.content
+
+    except Exception as e:
+        print(f"TTS Exception: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def synthesize_gemini_preview(voice_id: str, text: str) -> bytes:
+    if not settings.gemini_api_key:
+         raise HTTPException(status_code=400, detail="Gemini API Key not configured")
+
+    try:
+        client = http_pool.client("generativelanguage.googleapis.com")
+        url = f"https://generativelanguage.googleapis.com/v1alpha/models/{GEMINI_TTS_MODEL}:generateContent?key={settings.gemini_api_key}"
+
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": f"Please say: {text}"
+                }]
+            }],
+            "generation_config": {
+               "response_modalities": ["AUDIO"],
+               "speech_config": {
+                  "voice_config": {
+                      "prebuilt_voice_config": {
+                          "voice_name": voice_id
+                      }
+                  }
+               }
+            }
+        }
 
+        res = await client.post(
+            url,
+            json=payload,
+            timeout=15.0
+        )
+
+        if res.status_code != 200:
+            print(f"Gemini TTS Error: {res.text}")
+            if res.status_code == 404:
+                 # Fallback for preview model unavailability
+                 raise HTTPException(status_code=501, detail="Voice preview not supported by this model")
+            raise HTTPException(status_code=res.status_code, detail=f"Gemini Error: {res.text}")
+
+        data = res.json()
+        # Extract inlineData
+        # Response structure: candidates[0].content.parts[0].inlineData.data (Base64)
         try:
-            # Helper to create WAV header for 24kHz, 16-bit, Mono
-            def create_wav_header(pcm_data_len: int, sample_rate: int = 24000) -> bytes:
-                # RIFF chunk
-                header = b'RIFF'
-                header += struct.pack('<I', 36 + pcm_data_len) # File size - 8
-                header += b'WAVE'
-                
-                # fmt chunk
-                header += b'fmt '
-                header += struct.pack('<I', 16) # Chunk size (16 for PCM)
-                header += struct.pack('<H', 1)  # Audio format (1 for PCM)
-                header += struct.pack('<H', 1)  # Num channels (1 for Mono)
-                header += struct.pack('<I', sample_rate) # Sample rate
-                header += struct.pack('<I', sample_rate * 2) # Byte rate (SampleRate * NumChannels * BitsPerSample/8)
-                header += struct.pack('<H', 2)  # Block align (NumChannels * BitsPerSample/8)
-                header += struct.pack('<H', 16) # Bits per sample
-                
-                # data chunk
-                header += b'data'
-                header += struct.pack('<I', pcm_data_len)
-                return header
-
-            async with httpx.AsyncClient() as client:
-                model_name = "gemini-2.5-flash-native-audio-preview-09-2025" # Hardcoded best model for audio
-                url = f"https://generativelanguage.googleapis.com/v1alpha/models/{model_name}:generateContent?key={settings.gemini_api_key}"
-                
-                payload = {
-                    "contents": [{
-                        "parts": [{
-                            "text": f"Please say: {req.text}"
-                        }]
-                    }],
-                    "generation_config": {
-                       "response_modalities": ["AUDIO"],
-                       "speech_config": {
-                          "voice_config": {
-                              "prebuilt_voice_config": {
-                                  "voice_name": req.voiceId
-                              }
-                          }
-                       }
-                    }
-                }
-                
-                res = await client.post(
-                    url,
-                    json=payload,
-                    timeout=15.0
-                )
-                
-                if res.status_code != 200:
-                    print(f"Gemini TTS Error: {res.text}")
-                    if res.status_code == 404:
-                         # Fallback for preview model unavailability
-                         raise HTTPException(status_code=501, detail="Voice preview not supported by this model")
-                    raise HTTPException(status_code=res.status_code, detail=f"Gemini Error: {res.text}")
-                
-                data = res.json()
-                # Extract inlineData
-                # Response structure: candidates[0].content.parts[0].inlineData.data (Base64)
-                try:
-                    b64_data = data["candidates"][0]["content"]["parts"][0]["inlineData"]["data"]
-                    pcm_bytes = base64.b64decode(b64_data)
-                    
-                    # Create WAV container
-                    wav_header = create_wav_header(len(pcm_bytes))
-                    wav_data = wav_header + pcm_bytes
-                    
-                    return Response(content=wav_data, media_type="audio/wav")
-                    
-                except (KeyError, IndexError) as ignored:
-                    print(f"Gemini Unexpected Response: {data}")
-                    raise HTTPException(status_code=502, detail="Invalid response format from Gemini")
-                    
-        except Exception as e:
-            print(f"Gemini TTS Exception: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
+            b64_data = data["candidates"][0]["content"]["parts"][0]["inlineData"]["data"]
+            pcm_bytes = base64.b64decode(b64_data)
+
+            # Create WAV container
+            return create_wav_header(len(pcm_bytes)) + pcm_bytes
+
+        except (KeyError, IndexError) as ignored:
+            print(f"Gemini Unexpected Response: {data}")
+            raise HTTPException(status_code=502, detail="Invalid response format from Gemini")
+
+    except Exception as e:
+        print(f"Gemini TTS Exception: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-    else:
+def preview_tts(model_id: str, voice_id: str, text: str) -> Tuple[str, str, str, Any]:
+    """(provider, TTS model, file extension, synthesize) for a valid preview request, else HTTP 400"""
+    provider = preview_provider(model_id)
+    if provider is None or model_id not in model_catalog.voices:
         raise HTTPException(status_code=400, detail="Unsupported model for preview")
+    # Only the model's own voices and short texts: every distinct clip is a paid call and a cache entry
+    if voice_id not in {v["id"] for v in model_catalog.voices[model_id]}:
+        raise HTTPException(status_code=400, detail=f"Unknown voice '{voice_id}' for {model_id}")
+    if len(text) > settings.preview_max_text_chars:
+        raise HTTPException(status_code=400, detail=f"Preview text is limited to {settings.preview_max_text_chars} characters")
+
+    if provider == "openai":
+        # The key uses the TTS model, not the chat model: every GPT adapter shares clips
+        return provider, OPENAI_TTS_MODEL, "mp3", synthesize_openai_preview
+    return provider, GEMINI_TTS_MODEL, "wav", synthesize_gemini_preview
+
+
+async def get_preview(model_id: str, voice_id: str, text: str,
+                      user: Optional[User] = None) -> Tuple[str, bytes, str]:
+    """
+    (cache key, audio, media type) for a voice preview, synthesized on a cache
+    miss; a miss is charged to `user`'s tool quota (None for the warm-up script)
+    """
+    provider, tts_model, ext, synthesize = preview_tts(model_id, voice_id, text)
+    key = preview_key(tts_model, voice_id, text)
+    audio = await preview_cache.get(key, ext)
+    if audio is None:
+        async def synthesize_and_store() -> bytes:
+            clip = await synthesize(voice_id, text)
+            await preview_cache.put(key, ext, clip)
+            return clip
+
+        if user is None:
+            audio = await preview_flight.do(key, synthesize_and_store)
+        else:
+            async with tool_quota(user, provider):
+                audio = await preview_flight.do(key, synthesize_and_store)
+    return key, audio, PREVIEW_MEDIA_TYPES[ext]
+
+
+async def preview_response(request: Request, model_id: str, voice_id: str, text: str, user: User) -> Response:
+    # ETag is derivable without the audio, so revalidation never synthesizes
+    _, tts_model, _, _ = preview_tts(model_id, voice_id, text)
+    etag = f'"{preview_key(tts_model, voice_id, text)}"'
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": PREVIEW_CACHE_CONTROL})
+
+    key, audio, media_type = await get_preview(model_id, voice_id, text, user)
+    return Response(
+        content=audio,
+        media_type=media_type,
+        headers={"ETag": f'"{key}"', "Cache-Control": PREVIEW_CACHE_CONTROL},
+    )
+
+
+# Declared before /{model_id} so "preview" is not taken as a model id
+@router.get("/preview")
+async def get_voice_preview(request: Request,
+                            modelId: str = Query(...),
+                            voiceId: str = Query(...),
+                            text: str = Query(DEFAULT_PREVIEW_TEXT),
+                            current_user: User = Depends(get_current_active_user)):
+    """Cacheable form of POST /preview (GET, so the browser HTTP cache applies)"""
+    return await preview_response(request, modelId, voiceId, text, current_user)
 
 
+@router.post("/preview")
+async def preview_voice(req: PreviewRequest, request: Request,
+                        current_user: User = Depends(get_current_active_user)):
+    """Generate a short audio preview for the selected voice"""
+    return await preview_response(request, req.modelId, req.voiceId, req.text or DEFAULT_PREVIEW_TEXT, current_user)
+
+
+@router.get("/{model_id}")
+async def get_model(model_id: str):
+    """Get detailed capabilities for a specific model"""
+    if model_id not in model_catalog.details:
+        raise HTTPException(status_code=404, detail=f"Model '{model_id}' not found")
+    return model_catalog.details[model_id]
+
+
+@router.get("/{model_id}/voices")
+async def get_model_voices(model_id: str):
+    """Get available voices for a specific model"""
+    if model_id not in model_catalog.voices:
+        raise HTTPException(status_code=404, detail=f"Model '{model_id}' not found")
+    return model_catalog.voices[model_id]
 
 
 class ScenarioRequest(BaseModel):
@@ -275,11 +295,9 @@ class ScenarioRequest(BaseModel):
     model: Optional[str] = "gemini-2.5-flash"
     generation_config: Optional[Dict[str, Any]] = None
 
-@router.post("/tools/scenario-generate")
-async def generate_scenario(req: ScenarioRequest, 
-                           db: Session = Depends(get_db),
-                           current_user: User = Depends(get_current_active_user)):
-    """Proxy request to Gemini for scenario generation (secures API Key)"""
+
+def scenario_call(req: ScenarioRequest, db: Session, current_user: User) -> Tuple[str, str, dict]:
+    """(model, API key, request payload) for a scenario generation call"""
     user_key = get_user_api_key(db, current_user)
     api_key = user_key or settings.gemini_api_key
 
@@ -292,36 +310,144 @@ async def generate_scenario(req: ScenarioRequest,
     # Direct pass-through (Validated that 2.5/3.0 exist in this environment)
     if not model_name.startswith("gemini"):
          raise HTTPException(status_code=400, detail="Only Gemini models are supported for this endpoint")
-    
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
 
     payload = {"contents": req.contents}
     if req.generation_config:
         payload["generation_config"] = req.generation_config
+    return model_name, api_key, payload
 
-    async with httpx.AsyncClient() as client:
-        try:
-            res = await client.post(
-                url,
-                json=payload,
-                timeout=60.0 # Allow longer timeout for generation
-            )
+
+@router.post("/tools/scenario-generate")
+async def generate_scenario(req: ScenarioRequest, 
+                           db: Session = Depends(get_db),
+                           current_user: User = Depends(get_current_active_user)):
+    """Proxy request to Gemini for scenario generation (secures API Key)"""
+    model_name, api_key, payload = scenario_call(req, db, current_user)
+    # Identical requests from the same user (double-clicks, retries) share one call
+    key = request_key("scenario", model_name, payload, current_user.id)
+    async with tool_quota(current_user, "gemini"):
+        return await generation_flight.do(key, lambda: request_scenario(model_name, api_key, payload))
+
+
+async def request_scenario(model_name: str, api_key: str, payload: dict) -> dict:
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
+
+    client = http_pool.client("generativelanguage.googleapis.com")
+    try:
+        res = await client.post(
+            url,
+            json=payload,
+            timeout=60.0 # Allow longer timeout for generation
+        )
             
-            if res.status_code != 200:
-                print(f"Scenario Gen Error: {res.text}")
-                raise HTTPException(status_code=res.status_code, detail=f"Gemini Error: {res.text}")
+        if res.status_code != 200:
+            print(f"Scenario Gen Error: {res.text}")
+            raise HTTPException(status_code=res.status_code, detail=f"Gemini Error: {res.text}")
                 
-            data = res.json()
-            # Extract text from standard Gemini response
-            try:
-                text = data["candidates"][0]["content"]["parts"][0]["text"]
-                return {"text": text}
-            except (KeyError, IndexError):
-                raise HTTPException(status_code=500, detail="Invalid response format from Gemini")
+        data = res.json()
+        # Extract text from standard Gemini response
+        try:
+            text = data["candidates"][0]["content"]["parts"][0]["text"]
+            return {"text": text}
+        except (KeyError, IndexError):
+            raise HTTPException(status_code=500, detail="Invalid response format from Gemini")
                 
-        except Exception as e:
-            print(f"Scenario Gen Exception: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        print(f"Scenario Gen Exception: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def chunk_text(chunk: dict) -> str:
+    """Answer text of one streamed GenerateContentResponse (thought parts skipped)"""
+    candidates = chunk.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(p.get("text", "") for p in parts if not p.get("thought"))
+
+
+async def scenario_events(upstream: httpx.Response):
+    """Re-emit Gemini's SSE stream as `data: {"text": delta}` frames, one chunk at a time"""
+    try:
+        async for line in upstream.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            try:
+                text = chunk_text(json.loads(line[5:]))
+            except (ValueError, AttributeError, IndexError):
+                continue
+            if text:
+                yield f"data: {json.dumps({'text': text}, ensure_ascii=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except httpx.HTTPError as e:
+        print(f"Scenario Stream Exception: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that always runs `on_close` once the response is over:
+    finished, failed, or the client went away (even before the first chunk,
+    when the body generator never started and its own cleanup would not run)
+    """
+
+    def __init__(self, content, on_close: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._on_close()
+
+
+@router.post("/tools/scenario-generate/stream")
+async def generate_scenario_stream(req: ScenarioRequest,
+                                  db: Session = Depends(get_db),
+                                  current_user: User = Depends(get_current_active_user)):
+    """
+    Streaming scenario generation as server-sent events.
+    Each frame is `data: {"text": "<delta>"}`, ending with `event: done`
+    (or `event: error` if the upstream stream breaks midway). Errors before
+    the first byte keep the status codes of the non-streaming endpoint.
+    """
+    model_name, api_key, payload = scenario_call(req, db, current_user)
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:streamGenerateContent?alt=sse&key={api_key}"
+
+    try:
+        # Held until the response is over (released by its close hook)
+        lease = await quotas.acquire_tool_call(current_user, "gemini")
+    except QuotaExceeded as e:
+        raise e.as_http()
+
+    client = http_pool.client("generativelanguage.googleapis.com")
+    try:
+        upstream = await client.send(
+            client.build_request("POST", url, json=payload, timeout=60.0), # Per read, not total
+            stream=True,
+        )
+    except httpx.HTTPError as e:
+        await lease.release()
+        print(f"Scenario Stream Exception: {e}")
+        raise HTTPException(status_code=502, detail=str(e))
+
+    if upstream.status_code != 200:
+        body = (await upstream.aread()).decode("utf-8", errors="replace")
+        await upstream.aclose()
+        await lease.release()
+        print(f"Scenario Stream Error: {body}")
+        raise HTTPException(status_code=upstream.status_code, detail=f"Gemini Error: {body}")
+
+    async def close_stream() -> None:
+        # Closing aborts the upstream call if it is still running
+        await upstream.aclose()
+        await lease.release()
+
+    return ClosingStreamingResponse(
+        scenario_events(upstream),
+        on_close=close_stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 class ImageGenerationRequest(BaseModel):
@@ -341,77 +467,196 @@ async def generate_image(req: ImageGenerationRequest,
 
     model_name = req.model
     # Cleanup model name if needed (frontend might send different formats, but we expect exact IDs)
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            # 1. Imagen Logic (e.g. imagen-4.0-generate-001, imagen-3.0-generate-001)
-            # Uses the ':predict' endpoint and specific payload
-            if "imagen" in model_name.lower():
-                url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:predict?key={api_key}"
-                payload = {
-                    "instances": [
-                        { "prompt": req.prompt }
-                    ],
-                    "parameters": {
-                        "sampleCount": 1,
-                        "aspectRatio": "1:1"
-                    }
+
+    key = request_key("image", model_name, req.prompt, current_user.id)
+    async with tool_quota(current_user, "gemini"):
+        return await generation_flight.do(key, lambda: request_image(model_name, api_key, req.prompt))
+
+
+async def request_image(model_name: str, api_key: str, prompt: str) -> dict:
+    client = http_pool.client("generativelanguage.googleapis.com")
+    try:
+        # 1. Imagen Logic (e.g. imagen-4.0-generate-001, imagen-3.0-generate-001)
+        # Uses the ':predict' endpoint and specific payload
+        if "imagen" in model_name.lower():
+            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:predict?key={api_key}"
+            payload = {
+                "instances": [
+                    { "prompt": prompt }
+                ],
+                "parameters": {
+                    "sampleCount": 1,
+                    "aspectRatio": "1:1"
                 }
+            }
                 
-                res = await client.post(url, json=payload, timeout=30.0)
+            res = await client.post(url, json=payload, timeout=30.0)
                 
-                if res.status_code != 200:
-                    print(f"Imagen Error: {res.text}")
-                    raise HTTPException(status_code=res.status_code, detail=f"Imagen Error: {res.text}")
+            if res.status_code != 200:
+                print(f"Imagen Error: {res.text}")
+                raise HTTPException(status_code=res.status_code, detail=f"Imagen Error: {res.text}")
                     
-                data = res.json()
-                try:
-                    b64 = data["predictions"][0]["bytesBase64Encoded"]
-                    mime_type = data["predictions"][0].get("mimeType", "image/png")
-                    return {"image": f"data:{mime_type};base64,{b64}"}
-                except (KeyError, IndexError):
-                    raise HTTPException(status_code=500, detail="Invalid response from Imagen")
-
-            # 2. Gemini Logic (e.g. gemini-2.5-flash, gemini-2.5-flash-image)
-            # Uses the ':generateContent' endpoint
-            else:
-                # Fallback to standard generateContent if user selected a Gemini model
-                # Note: 'gemini-2.5-flash' might strictly be text, but 'gemini-2.5-flash-image' exists in some contexts.
-                # We pass it through.
-                url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
+            data = res.json()
+            try:
+                b64 = data["predictions"][0]["bytesBase64Encoded"]
+                mime_type = data["predictions"][0].get("mimeType", "image/png")
+                return {"image": f"data:{mime_type};base64,{b64}"}
+            except (KeyError, IndexError):
+                raise HTTPException(status_code=500, detail="Invalid response from Imagen")
+
+        # 2. Gemini Logic (e.g. gemini-2.5-flash, gemini-2.5-flash-image)
+        # Uses the ':generateContent' endpoint
+        else:
+            # Fallback to standard generateContent if user selected a Gemini model
+            # Note: 'gemini-2.5-flash' might strictly be text, but 'gemini-2.5-flash-image' exists in some contexts.
+            # We pass it through.
+            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
                 
-                payload = {
-                  "contents": [
-                    {
-                      "parts": [
-                        { "text": req.prompt }
-                      ]
-                    }
-                  ],
-                  "generation_config": {
-                      "response_mime_type": "image/jpeg"
-                  }
+            payload = {
+              "contents": [
+                {
+                  "parts": [
+                    { "text": prompt }
+                  ]
                 }
+              ],
+              "generation_config": {
+                  "response_mime_type": "image/jpeg"
+              }
+            }
 
-                res = await client.post(url, json=payload, timeout=30.0)
-
-                if res.status_code != 200:
-                    print(f"Gemini Image Gen Error: {res.text}")
-                    raise HTTPException(status_code=res.status_code, detail=f"Gemini Error: {res.text}")
-
-                data = res.json()
-                # Gemini returns images in inlineData
-                try:
-                    part = data["candidates"][0]["content"]["parts"][0]
-                    if "inlineData" in part:
-                        b64 = part["inlineData"]["data"]
-                        mime_type = part["inlineData"].get("mimeType", "image/jpeg")
-                        return {"image": f"data:{mime_type};base64,{b64}"}
-                    else:
-                        raise HTTPException(status_code=500, detail="Model returned text instead of image")
-                except (KeyError, IndexError):
-                    raise HTTPException(status_code=500, detail="Invalid response from Gemini")
+            res = await client.post(url, json=payload, timeout=30.0)
+
+            if res.status_code != 200:
+                print(f"Gemini Image Gen Error: {res.text}")
+                raise HTTPException(status_code=res.status_code, detail=f"Gemini Error: {res.text}")
+
+            data = res.json()
+            # Gemini returns images in inlineData
+            try:
+                part = data["candidates"][0]["content"]["parts"][0]
+                if "inlineData" in part:
+                    b64 = part["inlineData"]["data"]
+                    mime_type = part["inlineData"].get("mimeType", "image/jpeg")
+                    return {"image": f"data:{mime_type};base64,{b64}"}
+                else:
+                    raise HTTPException(status_code=500, detail="Model returned text instead of image")
+            except (KeyError, IndexError):
+                raise HTTPException(status_code=500, detail="Invalid response from Gemini")
                 
-        except Exception as e:
-            print(f"Image Gen Exception: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        print(f"Image Gen Exception: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --- Background job variants (POST /api/jobs), for clients that cannot hold a request open ---
+
+async def run_scenario_job(ctx: JobContext) -> dict:
+    user = await ctx.load_user()
+    model_name, api_key, payload = scenario_call(ScenarioRequest(**ctx.params), None, user)
+    return await request_scenario(model_name, api_key, payload)
+
+
+async def run_image_job(ctx: JobContext) -> dict:
+    user = await ctx.load_user()
+    api_key = get_user_api_key(None, user) or settings.gemini_api_key
+    if not api_key:
+        raise JobError("Gemini API Key not configured")
+    req = ImageGenerationRequest(**ctx.params)
+    image = (await request_image(req.model, api_key, req.prompt))["image"]
+    # Job results are re-sent on every poll and push: keep the blob URL, not the data: URI
+    return {"image": await asyncio.to_thread(externalize_image, image)}
+
+
+job_queue.register("scenario-generate", run_scenario_job, provider="gemini", params_model=ScenarioRequest)
+job_queue.register("image-generate", run_image_job, provider="gemini", params_model=ImageGenerationRequest)
+
+
+# --- Batch avatar generation ---
+
+class AvatarBatchItem(BaseModel):
+    prompt: str
+    roleId: Optional[str] = None # Set this role's avatar when the image is ready
+
+
+class AvatarBatchRequest(BaseModel):
+    items: List[AvatarBatchItem] = Field(..., min_length=1, max_length=100)
+    model: Optional[str] = "imagen-4.0-generate-001"
+
+
+# Shared by every batch in this process, so parallel batches cannot exceed provider quotas together
+image_rate_limits = ProviderRateLimits(settings.image_requests_per_minute, default_per_minute=10)
+
+
+def image_rate_key(model_name: str) -> str:
+    return "imagen" if "imagen" in model_name.lower() else "gemini"
+
+
+def assign_role_avatar(db: Session, role_id: str, user: User, avatar_url: str) -> None:
+    """Same access rules as PUT /api/data/roles/{id}"""
+    role = db.query(Role).filter(Role.id == role_id).first()
+    if not role:
+        raise JobError("Role not found")
+    if role.user_id != user.id and user.role != "admin":
+        raise JobError("Access denied")
+    if role.is_default and user.role != "admin":
+        raise JobError("Cannot edit default roles")
+    role.avatar_url = avatar_url
+    bump_version(db, "roles")
+    db.commit()
+
+
+async def run_avatar_batch_job(ctx: JobContext) -> dict:
+    """
+    Generate every item with at most `avatar_batch_concurrency` calls in flight,
+    paced by the provider rate limit. Each image goes into the blob store as
+    soon as it arrives; progress lists the items finished so far.
+    """
+    user = await ctx.load_user()
+    api_key = get_user_api_key(None, user) or settings.gemini_api_key
+    if not api_key:
+        raise JobError("Gemini API Key not configured")
+    req = AvatarBatchRequest(**ctx.params)
+    rate_key = image_rate_key(req.model)
+    semaphore = asyncio.Semaphore(settings.avatar_batch_concurrency)
+    results = [None] * len(req.items)
+    counts = {"done": 0, "failed": 0}
+
+    async def generate(index: int, item: AvatarBatchItem):
+        entry = {"index": index, "roleId": item.roleId}
+        async with semaphore:
+            await image_rate_limits.wait(rate_key)
+            try:
+                image = (await request_image(req.model, api_key, item.prompt))["image"]
+                entry["avatarUrl"] = await asyncio.to_thread(externalize_image, image)
+                if item.roleId:
+                    async with AsyncSessionLocal() as db:
+                        await db.run_sync(assign_role_avatar, item.roleId, user, entry["avatarUrl"])
+            except Exception as e:
+                print(f"Avatar Batch Item Exception: {e}")
+                entry["error"] = getattr(e, "detail", None) or str(e)
+        results[index] = entry
+        counts["failed" if "error" in entry else "done"] += 1
+        await ctx.progress(total=len(req.items), **counts,
+                           items=[r for r in results if r is not None])
+
+    await asyncio.gather(*(generate(i, item) for i, item in enumerate(req.items)))
+    return {"total": len(req.items), **counts, "items": results}
+
+
+job_queue.register("avatar-batch", run_avatar_batch_job, provider="gemini", params_model=AvatarBatchRequest)
+
+
+@router.post("/tools/image-generate/batch", response_model=JobRead, status_code=202)
+async def generate_avatar_batch(req: AvatarBatchRequest,
+                                current_user: User = Depends(get_current_active_user)):
+    """
+    Generate many avatars as one background job. Returns the job; poll
+    GET /api/jobs/{id} for `progress` ({done, failed, total, items}) and the
+    final result, where each item has an `avatarUrl` (blob store) or `error`.
+    """
+    try:
+        await quotas.check_rate(current_user)
+    except QuotaExceeded as e:
+        raise e.as_http()
+    return await job_queue.submit(current_user.id, "avatar-batch", req.model_dump())
@@ -5,6 +5,8 @@ from typing import Optional
 from ..database import get_db
 from ..models import User
 from .auth import get_current_active_user
+from ..core.blobstore import externalize_image
+from ..core.user_cache import invalidate_user
 
 router = APIRouter()
 
@@ -29,16 +31,20 @@ def update_profile(profile: UserUpdate,
                   db: Session = Depends(get_db),
                   current_user: User = Depends(get_current_active_user)):
     
-    # Refresh because current_user is detached or we want to be sure to modify attached
-    user = db.merge(current_user)
+    # current_user is a cached snapshot (core/user_cache.py); load the row to modify it
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    previous_username = user.username
     
     if profile.username:
         user.username = profile.username
     if profile.avatar_url:
-        user.avatar_url = profile.avatar_url
+        user.avatar_url = externalize_image(profile.avatar_url)
     if profile.settings:
         user.settings = profile.settings
         
     db.commit()
     db.refresh(user)
+    invalidate_user(previous_username, user.username)
     return user
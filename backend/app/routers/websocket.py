@@ -2,41 +2,40 @@
 WebSocket Router - Voice session WebSocket endpoints
 """
 import json
+import os
 import time
+import base64
+import binascii
 import asyncio
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from typing import Optional
 
 from app.adapters.base import SessionConfig, AudioConfig, VoiceConfig, AdapterStatus
+from app.audio.codecs import AudioCodec, CodecError, available_encodings, create_codec
+from app.audio.pcm import pcm16_from_base64, pcm16_to_base64, pcm16_to_wav_base64, wav_base64_to_pcm16
+from app.audio.recorder import PEAKS_SUFFIX, StereoRecorder, recording_path
+from app.audio.resampler import SUPPORTED_CLIENT_RATES, StreamingResampler
 from app.config import settings
+from app.core.jobs import job_queue
+from app.core.model_catalog import provider_for
+from app.core.quotas import QuotaExceeded, quotas
+from app.core.user_cache import resolve_user
+from app.relay.ingress import IngressLimiter, ingress_totals
+from app.relay.history import append_session_messages, create_session_record, finalize_session_record
+from app.relay.transcripts import TranscriptAggregator, TranscriptAssembler
 from ..registry import ADAPTERS
-from ..database import SessionLocal
 from ..models import User
 
 router = APIRouter()
 
+# Output rate used for compressed client encodings when the client does not ask for one
+DEFAULT_CODEC_OUTPUT_RATE = 24000
 
-@router.websocket("/ws/{model_id}")
-async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optional[str] = Query(None)):
-    """
-    WebSocket endpoint for voice sessions.
-    Requires 'token' query parameter for authentication.
-    
-    Protocol:
-    1. Client connects
-    2. Client sends: {"type": "session.create", "payload": {...}}
-    3. Server responds: {"type": "session.created", "payload": {...}}
-    4. Client sends: {"type": "audio.input", "payload": {"data": "base64...", "sequence": N}}
-    5. Server sends: {"type": "audio.output", "payload": {...}}
-    6. Server sends: {"type": "transcription", "payload": {...}}
-    7. Client sends: {"type": "session.end"} or disconnects
-    """
-    await websocket.accept()
-    
-    # 1. Authenticate
+
+async def authenticate(websocket: WebSocket, token: Optional[str]):
+    """Active user for the `token` query parameter; otherwise sends an error, closes and returns None"""
     from app.core.security import ALGORITHM, SECRET_KEY
     from jose import jwt, JWTError
-    from app.routers.auth import get_user
     
     user = None
     if token:
@@ -44,11 +43,15 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             username: str = payload.get("sub")
             if username:
-                with SessionLocal() as db:
-                     user = get_user(db, username=username)
+                user = await resolve_user(username, payload.get("ver", 0))
         except JWTError:
              print("WS Auth Error: Invalid Token")
              pass
+        except Exception as e:
+             print(f"WS Auth Error: User lookup failed ({e})")
+    
+    if user and not user.is_active:
+        user = None
     
     if not user:
         print("WS Error: Authentication failed")
@@ -61,6 +64,70 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
             }
         })
         await websocket.close(code=4001)
+    return user
+
+
+# Declared before /ws/{model_id} so "jobs" is not taken as a model id
+@router.websocket("/ws/jobs")
+async def job_events(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    Push channel for background jobs (see /api/jobs): sends
+    {"type": "job.update", "payload": {"id", "status", "progress"?}} for the
+    user's jobs run by this server process. Clients fetch the result with
+    GET /api/jobs/{id}, and should keep polling as a fallback since jobs may
+    run on another instance.
+    """
+    await websocket.accept()
+    user = await authenticate(websocket, token)
+    if not user:
+        return
+
+    async def wait_disconnect():
+        # Clients send nothing (anything received, e.g. pings, is ignored)
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    events = job_queue.subscribe(user.id)
+    disconnected = asyncio.create_task(wait_disconnect())
+    try:
+        while True:
+            next_event = asyncio.create_task(events.get())
+            await asyncio.wait({disconnected, next_event}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                next_event.cancel()
+                break
+            await websocket.send_json({
+                "type": "job.update",
+                "timestamp": int(time.time() * 1000),
+                "payload": next_event.result()
+            })
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        disconnected.cancel()
+        job_queue.unsubscribe(user.id, events)
+
+
+@router.websocket("/ws/{model_id}")
+async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optional[str] = Query(None)):
+    """
+    WebSocket endpoint for voice sessions.
+    Requires 'token' query parameter for authentication.
+    
+    Protocol:
+    1. Client connects
+    2. Client sends: {"type": "session.create", "payload": {...}}
+    3. Server responds: {"type": "session.created", "payload": {...}}
+    4. Client sends: {"type": "audio.input", "payload": {"data": "base64...", "sequence": N}}
+    5. Server sends: {"type": "audio.output", "payload": {...}}
+    6. Server sends: {"type": "transcription", "payload": {...}}
+    7. Client sends: {"type": "session.end"} or disconnects
+    """
+    await websocket.accept()
+    
+    # 1. Authenticate (cached; a miss queries on the async engine, never blocking the loop)
+    user = await authenticate(websocket, token)
+    if not user:
         return
     
     # DEBUG LOGGING
@@ -113,31 +180,132 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
     audio_sequence = 0
     
     # Input guards state
-    last_audio_time = time.time()
-    audio_chunks_in_window = 0
     last_client_sequence = -1
+    ingress_warned = False
+    decode_warned = False
+    
+    def new_ingress(sample_rate: int, channels: int = 1) -> IngressLimiter:
+        return IngressLimiter.for_pcm16(
+            sample_rate,
+            channels,
+            burst_seconds=settings.ws_ingress_burst_seconds,
+            catchup_factor=settings.ws_ingress_catchup_factor,
+            drop_window=settings.ws_ingress_drop_window_seconds,
+            totals=ingress_totals,
+        )
+    
+    # Metered from the start at the adapter's default rate; replaced once session.create negotiates one
+    ingress = new_ingress(adapter.capabilities.default_sample_rate)
+    
+    # Session recording (stereo mixdown, L=user / R=model)
+    recorder: Optional[StereoRecorder] = None
+    
+    # Resampling between client and adapter rates
+    client_sample_rate: Optional[int] = None
+    input_resampler: Optional[StreamingResampler] = None
+    output_sample_rate: Optional[int] = None  # None = pass adapter output through
+    output_resamplers: dict = {}  # Keyed by adapter output rate
+    
+    # Client-leg codecs (None = raw PCM16 in / WAV out)
+    input_codec: Optional[AudioCodec] = None
+    output_codec: Optional[AudioCodec] = None
+    
+    def log_ingress():
+        if ingress.dropped_chunks or ingress.throttled_chunks:
+            print(f"WS Ingress: {ingress.stats()}")
+    
+    async def close_recorder():
+        nonlocal recorder
+        if recorder:
+            try:
+                # Waits for the recorder's writer thread, so keep it off the loop
+                await asyncio.to_thread(recorder.close)
+            except Exception as e:
+                print(f"WS Recorder close error: {e}")
+            recorder = None
+    
+    # Server-side transcript (only when the client names the scenario/role up front)
+    history_record_id: Optional[str] = None
+    assembler: Optional[TranscriptAssembler] = None
+    
+    async def close_history():
+        nonlocal history_record_id, assembler
+        if assembler:
+            try:
+                await assembler.close()
+            except Exception as e:
+                print(f"WS Transcript close error: {e}")
+            assembler = None
+        if history_record_id:
+            try:
+                # The recorder is closed first, so the file exists only if recording worked
+                audio_url = None
+                if os.path.exists(recording_path(user.id, history_record_id)):
+                    audio_url = f"/api/history/recordings/{history_record_id}"
+                await finalize_session_record(history_record_id, audio_url)
+            except Exception as e:
+                print(f"WS History finalize error: {e}")
+            history_record_id = None
     
     def on_audio(data: str, sequence: int, is_final: bool):
         nonlocal audio_sequence
         audio_sequence = sequence
+        if recorder or output_sample_rate or output_codec:
+            try:
+                samples, rate = wav_base64_to_pcm16(data)
+            except Exception as e:
+                print(f"WS Audio decode error: {e}")
+                samples, rate = None, None
+            if recorder and samples is not None:
+                try:
+                    recorder.push_model(samples, rate)
+                except Exception as e:
+                    print(f"WS Recorder model push error: {e}")
+            if samples is not None and (output_sample_rate or output_codec):
+                out_rate = output_sample_rate or rate
+                if out_rate != rate:
+                    resampler = output_resamplers.get(rate)
+                    if resampler is None:
+                        resampler = output_resamplers[rate] = StreamingResampler(rate, out_rate)
+                    samples = resampler.process(samples)
+                if output_codec:
+                    encoded = output_codec.encode(samples)
+                    if not encoded:
+                        return  # Codec is still buffering a frame
+                    data = base64.b64encode(encoded).decode("ascii")
+                elif out_rate != rate:
+                    if len(samples) == 0:
+                        return
+                    data = pcm16_to_wav_base64(samples, out_rate)
         send_with_category_sync("audio.output", {
             "data": data,
             "sequence": sequence,
             "isFinal": is_final
         }, 'system')
     
+    def send_transcription(role: str, text: str, is_final: bool):
+        # Player/Model transcription logs
+        send_with_category_sync("transcription", {
+            "role": role,
+            "text": text,
+            "isFinal": is_final
+        }, 'transcript')
+    
+    transcripts = TranscriptAggregator(send_transcription, window=settings.transcript_coalesce_ms / 1000)
+    
     def on_transcription(role: str, text: str, is_final: bool):
         if role == "system":
             if text == "TURN_COMPLETE":
+                # Pending deltas must reach the client before the turn boundary
+                transcripts.flush(is_final=True)
                 send_with_category_sync("turn.complete", {}, 'system')
+                if assembler:
+                    assembler.end_turn()
             # Ignore other system messages (diagnostics) - only needed during debugging
         else:
-            # Player/Model transcription logs
-            send_with_category_sync("transcription", {
-                "role": role,
-                "text": text,
-                "isFinal": is_final
-            }, 'transcript')
+            transcripts.add(role, text, is_final)
+            if assembler:
+                assembler.add(role, text)
     
     async def handle_error_async(code: int, message: str):
         try:
@@ -165,6 +333,18 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
     
     session_id: Optional[str] = None
     
+    # Concurrent session quota (per user by role, per provider across users)
+    try:
+        session_lease = await quotas.acquire_session(user, provider_for(model_id))
+    except QuotaExceeded as e:
+        print(f"WS Quota: {user.username} refused ({e.detail})")
+        await send_with_category("error", {
+            "code": 4029,
+            "message": e.detail
+        }, 'system')
+        await websocket.close(code=4029)
+        return
+    
     try:
         while True:
             # Receive message from client
@@ -178,11 +358,13 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
                 # Reset guard state for new session
                 audio_sequence = 0
                 last_client_sequence = -1
-                audio_chunks_in_window = 0
-                last_audio_time = time.time()
+                ingress_warned = False
+                decode_warned = False
                 
                 # Create session
                 session_id = f"sess-{int(time.time() * 1000)}"
+                await close_recorder()
+                await close_history()
                 
                 # Log incoming parameters
                 print(f"WS Create Session: Payload={json.dumps(payload)}")
@@ -201,16 +383,42 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
 
                 requested_sample_rate = payload.get("audio", {}).get("sampleRate", cap.default_sample_rate)
                 requested_encoding = payload.get("audio", {}).get("encoding", cap.default_encoding)
+                requested_output_encoding = payload.get("audio", {}).get("outputEncoding", requested_encoding)
+                requested_output_rate = payload.get("audio", {}).get("outputSampleRate")
                 
-                # Validate and enforce sample rate
+                # Adapter runs at a rate it supports; the relay resamples any accepted client rate
                 if requested_sample_rate not in cap.supported_sample_rates:
                     negotiated_sample_rate = cap.default_sample_rate
                 else:
                     negotiated_sample_rate = requested_sample_rate
+                
+                if requested_sample_rate in SUPPORTED_CLIENT_RATES:
+                    client_sample_rate = requested_sample_rate
+                else:
+                    client_sample_rate = negotiated_sample_rate
+                
+                if client_sample_rate != negotiated_sample_rate:
+                    input_resampler = StreamingResampler(client_sample_rate, negotiated_sample_rate)
+                else:
+                    input_resampler = None
+                
+                log_ingress()
+                ingress = new_ingress(client_sample_rate, payload.get("audio", {}).get("channels", 1))
+                
+                # Optional output rate (e.g. lower rates for bandwidth-constrained clients)
+                output_sample_rate = requested_output_rate if requested_output_rate in SUPPORTED_CLIENT_RATES else None
+                if output_sample_rate is None and requested_output_encoding != cap.default_encoding:
+                    # Compressed output has no WAV header, so pin the rate explicitly
+                    output_sample_rate = DEFAULT_CODEC_OUTPUT_RATE
+                output_resamplers = {}
                     
-                # FIX: Validate encoding
-                if requested_encoding not in cap.supported_encodings:
-                     await handle_error_async(4003, f"Unsupported encoding: {requested_encoding}. Supported: {cap.supported_encodings}")
+                # Validate client-leg encodings (adapters always receive PCM16)
+                try:
+                    input_codec = create_codec(requested_encoding, client_sample_rate)
+                    output_codec = create_codec(requested_output_encoding, output_sample_rate or DEFAULT_CODEC_OUTPUT_RATE)
+                except ValueError:
+                     supported = available_encodings()
+                     await handle_error_async(4003, f"Unsupported encoding: {requested_encoding}/{requested_output_encoding}. Supported: {supported}")
                      return
                 
                 requested_voice_id = payload.get("voice", {}).get("voiceId")
@@ -251,7 +459,7 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
                     model_id=model_id,
                     audio=AudioConfig(
                         sample_rate=negotiated_sample_rate,
-                        encoding=requested_encoding,
+                        encoding=cap.default_encoding,
                         channels=payload.get("audio", {}).get("channels", 1)
                     ),
                     voice=VoiceConfig(
@@ -276,11 +484,49 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
                          await websocket.close(code=4001, reason=f"Adapter failed to connect (Status: {adapter.status})")
                     return
                 
+                # Persist the transcript server-side when the client identifies the session
+                session_payload = payload.get("session", {})
+                if session_payload.get("scenarioId") and session_payload.get("roleId"):
+                    try:
+                        history_record_id = await create_session_record(
+                            user.id,
+                            str(session_payload["scenarioId"]),
+                            str(session_payload["roleId"])
+                        )
+                    except Exception as e:
+                        print(f"WS History create error: {e}")
+                
+                if history_record_id:
+                    session_id = history_record_id
+                    record_for_batch = history_record_id
+                    assembler = TranscriptAssembler(
+                        lambda batch: append_session_messages(record_for_batch, batch),
+                        interval=settings.transcript_persist_interval
+                    )
+                    assembler.start()
+                
+                recording_id = None
+                if settings.record_sessions:
+                    try:
+                        recorder = StereoRecorder(
+                            recording_path(user.id, session_id),
+                            sample_rate=settings.recording_sample_rate,
+                            peaks_path=recording_path(user.id, session_id, PEAKS_SUFFIX)
+                        )
+                        recording_id = session_id
+                    except Exception as e:
+                        print(f"WS Recorder init error: {e}")
+                
                 await send_with_category("session.created", {
                     "sessionId": session_id,
+                    "recordingId": recording_id,
+                    "historyId": history_record_id,
                     "negotiated": {
-                        "sampleRate": config.audio.sample_rate,
-                        "encoding": config.audio.encoding,
+                        "sampleRate": client_sample_rate,
+                        "adapterSampleRate": config.audio.sample_rate,
+                        "outputSampleRate": output_sample_rate,
+                        "encoding": requested_encoding,
+                        "outputEncoding": requested_output_encoding,
                         "voiceId": config.voice.voice_id
                     },
                     "capabilities": {
@@ -308,29 +554,56 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
                     continue
                 last_client_sequence = sequence
                 
-                # Guard 3: Rate limiting (token bucket or simple counter)
-                # Simple counter per second
-                current_time = time.time()
-                if current_time - last_audio_time >= 1.0:
-                    audio_chunks_in_window = 0
-                    last_audio_time = current_time
+                samples = None
+                try:
+                    if input_codec:
+                        samples = input_codec.decode(base64.b64decode(data))
+                        pcm_bytes = len(samples) * 2
+                    else:
+                        if input_resampler or recorder:
+                            samples = pcm16_from_base64(data)
+                        pcm_bytes = len(data) * 3 // 4
+                except (binascii.Error, CodecError, ValueError) as e:
+                    # Drop the chunk, keep the session
+                    if not decode_warned:
+                        decode_warned = True
+                        print(f"WS Audio decode error: {e}")
+                        await send_with_category("warning", {
+                            "code": 4005,
+                            "message": "Invalid audio chunk (dropped)"
+                        }, 'system')
+                    continue
                 
-                audio_chunks_in_window += 1
-                if audio_chunks_in_window > 100: # Relaxed rate limit
-                     if audio_chunks_in_window > 200:
-                         # Abuse detected, close connection
-                         await websocket.close(code=1008, reason="Rate limit exceeded")
-                         return
-                     
-                     # Warn once
-                     if audio_chunks_in_window == 101:
-                         await send_with_category("warning", {
-                             "code": 4004, 
-                             "message": "Rate limit exceeded (audio dropping)"
-                         }, 'system')
-                     continue
+                # Guard 3: Ingress rate in audio time (bursts after a stall are paced, excess dropped)
+                accepted, delay = ingress.admit(pcm_bytes)
+                if not accepted:
+                    if ingress.recent_dropped_seconds > settings.ws_ingress_drop_limit_seconds:
+                        # Sustained faster than real time: not a live microphone
+                        ingress_totals.closed_sockets += 1
+                        await websocket.close(code=1008, reason="Rate limit exceeded")
+                        return
+                    if not ingress_warned:
+                        ingress_warned = True
+                        await send_with_category("warning", {
+                            "code": 4004, 
+                            "message": "Rate limit exceeded (audio dropping)"
+                        }, 'system')
+                    continue
+                if delay:
+                    await asyncio.sleep(delay)
 
-                await adapter.send_audio(data, sequence)
+                if input_resampler:
+                    await adapter.send_audio(pcm16_to_base64(input_resampler.process(samples)), sequence)
+                elif input_codec:
+                    await adapter.send_audio(pcm16_to_base64(samples), sequence)
+                else:
+                    await adapter.send_audio(data, sequence)
+                
+                if recorder:
+                    try:
+                        recorder.push_user(samples, client_sample_rate)
+                    except Exception as e:
+                        print(f"WS Recorder user push error: {e}")
             
             elif msg_type == "ping":
                 # Heartbeat - system category (admin only)
@@ -364,4 +637,10 @@ async def websocket_endpoint(websocket: WebSocket, model_id: str, token: Optiona
             pass
     finally:
         # Cleanup
+        await session_lease.release()
+        log_ingress()
         await adapter.disconnect()
+        await close_recorder()
+        transcripts.close()
+        await close_history()
+        print(f"WS Transcripts: {transcripts.deltas_in} deltas -> {transcripts.messages_out} messages")
@@ -43,6 +43,19 @@ class ScenarioRead(ScenarioBase):
 
     model_config = ConfigDict(populate_by_name=True, from_attributes=True)
 
+class ScenarioSummary(BaseModel):
+    """Selection-card projection (no workflow / knowledge / script text)"""
+    id: str
+    title: str
+    subtitle: str
+    description: str
+    tags: List[str]
+    theme: str
+    lastUpdated: datetime = Field(validation_alias="last_updated", serialization_alias="lastUpdated")
+    isDefault: bool = Field(False, validation_alias="is_default", serialization_alias="isDefault")
+
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True)
+
 # --- Role Schemas ---
 
 class RoleBase(BaseModel):
@@ -83,6 +96,45 @@ class RoleRead(RoleBase):
 
     model_config = ConfigDict(populate_by_name=True, from_attributes=True)
 
+class RoleSummary(BaseModel):
+    """Selection-card projection (no prompt text)"""
+    id: str
+    name: str
+    nameCN: str = Field(validation_alias="name_cn", serialization_alias="nameCN")
+    title: str
+    description: str
+    avatarSeed: Optional[str] = Field(None, validation_alias="avatar_seed", serialization_alias="avatarSeed")
+    avatarImage: Optional[str] = Field(None, validation_alias="avatar_url", serialization_alias="avatarImage")
+    focusAreas: List[str] = Field([], validation_alias="focus_areas", serialization_alias="focusAreas")
+    lastUpdated: datetime = Field(validation_alias="last_updated", serialization_alias="lastUpdated")
+    isDefault: bool = Field(False, validation_alias="is_default", serialization_alias="isDefault")
+    hostility: int = 50
+    verbosity: int = 50
+    skepticism: int = 50
+
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True)
+
+# --- Job Schemas ---
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+class JobRead(BaseModel):
+    id: str
+    kind: str
+    provider: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+    createdAt: datetime = Field(validation_alias="created_at", serialization_alias="createdAt")
+    startedAt: Optional[datetime] = Field(None, validation_alias="started_at", serialization_alias="startedAt")
+    finishedAt: Optional[datetime] = Field(None, validation_alias="finished_at", serialization_alias="finishedAt")
+
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True)
+
 # --- Auth & User Schemas ---
 
 class Token(BaseModel):
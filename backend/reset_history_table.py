@@ -4,7 +4,8 @@ from sqlalchemy import text
 # Drop table manually to force recreation by main.py
 def reset_table():
     with engine.connect() as conn:
-        print("Dropping session_records table...")
+        print("Dropping session_messages and session_records tables...")
+        conn.execute(text("DROP TABLE IF EXISTS session_messages"))
         conn.execute(text("DROP TABLE IF EXISTS session_records"))
         conn.commit()
         print("Dropped.")
@@ -0,0 +1,72 @@
+import sys
+import os
+import time
+import base64
+import argparse
+
+import numpy as np
+
+# Add parent dir to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.audio.codecs import PCM16, available_encodings, create_codec
+from app.audio.pcm import pcm16_to_wav_base64
+
+
+def make_speech_like(seconds: float, sample_rate: int) -> np.ndarray:
+    """Band-limited noise with a syllable-rate envelope (closer to speech than a sine)"""
+    rng = np.random.default_rng(42)
+    n = int(seconds * sample_rate)
+    noise = rng.standard_normal(n)
+    kernel = np.hanning(32)
+    voiced = np.convolve(noise, kernel / kernel.sum(), mode="same")
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * np.arange(n) / sample_rate))
+    return np.clip(voiced * envelope * 30000, -32768, 32767).astype(np.int16)
+
+
+def bench_leg(encoding: str, sample_rate: int, chunk_ms: int, seconds: float, downlink: bool):
+    """Returns (cpu_ms_per_session_second, wire_bytes_per_second) for one direction"""
+    audio = make_speech_like(seconds, sample_rate)
+    chunk = sample_rate * chunk_ms // 1000
+    encoder = create_codec(encoding, sample_rate)
+    decoder = create_codec(encoding, sample_rate)
+
+    wire_bytes = 0
+    start = time.process_time()
+    for i in range(0, len(audio), chunk):
+        pcm = audio[i:i + chunk]
+        if encoder is None:
+            # Baseline: raw PCM16 up, WAV-wrapped PCM16 down
+            payload = pcm16_to_wav_base64(pcm, sample_rate) if downlink else base64.b64encode(pcm.tobytes()).decode()
+        else:
+            payload = base64.b64encode(encoder.encode(pcm)).decode()
+            if not downlink:
+                # Uplink: the relay decodes what the client encoded
+                decoder.decode(base64.b64decode(payload))
+        wire_bytes += len(payload)
+    cpu = time.process_time() - start
+    return cpu * 1000 / seconds, wire_bytes / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark client-leg codec CPU cost per session")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Simulated session length")
+    args = parser.parse_args()
+
+    print(f"Simulated session: {args.seconds:.0f}s, uplink 16 kHz / 100 ms chunks, downlink 24 kHz / 40 ms chunks")
+    print(f"{'encoding':<12} {'up KB/s':>9} {'down KB/s':>10} {'relay CPU ms/s':>15} {'sessions/core':>14}")
+
+    encodings = available_encodings()
+    for encoding in [PCM16] + [e for e in encodings if e != PCM16]:
+        up_cpu, up_bytes = bench_leg(encoding, 16000, 100, args.seconds, downlink=False)
+        down_cpu, down_bytes = bench_leg(encoding, 24000, 40, args.seconds, downlink=True)
+        total_cpu = up_cpu + down_cpu
+        capacity = 1000 / total_cpu if total_cpu > 0 else float("inf")
+        print(f"{encoding:<12} {up_bytes / 1024:>9.1f} {down_bytes / 1024:>10.1f} {total_cpu:>15.3f} {capacity:>14.0f}")
+
+    if "opus" not in encodings:
+        print("opus: skipped (opuslib / libopus not installed)")
+
+
+if __name__ == "__main__":
+    main()
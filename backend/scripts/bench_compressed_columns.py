@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+import argparse
+from sqlalchemy import create_engine, Column, Integer, Text, JSON, text
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+# Add parent dir to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db_types import CompressedJSON, CompressedText
+from app.routers.data_manage import DEFAULT_SCENARIOS
+
+Base = declarative_base()
+
+
+class PlainRow(Base):
+    __tablename__ = "plain_rows"
+    id = Column(Integer, primary_key=True)
+    workflow = Column(Text)
+    messages = Column(JSON)
+
+
+class CompressedRow(Base):
+    __tablename__ = "compressed_rows"
+    id = Column(Integer, primary_key=True)
+    workflow = Column(CompressedText)
+    messages = Column(CompressedJSON)
+
+
+def sample_messages(turns: int):
+    lines = [
+        "张主任您好，我是雅培的小王。今天想跟您交流一下内异症的保守治疗方案。",
+        "你好小王，请坐。最近内异症患者确实不少，你说说看。",
+        "对于年轻有生育需求的患者，您在选择地诺孕素时，会担心不规则出血导致的依从性问题吗？",
+        "会有这方面的顾虑。虽然我们都会提前教育，但还是有患者因为出血停药。",
+    ]
+    return [
+        {"id": f"m_{i}", "role": "user" if i % 2 == 0 else "model", "type": "text",
+         "content": lines[i % len(lines)]}
+        for i in range(turns)
+    ]
+
+
+def run(model, rows: int, turns: int, engine):
+    Session = sessionmaker(bind=engine)
+    workflows = [s["workflow"] for s in DEFAULT_SCENARIOS]
+    messages = sample_messages(turns)
+
+    start = time.perf_counter()
+    with Session() as db:
+        for i in range(rows):
+            db.add(model(id=i + 1, workflow=workflows[i % len(workflows)], messages=messages))
+        db.commit()
+    write_ms = (time.perf_counter() - start) * 1000 / rows
+
+    start = time.perf_counter()
+    with Session() as db:
+        loaded = db.query(model).all()
+        assert loaded[0].messages == messages
+    read_ms = (time.perf_counter() - start) * 1000 / rows
+
+    with engine.connect() as conn:
+        table = model.__tablename__
+        size = conn.execute(text(
+            f"SELECT SUM(LENGTH(CAST(workflow AS BLOB))) + SUM(LENGTH(CAST(messages AS BLOB))) FROM {table}"
+        )).scalar()
+    return write_ms, read_ms, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compressed JSON/text columns (SQLite)")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=60, help="Messages per session")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    print(f"{args.rows} rows, scenario workflow text + {args.turns}-message transcript per row")
+    print(f"{'column type':<12} {'write ms/row':>13} {'read ms/row':>12} {'stored bytes':>14}")
+    results = {}
+    for label, model in (("plain", PlainRow), ("compressed", CompressedRow)):
+        results[label] = run(model, args.rows, args.turns, engine)
+        w, r, size = results[label]
+        print(f"{label:<12} {w:>13.3f} {r:>12.3f} {size:>14}")
+
+    saved = 1 - results["compressed"][2] / results["plain"][2]
+    print(f"Storage saved: {saved * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import sys
+import os
+import time
+import base64
+import argparse
+import tempfile
+import statistics
+
+# Add parent dir to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full vs summary list endpoints for scenarios/roles")
+    parser.add_argument("--scenarios", type=int, default=40)
+    parser.add_argument("--roles", type=int, default=40)
+    parser.add_argument("--inline-avatar-kb", type=int, default=0,
+                        help="Store legacy base64 avatars of this size instead of blob URLs")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    # Isolated SQLite file; must be set before app.database is imported
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import SessionLocal
+    from app.models import Role, Scenario, User
+    from app.core.security import create_access_token
+    from app.core.list_cache import list_cache
+    from app.routers.data_manage import DEFAULT_ROLES, DEFAULT_SCENARIOS
+
+    if args.inline_avatar_kb:
+        raw = os.urandom(args.inline_avatar_kb * 768)  # base64 inflates by 4/3
+        avatar = "data:image/png;base64," + base64.b64encode(raw).decode()
+    else:
+        avatar = "/api/blobs/" + "0" * 64 + ".png"
+
+    with SessionLocal() as db:
+        admin = User(username="bench-admin", role="admin")
+        db.add(admin)
+        db.flush()
+        for i in range(args.scenarios):
+            s = DEFAULT_SCENARIOS[i % len(DEFAULT_SCENARIOS)]
+            db.add(Scenario(id=f"s{i}", user_id=admin.id, is_default=True, title=s["title"],
+                            subtitle=s["subtitle"], description=s["description"], tags=s["tags"],
+                            theme=s["theme"], workflow=s["workflow"], knowledge_points=s["knowledge_points"],
+                            scoring_criteria=s["scoring_criteria"], scoring_dimensions=s["scoring_dimensions"],
+                            script_content=s["workflow"]))
+        for i in range(args.roles):
+            r = DEFAULT_ROLES[i % len(DEFAULT_ROLES)]
+            db.add(Role(id=f"r{i}", user_id=admin.id, is_default=True, name=r["name"], name_cn=r["name_cn"],
+                        title=r["title"], description=r["description"], avatar_seed=r["avatar_seed"],
+                        avatar_url=avatar, focus_areas=r["focus_areas"], personality=r["personality"],
+                        system_prompt_addon=r["system_prompt_addon"], generation_prompt=r["system_prompt_addon"]))
+        db.commit()
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench-admin'})}"}
+
+    def measure(path: str):
+        timings = []
+        size = 0
+        for _ in range(args.repeat):
+            list_cache.clear()  # Cold path: query + serialize every time
+            start = time.perf_counter()
+            res = client.get(path, headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+            size = len(res.content)
+        return size, statistics.median(timings)
+
+    print(f"{args.scenarios} scenarios, {args.roles} roles, "
+          f"avatars: {'inline ' + str(args.inline_avatar_kb) + ' KB' if args.inline_avatar_kb else 'blob URL'}")
+    print(f"{'endpoint':<28} {'bytes':>10} {'median ms':>10}")
+    for table in ("scenarios", "roles"):
+        full_size, full_ms = measure(f"/api/data/{table}")
+        summary_size, summary_ms = measure(f"/api/data/{table}/summary")
+        print(f"{'/api/data/' + table:<28} {full_size:>10} {full_ms:>10.2f}")
+        print(f"{'/api/data/' + table + '/summary':<28} {summary_size:>10} {summary_ms:>10.2f}")
+        print(f"  -> {(1 - summary_size / full_size) * 100:.0f}% smaller, {full_ms / summary_ms:.1f}x faster")
+
+    os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
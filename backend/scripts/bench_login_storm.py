@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+import statistics
+
+# Add parent dir to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.password_pool import PasswordPool, PasswordPoolBusy
+from app.core.security import get_password_hash, verify_password
+
+FRAME_MS = 20  # Audio relay cadence being protected
+
+
+async def relay_ticker(stop: asyncio.Event, lateness: list):
+    """Stand-in for a WS relay forwarding one audio frame every FRAME_MS"""
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while not stop.is_set():
+        next_tick += FRAME_MS / 1000
+        await asyncio.sleep(max(0, next_tick - loop.time()))
+        lateness.append((loop.time() - next_tick) * 1000)
+
+
+async def storm(mode: str, logins: int, concurrency: int, hashed: str, pool: PasswordPool):
+    stats = {"ok": 0, "busy": 0}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with sem:
+            if mode == "inline":
+                # Previous behaviour: bcrypt inside the async handler
+                valid = verify_password("secret", hashed)
+            else:
+                try:
+                    valid = await pool.verify("secret", hashed)
+                except PasswordPoolBusy:
+                    stats["busy"] += 1
+                    return
+            stats["ok"] += valid
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*[login() for _ in range(logins)])
+    return stats
+
+
+async def run(mode: str, args, hashed: str):
+    pool = PasswordPool(args.workers, args.queue_limit)
+    lateness = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(relay_ticker(stop, lateness))
+    await asyncio.sleep(0.2)  # Baseline ticks
+
+    start = time.perf_counter()
+    stats = await storm(mode, args.logins, args.concurrency, hashed, pool)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    pool.shutdown()
+
+    lateness.sort()
+    p99 = lateness[int(len(lateness) * 0.99) - 1]
+    print(f"{mode:<7} {elapsed:>8.2f} {stats['ok']:>6} {stats['busy']:>6} "
+          f"{statistics.median(lateness):>10.1f} {p99:>10.1f} {lateness[-1]:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay frame jitter during a login storm (inline vs pooled bcrypt)")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous login requests")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-limit", type=int, default=64)
+    args = parser.parse_args()
+
+    hashed = get_password_hash("secret")
+    print(f"{args.logins} logins, {args.concurrency} concurrent; relay tick every {FRAME_MS} ms")
+    print(f"{'mode':<7} {'seconds':>8} {'ok':>6} {'503':>6} {'p50 late':>10} {'p99 late':>10} {'max late':>10}")
+    for mode in ("inline", "pool"):
+        asyncio.run(run(mode, args, hashed))
+
+
+if __name__ == "__main__":
+    main()
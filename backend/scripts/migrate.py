@@ -53,6 +53,18 @@ def migrate():
             except Exception as e:
                 print(f"Error adding column: {e}")
 
+        # 3b. Token version (revokes issued JWTs when bumped)
+        try:
+            conn.execute(text("SELECT token_version FROM users LIMIT 1"))
+            print("Column 'token_version' already exists.")
+        except Exception:
+            print("Adding 'token_version' column...")
+            try:
+                conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+                conn.commit()
+            except Exception as e:
+                print(f"Error adding column: {e}")
+
         # 4. Update 'admin' user
         try:
             # Check if admin exists
@@ -64,6 +76,18 @@ def migrate():
         except Exception as e:
             print(f"Error updating admin: {e}")
 
+        # 5. Keyset pagination index for history lists
+        try:
+            conn.execute(text(
+                "CREATE INDEX ix_session_records_user_start_id "
+                "ON session_records (user_id, start_time, id)"
+            ))
+            conn.commit()
+            print("Created index 'ix_session_records_user_start_id'.")
+        except Exception:
+            conn.rollback()
+            print("Index 'ix_session_records_user_start_id' already exists.")
+
         print("Migration check completed.")
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+import sys
+import os
+import argparse
+from sqlalchemy import text
+
+# Add parent dir to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.core.blobstore import EXTENSIONS, blob_backend, blob_url, create_blob_store, make_key, parse_data_uri
+
+TABLES = ["users", "roles"]
+
+
+def migrate(backend: str, dry_run: bool = False):
+    if backend == "local" and engine.dialect.name != "sqlite":
+        # Rows would point at blobs that only exist on this machine
+        print(f"Refusing to move avatars of {engine.url} into the local blob store; "
+              "the service could not serve them. Use --backend gcs.")
+        sys.exit(1)
+    print(f"Moving inline avatars to the '{backend}' blob store on: {engine.url}")
+    store = create_blob_store(backend)
+    total_before = total_after = 0
+
+    with engine.connect() as conn:
+        for table in TABLES:
+            rows = conn.execute(text(
+                f"SELECT id, avatar_url FROM {table} WHERE avatar_url LIKE 'data:%'"
+            )).fetchall()
+
+            moved = skipped = before = after = 0
+            for row_id, value in rows:
+                parsed = parse_data_uri(value)
+                if not parsed or parsed[1] not in EXTENSIONS:
+                    skipped += 1
+                    print(f"  {table}.{row_id}: not a supported image data URI, left as is")
+                    continue
+
+                data, content_type = parsed
+                if dry_run:
+                    url = blob_url(make_key(data, content_type))
+                else:
+                    url = blob_url(store.put(data, content_type))
+                    conn.execute(text(f"UPDATE {table} SET avatar_url = :url WHERE id = :id"),
+                                 {"url": url, "id": row_id})
+                    conn.commit()  # Per row: the blob is already durable, keep the DB in step
+                before += len(value)
+                after += len(url)
+                moved += 1
+
+            if moved and not dry_run and table == "roles":
+                # Role list responses are cached per worker (app/core/list_cache.py)
+                bumped = conn.execute(text(
+                    "UPDATE cache_versions SET version = version + 1 WHERE name = 'roles'"
+                )).rowcount
+                if not bumped:
+                    conn.execute(text("INSERT INTO cache_versions (name, version) VALUES ('roles', 1)"))
+                conn.commit()
+
+            total_before += before
+            total_after += after
+            print(f"{table}: {moved}/{len(rows)} avatars moved ({skipped} skipped), "
+                  f"{before} -> {after} bytes in rows")
+
+    print(f"Total: {total_before} -> {total_after} bytes" + (" (dry run, nothing written)" if dry_run else ""))
+    print("Migration check completed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract inline data: URI avatars into the blob store")
+    parser.add_argument("--backend", choices=["local", "gcs"], default=None,
+                        help="Blob store to write to (default: as the service would, see BLOB_BACKEND)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would move without writing")
+    args = parser.parse_args()
+    migrate(args.backend or blob_backend(), dry_run=args.dry_run)
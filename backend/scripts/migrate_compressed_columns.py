@@ -0,0 +1,100 @@
+import sys
+import os
+import json
+import argparse
+from sqlalchemy import text
+
+# Add parent dir to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.db_types import MARKER, compress_payload
+
+# (table, column, kind) - must match the CompressedText / CompressedJSON columns in app/models.py
+COLUMNS = [
+    ("scenarios", "workflow", "text"),
+    ("scenarios", "knowledge_points", "text"),
+    ("scenarios", "script_content", "text"),
+    ("session_records", "messages", "json"),
+    ("session_records", "ai_analysis", "json"),
+]
+
+BATCH_SIZE = 200
+
+
+def to_bytes(value) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else bytes(value)
+
+
+def migrate(dry_run: bool = False):
+    print(f"Starting compressed column migration on: {engine.url}")
+    is_mysql = engine.dialect.name == "mysql"
+    total_before = total_after = 0
+
+    with engine.connect() as conn:
+        for table, column, kind in COLUMNS:
+            # 1. Column type (SQLite is dynamically typed and needs no ALTER)
+            if is_mysql and not dry_run:
+                try:
+                    conn.execute(text(f"ALTER TABLE {table} MODIFY COLUMN {column} LONGBLOB NULL"))
+                    conn.commit()
+                    print(f"{table}.{column}: column changed to LONGBLOB")
+                except Exception as e:
+                    conn.rollback()
+                    print(f"{table}.{column}: ALTER failed ({e})")
+                    print("  On older TiDB versions run: SET GLOBAL tidb_enable_change_column_type = 1")
+                    continue
+
+            # 2. Rewrite legacy rows in place, a page at a time (keyset on the primary key)
+            converted = scanned = before = after = 0
+            last_id = None
+            while True:
+                where = f"{column} IS NOT NULL" + ("" if last_id is None else " AND id > :last_id")
+                rows = conn.execute(
+                    text(f"SELECT id, {column} FROM {table} WHERE {where} ORDER BY id LIMIT :limit"),
+                    {"last_id": last_id, "limit": BATCH_SIZE},
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                scanned += len(rows)
+
+                for row_id, value in rows:
+                    raw = to_bytes(value)
+                    if raw.startswith(MARKER):
+                        continue  # Already in the tagged format
+
+                    if kind == "json":
+                        # Re-serialize compactly, keeping non-ASCII as UTF-8
+                        raw = json.dumps(json.loads(raw.decode("utf-8")), ensure_ascii=False,
+                                         separators=(",", ":")).encode("utf-8")
+                    stored = compress_payload(raw)
+                    before += len(to_bytes(value))
+                    after += len(stored)
+                    converted += 1
+
+                    if not dry_run:
+                        conn.execute(text(f"UPDATE {table} SET {column} = :v WHERE id = :id"),
+                                     {"v": stored, "id": row_id})
+                if not dry_run:
+                    conn.commit()
+
+            if not dry_run:
+                conn.commit()
+            total_before += before
+            total_after += after
+            saved = (1 - after / before) * 100 if before else 0
+            print(f"{table}.{column}: {converted}/{scanned} rows rewritten, "
+                  f"{before} -> {after} bytes ({saved:.0f}% saved)")
+
+    print(f"Total: {total_before} -> {total_after} bytes" + (" (dry run, nothing written)" if dry_run else ""))
+    if is_mysql and not dry_run:
+        print("Restart the service: it writes compressed values once every column is LONGBLOB.")
+    print("Migration check completed.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert large JSON/text columns to the compressed format")
+    parser.add_argument("--dry-run", action="store_true", help="Report savings without writing")
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -18,8 +18,9 @@ def change_password(username, new_password):
             return
 
         user.hashed_password = get_password_hash(new_password)
+        user.token_version = (user.token_version or 0) + 1  # Sign out existing tokens
         db.commit()
-        print(f"Password for user '{username}' updated successfully.")
+        print(f"Password for user '{username}' updated successfully. Existing tokens revoked.")
     except Exception as e:
         print(f"Error updating password: {e}")
     finally:
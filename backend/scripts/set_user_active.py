@@ -0,0 +1,36 @@
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models import User
+
+def set_active(username, active):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            print(f"Error: User '{username}' not found.")
+            return
+
+        user.is_active = active
+        if not active:
+            user.token_version = (user.token_version or 0) + 1  # Revoke existing tokens
+        db.commit()
+        print(f"User '{username}' {'activated' if active else 'deactivated'}.")
+    except Exception as e:
+        print(f"Error updating user: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Activate or deactivate a user")
+    parser.add_argument("--username", required=True, help="Username")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--activate", action="store_true")
+    group.add_argument("--deactivate", action="store_true")
+
+    args = parser.parse_args()
+    set_active(args.username, args.activate)
@@ -0,0 +1,58 @@
+import sys
+import os
+import asyncio
+import argparse
+
+# Add parent dir to path to allow importing app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.http_client import http_pool
+from app.core.preview_cache import preview_cache
+from app.registry import ADAPTERS
+from app.routers.models import DEFAULT_PREVIEW_TEXT, get_preview, preview_provider
+
+# What the voice picker in Settings asks for
+VOICE_PICKER_TEXT = "Hello! This is a preview of my voice."
+
+
+async def warm(texts, concurrency: int):
+    print(f"Warming voice previews into: {settings.preview_cache_dir}")
+    semaphore = asyncio.Semaphore(concurrency)
+    jobs = []
+    for model_id, adapter_cls in ADAPTERS.items():
+        if preview_provider(model_id) is None:
+            print(f"  {model_id}: no preview provider, skipped")
+            continue
+        for voice in adapter_cls().capabilities.available_voices:
+            for text in texts:
+                jobs.append((model_id, voice["id"], text))
+
+    stats = {"ok": 0, "failed": 0}
+
+    async def run(model_id, voice_id, text):
+        async with semaphore:
+            try:
+                key, audio, _ = await get_preview(model_id, voice_id, text)
+            except HTTPException as e:
+                stats["failed"] += 1
+                print(f"  {model_id}/{voice_id}: {e.status_code} {e.detail}")
+                return
+            stats["ok"] += 1
+            print(f"  {model_id}/{voice_id}: {len(audio)} bytes ({key[:12]})")
+
+    await asyncio.gather(*(run(*job) for job in jobs))
+    await http_pool.aclose()
+    print(f"Done: {stats['ok']} cached, {stats['failed']} failed; {preview_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate voice previews for every adapter voice")
+    parser.add_argument("--text", action="append",
+                        help="Preview text (repeatable); defaults to the API and voice picker texts")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel provider calls")
+    args = parser.parse_args()
+
+    asyncio.run(warm(args.text or [DEFAULT_PREVIEW_TEXT, VOICE_PICKER_TEXT], args.concurrency))
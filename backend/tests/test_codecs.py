@@ -0,0 +1,73 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app.audio.codecs import (
+    MULAW, OPUS, PCM16, AudioCodec, CodecError, MuLawCodec, available_encodings, create_codec, opuslib,
+)
+
+requires_opus = pytest.mark.skipif(opuslib is None, reason="opuslib/libopus not installed")
+
+
+def test_pcm_decode_drops_a_trailing_odd_byte():
+    codec = AudioCodec(16000)
+    samples = np.array([1, -2, 32767], dtype=np.int16)
+    assert codec.decode(codec.encode(samples) + b"\x01").tolist() == samples.tolist()
+
+
+def test_mulaw_reference_values():
+    codec = MuLawCodec(8000)
+    assert codec.encode(np.array([0, 32767, -32768], dtype=np.int16)) == bytes([0xFF, 0x80, 0x00])
+    assert codec.decode(bytes([0xFF, 0x80, 0x00])).tolist() == [0, 32124, -32124]
+
+
+def test_mulaw_round_trip_error_is_bounded():
+    codec = MuLawCodec(8000)
+    samples = np.arange(-32768, 32768, dtype=np.int32).astype(np.int16)
+    decoded = codec.decode(codec.encode(samples))
+    assert len(codec.encode(samples)) == len(samples)  # One byte per sample
+
+    error = np.abs(decoded.astype(np.int32) - samples.astype(np.int32))
+    loud = np.abs(samples.astype(np.int32)) > 256
+    assert error.max() <= 644  # Clipped at 32635
+    assert (error[loud] / np.abs(samples[loud].astype(np.int32))).max() < 0.05
+
+
+def test_mulaw_codes_survive_a_round_trip():
+    codec = MuLawCodec(8000)
+    codes = bytes(code for code in range(256) if code != 0x7F)  # 0x7F is negative zero
+    assert codec.encode(codec.decode(codes)) == codes
+
+
+def test_create_codec():
+    assert create_codec(PCM16, 44100) is None
+    assert isinstance(create_codec(MULAW, 44100), MuLawCodec)
+    assert OPUS not in available_encodings(44100)
+    with pytest.raises(ValueError):
+        create_codec(OPUS, 44100)
+    with pytest.raises(ValueError):
+        create_codec("flac", 16000)
+
+
+@requires_opus
+def test_opus_round_trip_buffers_partial_frames():
+    encoder = create_codec(OPUS, 16000)
+    decoder = create_codec(OPUS, 16000)
+    t = np.arange(16000 // 10) / 16000
+    samples = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16)
+
+    payload = encoder.encode(samples[:500]) + encoder.encode(samples[500:])
+    decoded = decoder.decode(payload)
+    assert len(decoded) == len(samples)  # 100 ms = five 20 ms frames
+    assert np.abs(decoded.astype(np.int32)).max() > 2000
+
+
+@requires_opus
+def test_opus_truncated_packet_raises_codec_error():
+    codec = create_codec(OPUS, 16000)
+    payload = codec.encode(np.zeros(320, dtype=np.int16))
+    with pytest.raises(CodecError):
+        codec.decode(payload[:-1])
+    with pytest.raises(CodecError):
+        codec.decode(struct.pack(">H", 40) + b"\x00" * 10)
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select, text
+
+from app import db_types
+from app.db_types import CompressedJSON, CompressedText, compress_payload, decompress_payload
+
+DOC = {"name": "场景", "steps": [{"n": i, "text": "x" * 50} for i in range(40)], "empty": None}
+LONG_TEXT = "患者主诉胸痛。" * 500
+
+
+@pytest.mark.parametrize("codec", ["none", "zlib", "zstd"])
+def test_payload_round_trip(codec):
+    if codec == "zstd" and db_types.zstandard is None:
+        pytest.skip("zstandard not installed")
+    data = LONG_TEXT.encode("utf-8")
+    stored = compress_payload(data, codec=codec, threshold=0)
+    assert stored[:1] == db_types.MARKER
+    assert decompress_payload(stored) == data
+
+
+def test_small_values_stored_raw():
+    assert compress_payload(b"short", codec="zlib", threshold=1024) == db_types.MARKER + db_types.RAW + b"short"
+
+
+def test_legacy_values_pass_through():
+    assert decompress_payload("plain text") == b"plain text"
+    assert decompress_payload(b'{"a": 1}') == b'{"a": 1}'
+
+
+def test_sqlite_column_round_trip():
+    metadata = MetaData()
+    table = Table(
+        "docs", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("body", CompressedText),
+        Column("doc", CompressedJSON),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(table).values(id=1, body=LONG_TEXT, doc=DOC))
+        conn.execute(insert(table).values(id=2, body=None, doc=None))
+        # Row written before the migration: plain TEXT / JSON
+        conn.execute(text("INSERT INTO docs (id, body, doc) VALUES (3, 'legacy', '{\"a\": [1, 2]}')"))
+
+        rows = {r.id: r for r in conn.execute(select(table))}
+        raw = conn.execute(text("SELECT body FROM docs WHERE id = 1")).scalar()
+
+    assert rows[1].body == LONG_TEXT and rows[1].doc == DOC
+    assert rows[2].body is None and rows[2].doc is None
+    assert rows[3].body == "legacy" and rows[3].doc == {"a": [1, 2]}
+    assert len(raw) < len(LONG_TEXT.encode("utf-8"))  # Actually stored compressed
+
+
+def test_mysql_writes_plain_until_columns_are_blobs(monkeypatch):
+    mysql = SimpleNamespace(name="mysql")
+    monkeypatch.setattr(db_types, "_blob_columns_ready", False)
+    assert CompressedText().process_bind_param("hello", mysql) == "hello"
+    assert CompressedJSON().process_bind_param({"a": "é"}, mysql) == '{"a":"é"}'
+
+    monkeypatch.setattr(db_types, "_blob_columns_ready", True)
+    stored = CompressedJSON().process_bind_param({"a": "é"}, mysql)
+    assert CompressedJSON().process_result_value(stored, mysql) == {"a": "é"}
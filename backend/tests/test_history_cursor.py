@@ -0,0 +1,26 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.history import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    record = SimpleNamespace(start_time=datetime(2025, 3, 1, 12, 30, 45, 123456), id="a|b-1")
+    cursor = encode_cursor(record)
+    assert "/" not in cursor and "+" not in cursor  # Safe in a query string
+    assert decode_cursor(cursor) == (record.start_time, record.id)
+
+
+def test_cursor_without_microseconds():
+    record = SimpleNamespace(start_time=datetime(2025, 3, 1), id="x")
+    assert decode_cursor(encode_cursor(record)) == (record.start_time, "x")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bm8tc2VwYXJhdG9y", "YmFkLWRhdGV8aWQ="])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
@@ -0,0 +1,53 @@
+from app.relay.ingress import IngressLimiter, IngressTotals
+
+
+def test_real_time_audio_is_never_delayed_or_dropped(clock):
+    limiter = IngressLimiter.for_pcm16(16000, clock=clock)  # 32000 B/s
+    for _ in range(500):
+        clock.now += 0.02
+        assert limiter.admit(640) == (True, 0.0)
+    assert limiter.dropped_chunks == 0 and limiter.throttled_chunks == 0
+
+
+def test_backlog_is_paced_then_dropped(clock):
+    limiter = IngressLimiter(1000, burst_seconds=2.0, catchup_factor=2.0, catchup_window=0.2, clock=clock)
+    # 2 s of backlog at once: accepted, paced to 2x real time
+    delays = [limiter.admit(100)[1] for _ in range(20)]
+    assert delays[0] == 0.0
+    # Catch-up bucket holds 400 B; the other 1600 B go out at 2000 B/s
+    assert abs(delays[-1] - 0.8) < 1e-9
+    assert limiter.accepted_bytes == 2000
+    # Beyond the burst allowance: dropped
+    assert limiter.admit(100) == (False, 0.0)
+    assert limiter.dropped_seconds == 0.1
+
+
+def test_oversized_chunk_passes_on_a_full_bucket(clock):
+    limiter = IngressLimiter(1000, burst_seconds=1.0, clock=clock)
+    accepted, _ = limiter.admit(5000)
+    assert accepted
+    assert limiter.admit(1)[0] is False  # In debt until refilled
+
+
+def test_recent_drops_expire_with_the_window(clock):
+    limiter = IngressLimiter(1000, burst_seconds=1.0, drop_window=10.0, clock=clock)
+    limiter.admit(1000)
+    limiter.admit(500)
+    assert limiter.recent_dropped_seconds == 0.5
+    clock.now = 5.0
+    assert limiter.recent_dropped_seconds == 0.5
+    clock.now = 10.5
+    assert limiter.recent_dropped_seconds == 0.0
+    assert limiter.dropped_seconds == 0.5  # Session total is kept
+
+
+def test_totals_aggregate_across_limiters(clock):
+    totals = IngressTotals()
+    for _ in range(2):
+        limiter = IngressLimiter(1000, burst_seconds=1.0, clock=clock, totals=totals)
+        limiter.admit(1000)
+        limiter.admit(500)
+    stats = totals.stats()
+    assert stats["limiters"] == 2
+    assert stats["acceptedSeconds"] == 2.0
+    assert stats["droppedChunks"] == 2 and stats["droppedSeconds"] == 1.0
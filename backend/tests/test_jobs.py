@@ -0,0 +1,220 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.config import settings
+from app.core.jobs import (
+    CANCELLED, FAILED, LOST_ERROR, QUEUED, RUNNING, SUCCEEDED, JobError, JobQueue,
+)
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import Job, User
+
+
+def make_queue(**overrides) -> JobQueue:
+    options = dict(workers=4, provider_limits={}, default_limit=2, poll_seconds=0.05,
+                   stale_seconds=60, max_attempts=2)
+    options.update(overrides)
+    return JobQueue(**options)
+
+
+@pytest.fixture
+def user_id(database):
+    with SessionLocal() as db:
+        user = User(username="jobs-user", role="user")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+async def load_job(job_id: str) -> Job:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def drain(*queues: JobQueue) -> None:
+    """Wait for every task the queues have started"""
+    while any(q._tasks for q in queues):
+        await asyncio.gather(*(t for q in queues for t in q._tasks.values()), return_exceptions=True)
+
+
+def test_only_one_process_claims_a_job(user_id, run_async):
+    calls = []
+
+    async def handler(ctx):
+        calls.append(ctx.job_id)
+        return {"ok": True}
+
+    async def main():
+        first, second = make_queue(), make_queue()  # Two "processes" sharing the table
+        for q in (first, second):
+            q.register("test", handler, provider="p")
+        job = await first.submit(user_id, "test", {})
+        await asyncio.gather(first._claim(), second._claim())
+        await drain(first, second)
+        return await load_job(job.id)
+
+    job = run_async(main())
+    assert calls == [job.id]
+    assert job.status == SUCCEEDED and job.result == {"ok": True} and job.attempts == 1
+
+
+def test_provider_limit_caps_claims(user_id, run_async):
+    async def main():
+        gate = asyncio.Event()
+
+        async def handler(ctx):
+            await gate.wait()
+            return {}
+
+        queue = make_queue(provider_limits={"p": 1})
+        queue.register("test", handler, provider="p")
+        for _ in range(3):
+            await queue.submit(user_id, "test", {})
+        await queue._claim()
+        running = len(queue._tasks)
+        gate.set()
+        await drain(queue)
+        return running
+
+    assert run_async(main()) == 1
+
+
+def test_stale_job_is_requeued_then_failed(user_id, run_async):
+    old = datetime.utcnow() - timedelta(seconds=120)
+
+    async def main():
+        queue = make_queue(max_attempts=2)
+        listener = queue.subscribe(user_id)
+        async with AsyncSessionLocal() as db:
+            retry = Job(user_id=user_id, kind="test", provider="p", status=RUNNING, attempts=1, updated_at=old)
+            lost = Job(user_id=user_id, kind="test", provider="p", status=RUNNING, attempts=2, updated_at=old)
+            fresh = Job(user_id=user_id, kind="test", provider="p", status=RUNNING, attempts=1)
+            db.add_all([retry, lost, fresh])
+            await db.commit()
+        await queue._requeue_stale()
+        event = listener.get_nowait()
+        return [await load_job(j.id) for j in (retry, lost, fresh)], event, lost.id
+
+    (retry, lost, fresh), event, lost_id = run_async(main())
+    assert retry.status == QUEUED
+    assert lost.status == FAILED and lost.error == LOST_ERROR
+    assert fresh.status == RUNNING
+    assert event == {"id": lost_id, "status": FAILED, "error": LOST_ERROR}
+
+
+def test_cancel_from_another_process_wins_over_the_result(user_id, run_async):
+    async def handler(ctx):
+        # Another process cancels the row while this one is finishing
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Job).where(Job.id == ctx.job_id).values(status=CANCELLED))
+            await db.commit()
+        return {"late": True}
+
+    async def main():
+        queue = make_queue()
+        queue.register("test", handler, provider="p")
+        job = await queue.submit(user_id, "test", {})
+        await queue._claim()
+        await drain(queue)
+        return await load_job(job.id)
+
+    job = run_async(main())
+    assert job.status == CANCELLED and job.result is None
+
+
+def test_cancel_stops_a_running_job(user_id, run_async):
+    async def main():
+        started = asyncio.Event()
+
+        async def handler(ctx):
+            started.set()
+            await asyncio.sleep(60)
+
+        queue = make_queue()
+        queue.register("test", handler, provider="p")
+        queue.start()
+        try:
+            job = await queue.submit(user_id, "test", {})
+            await asyncio.wait_for(started.wait(), 5)
+            await queue.cancel(job.id, user_id)
+            await drain(queue)
+            return await load_job(job.id)
+        finally:
+            await queue.stop()
+
+    assert run_async(main()).status == CANCELLED
+
+
+def test_stop_requeues_running_jobs(user_id, run_async):
+    async def main():
+        started = asyncio.Event()
+
+        async def handler(ctx):
+            started.set()
+            await asyncio.sleep(60)
+
+        queue = make_queue()
+        queue.register("test", handler, provider="p")
+        queue.start()
+        job = await queue.submit(user_id, "test", {})
+        await asyncio.wait_for(started.wait(), 5)
+        await queue.stop()
+        return await load_job(job.id)
+
+    assert run_async(main()).status == QUEUED
+
+
+def test_job_error_message_is_kept(user_id, run_async):
+    async def handler(ctx):
+        raise JobError("Gemini API Key not configured")
+
+    async def main():
+        queue = make_queue()
+        queue.register("test", handler, provider="p")
+        job = await queue.submit(user_id, "test", {})
+        await queue._claim()
+        await drain(queue)
+        return await load_job(job.id)
+
+    job = run_async(main())
+    assert job.status == FAILED and job.error == "Gemini API Key not configured"
+
+
+def test_deleted_user_fails_with_a_clear_error(user_id, run_async):
+    async def handler(ctx):
+        return {}
+
+    async def main():
+        queue = make_queue()
+        queue.register("test", handler, provider="p")
+        job = await queue.submit(user_id, "test", {})
+        async with AsyncSessionLocal() as db:
+            await db.delete(await db.get(User, user_id))
+            await db.commit()
+        await queue._claim()
+        await drain(queue)
+        return await load_job(job.id)
+
+    job = run_async(main())
+    assert job.status == FAILED and job.error == "User not found"
+
+
+def test_job_over_provider_quota_goes_back_to_the_queue(user_id, run_async, monkeypatch):
+    monkeypatch.setattr(settings, "quota_provider_concurrency", {"p": 0})
+
+    async def handler(ctx):
+        return {}
+
+    async def main():
+        queue = make_queue()
+        queue.register("test", handler, provider="p")
+        job = await queue.submit(user_id, "test", {})
+        await queue._claim()
+        await drain(queue)
+        return await load_job(job.id), queue.deferred
+
+    job, deferred = run_async(main())
+    assert job.status == QUEUED and job.attempts == 0
+    assert deferred == 1
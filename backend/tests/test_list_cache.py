@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.core import list_cache as list_cache_module
+from app.core.list_cache import CACHED_TABLES, VersionedListCache, bump_version, not_modified, seed_versions
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import CacheVersion
+
+
+@pytest.fixture
+def cache(database, monkeypatch):
+    seed_versions(database)
+    cache = VersionedListCache(poll_seconds=3600, max_bytes=1024)
+    # The after_commit hook forgets versions on the module's singleton
+    monkeypatch.setattr(list_cache_module, "list_cache", cache)
+    return cache
+
+
+def builder(body: bytes):
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return body
+    return build, calls
+
+
+async def get(cache, scope, build, table="roles"):
+    async with AsyncSessionLocal() as db:
+        return await cache.get_or_build(db, table, scope, build)
+
+
+def bump(table="roles", commit=True):
+    with SessionLocal() as db:
+        bump_version(db, table)
+        if commit:
+            db.commit()
+        else:
+            db.rollback()
+
+
+def test_hits_until_a_committed_bump(cache, run_async):
+    build, calls = builder(b"[1]")
+
+    async def main():
+        first = await get(cache, "u1", build)
+        second = await get(cache, "u1", build)
+        bump(commit=False)  # Rolled back: still cached
+        third = await get(cache, "u1", build)
+        bump()
+        fourth = await get(cache, "u1", build)
+        return first, second, third, fourth
+
+    first, second, third, fourth = run_async(main())
+    assert first is second is third
+    assert fourth is not first and fourth.version == first.version + 1
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_bump_only_invalidates_its_table(cache, run_async):
+    build, calls = builder(b"[]")
+
+    async def main():
+        await get(cache, "u1", build, table="roles")
+        await get(cache, "u1", build, table="scenarios")
+        bump("roles")
+        await get(cache, "u1", build, table="scenarios")
+
+    run_async(main())
+    assert len(calls) == 2
+
+
+def test_lru_bounded_by_bytes(cache, run_async):
+    async def main():
+        for scope in ("a", "b", "c"):
+            await get(cache, scope, builder(b"x" * 400)[0])
+        await get(cache, "huge", builder(b"x" * 2000)[0])  # Larger than the whole cache: not kept
+        build, calls = builder(b"x" * 400)
+        await get(cache, "a", build)  # Evicted as least recently used
+        await get(cache, "c", build)  # Still cached
+        return calls
+
+    assert len(run_async(main())) == 1
+    assert cache._total <= cache.max_bytes
+
+
+def test_seed_versions_is_idempotent(database):
+    seed_versions(database)
+    seed_versions(database)
+    with SessionLocal() as db:
+        rows = dict(db.execute(select(CacheVersion.name, CacheVersion.version)).all())
+    assert rows == {table: 0 for table in CACHED_TABLES}
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"old", "abc"', True),
+    ('"old"', False),
+    ("*", True),
+])
+def test_not_modified(header, expected):
+    request = SimpleNamespace(headers={"if-none-match": header} if header else {})
+    assert not_modified(request, '"abc"') is expected
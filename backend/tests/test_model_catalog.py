@@ -0,0 +1,62 @@
+import json
+
+from app.adapters.base import ModelCapabilities
+from app.config import settings
+from app.core.model_catalog import ModelCatalog, provider_for
+
+
+def adapter(model_id: str, provider: str, is_enabled: bool = True):
+    class FakeAdapter:
+        capabilities = ModelCapabilities(id=model_id, name=model_id, provider=provider, is_enabled=is_enabled)
+    return FakeAdapter
+
+
+ADAPTERS = {
+    "gemini": adapter("gemini", "Google"),
+    "openai-realtime": adapter("openai-realtime", "OpenAI"),
+    "grok-beta": adapter("grok-beta", "xAI"),
+    "custom": adapter("custom", "Other", is_enabled=False),
+}
+
+
+def catalog(monkeypatch, gemini_key="", openai_key=""):
+    monkeypatch.setattr(settings, "gemini_api_key", gemini_key)
+    monkeypatch.setattr(settings, "openai_api_key", openai_key)
+    monkeypatch.setattr(settings, "xai_api_key", "")
+    return ModelCatalog(ADAPTERS)
+
+
+def test_server_keys_enable_models_for_everyone(monkeypatch):
+    cat = catalog(monkeypatch, gemini_key="server-key")
+    assert cat.enabled_bits(None) == 0b0001
+    assert cat.enabled_bits({}) == 0b0001
+
+
+def test_user_keys_add_their_models(monkeypatch):
+    cat = catalog(monkeypatch, gemini_key="server-key")
+    assert cat.enabled_bits({"customOpenaiKey": "sk-user"}) == 0b0011
+    assert cat.enabled_bits({"customOpenaiKey": "sk-user", "customXaiKey": "xai"}) == 0b0111
+    assert cat.enabled_bits({"customOpenaiKey": ""}) == 0b0001  # Empty key does not count
+
+
+def test_unknown_provider_follows_adapter_flag(monkeypatch):
+    cat = catalog(monkeypatch)
+    assert cat.enabled_bits({"customApiKey": "k"}) & 0b1000 == 0
+    enabled = dict(ADAPTERS, custom=adapter("custom", "Other", is_enabled=True))
+    assert ModelCatalog(enabled).enabled_bits(None) & 0b1000
+
+
+def test_list_body_built_once_per_bitmap(monkeypatch):
+    cat = catalog(monkeypatch, gemini_key="server-key")
+    first = cat.list_body({"customOpenaiKey": "a"})
+    assert cat.list_body({"customOpenaiKey": "b"}) is first  # Same bitmap, different key
+    assert cat.list_body(None) is not first
+
+    models = {m["id"]: m["isEnabled"] for m in json.loads(first.body)}
+    assert models == {"gemini": True, "openai-realtime": True, "grok-beta": False, "custom": False}
+
+
+def test_provider_for_maps_model_ids():
+    assert provider_for("openai-realtime") == "openai"
+    assert provider_for("gemini") == "gemini"
+    assert provider_for("unknown-model") == "unknown-model"
@@ -0,0 +1,80 @@
+import wave
+
+import numpy as np
+
+from app.audio.peaks import PeakIndexBuilder, build_peak_index_from_wav, load_peak_level
+from app.audio.recorder import StereoRecorder
+
+RATE = 100
+
+
+def stereo(left, right):
+    return np.stack([np.asarray(left, dtype=np.int16), np.asarray(right, dtype=np.int16)], axis=1)
+
+
+def test_blocks_hold_peak_and_rms_per_channel():
+    builder = PeakIndexBuilder(RATE, block_size=4, levels=2, factor=2)
+    builder.add(stereo([3, -4, 0, 0], [1, 1, 1, 1])[:3])  # Split mid-block
+    builder.add(stereo([3, -4, 0, 0], [1, 1, 1, 1])[3:])
+    builder.add(stereo([-32768, 0], [0, 0]))  # Partial block, zero-padded on build
+
+    arrays = builder.build()
+    assert arrays["block_sizes"].tolist() == [4, 8]
+    assert arrays["peak_0"].tolist() == [[4, 1], [32767, 0]]  # Clipped to int16
+    assert arrays["rms_0"].tolist() == [[2, 1], [16384, 0]]
+    assert arrays["peak_1"].tolist() == [[32767, 1]]
+
+
+def test_coarser_levels_pad_the_last_group():
+    builder = PeakIndexBuilder(RATE, channels=1, block_size=1, levels=3, factor=2)
+    builder.add(np.array([[1], [5], [2]], dtype=np.int16))
+
+    arrays = builder.build()
+    assert [arrays[f"peak_{level}"][:, 0].tolist() for level in range(3)] == [[1, 5, 2], [5, 2], [5]]
+
+
+def test_backfill_matches_incremental_index(tmp_path):
+    frames = stereo(np.arange(1000) % 300, -(np.arange(1000) % 200))
+    wav_path = str(tmp_path / "session.wav")
+    with wave.open(wav_path, "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(frames.astype("<i2").tobytes())
+
+    build_peak_index_from_wav(wav_path, str(tmp_path / "session.peaks.npz"), chunk_frames=77)
+    incremental = PeakIndexBuilder(RATE)
+    incremental.add(frames)
+    expected = incremental.build()
+
+    with np.load(str(tmp_path / "session.peaks.npz")) as data:
+        assert sorted(data.files) == sorted(expected)
+        for name, array in expected.items():
+            assert data[name].tolist() == array.tolist()
+
+
+def test_load_picks_finest_level_that_fits(tmp_path):
+    builder = PeakIndexBuilder(RATE, channels=1, block_size=1, levels=3, factor=4)
+    builder.add(np.full((32, 1), 32767, dtype=np.int16))
+    path = str(tmp_path / "session.peaks.npz")
+    builder.save(path)
+
+    assert load_peak_level(path)["level"] == 0
+    fitted = load_peak_level(path, max_points=8)
+    assert (fitted["level"], fitted["samples_per_point"]) == (1, 4)
+    assert fitted["peaks"][0].tolist() == [127] * 8
+    assert load_peak_level(path, max_points=1)["level"] == 2  # Coarsest when nothing fits
+
+
+def test_peak_index_written_next_to_recording(tmp_path, clock):
+    path = str(tmp_path / "session.wav")
+    peaks_path = str(tmp_path / "session.peaks.npz")
+    recorder = StereoRecorder(path, sample_rate=RATE, clock=clock, peaks_path=peaks_path)
+    clock.now = 1.0
+    recorder.push_user(np.full(100, 100, dtype=np.int16), RATE)
+    recorder.close()
+
+    with np.load(peaks_path) as data:
+        assert int(data["sample_rate"]) == RATE
+        assert data["peak_0"].tolist() == [[100, 0]]
+
@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core import quotas as quotas_module
+from app.core.quotas import Lease, MemoryQuotaBackend, QuotaExceeded, QuotaService, tool_quota
+
+
+def user(user_id: str = "u1", role: str = "user"):
+    return SimpleNamespace(id=user_id, role=role)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "quota_sessions_per_user", {"admin": 3, "user": 1})
+    monkeypatch.setattr(settings, "quota_tool_calls_per_minute", {"user": 60})
+    monkeypatch.setattr(settings, "quota_tool_burst", {"user": 2})
+    monkeypatch.setattr(settings, "quota_tool_concurrency_per_user", {"user": 1})
+    monkeypatch.setattr(settings, "quota_provider_concurrency", {"gemini": 2})
+    return QuotaService(MemoryQuotaBackend(), lease_seconds=60)
+
+
+def test_session_limit_by_role_and_release(service):
+    async def main():
+        lease = await service.acquire_session(user(), "openai")
+        with pytest.raises(QuotaExceeded):
+            await service.acquire_session(user(), "openai")
+        admin = [await service.acquire_session(user("a", "admin"), "openai") for _ in range(3)]
+        await lease.release()
+        await lease.release()  # Idempotent
+        again = await service.acquire_session(user(), "openai")
+        for held in admin + [again]:
+            await held.release()
+        return service.backend.in_use()
+
+    assert asyncio.run(main()) == {}
+    assert service.refused == {"sessions_per_user": 1}
+
+
+def test_provider_limit_is_all_or_nothing(service):
+    async def main():
+        held = [await service.acquire_session(user(f"u{i}"), "gemini") for i in range(2)]
+        with pytest.raises(QuotaExceeded):
+            await service.acquire_session(user("u3"), "gemini")
+        # The refused request's per-user slot was given back
+        in_use = service.backend.in_use()
+        for lease in held:
+            await lease.release()
+        return in_use
+
+    in_use = asyncio.run(main())
+    assert "sessions:user:u3" not in in_use
+    assert in_use["inflight:provider:gemini"] == 2
+    assert service.refused == {"provider": 1}
+
+
+def test_sessions_and_tool_calls_share_the_provider_bucket(service):
+    async def main():
+        session = await service.acquire_session(user("u1"), "gemini")
+        tool = await service.acquire_tool_slot(user("u2"), "gemini")
+        with pytest.raises(QuotaExceeded):
+            await service.acquire_tool_slot(user("u3"), "gemini")
+        await session.release()
+        await tool.release()
+
+    asyncio.run(main())
+
+
+def test_tool_rate_refusal_has_retry_after(service):
+    async def main():
+        await service.check_rate(user())
+        await service.check_rate(user())
+        with pytest.raises(QuotaExceeded) as exc:
+            await service.check_rate(user())
+        return exc.value
+
+    refused = asyncio.run(main())
+    assert 0 < refused.retry_after <= 1.0  # 60/min = one token per second
+    assert refused.as_http().status_code == 429
+
+
+def test_tool_quota_releases_on_exception(service, monkeypatch):
+    monkeypatch.setattr(quotas_module, "quotas", service)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with tool_quota(user(), "gemini"):
+                assert service.backend.in_use()["tools:inflight:user:u1"] == 1
+                raise RuntimeError("provider failed")
+        in_use = service.backend.in_use()
+        # Over the per-user limit: HTTP 429, nothing left held
+        async with tool_quota(user(), "gemini"):
+            with pytest.raises(HTTPException) as exc:
+                async with tool_quota(user(), "gemini"):
+                    pass
+        return in_use, exc.value
+
+    in_use, refused = asyncio.run(main())
+    assert in_use == {}
+    assert refused.status_code == 429 and "Retry-After" in refused.headers
+    assert service.backend.in_use() == {}
+
+
+class SharedBackend:
+    """Stand-in for the Redis backend (leases are renewed); can fail on demand"""
+
+    def __init__(self):
+        self._memory = MemoryQuotaBackend()
+        self.refreshes = 0
+        self.down = False
+
+    async def acquire(self, key, limit, lease_id, ttl):
+        if self.down:
+            raise ConnectionError("backend unreachable")
+        return await self._memory.acquire(key, limit, lease_id, ttl)
+
+    async def release(self, key, lease_id):
+        await self._memory.release(key, lease_id)
+
+    async def refresh(self, key, lease_id, ttl):
+        self.refreshes += 1
+
+
+def test_shared_backend_leases_are_renewed_until_released():
+    backend = SharedBackend()
+
+    async def main():
+        lease = Lease(backend, ["k"], "lease-1", ttl=0.03)  # Renews every 10 ms
+        await asyncio.sleep(0.06)
+        await lease.release()
+        renewed = backend.refreshes
+        await asyncio.sleep(0.03)
+        return renewed, backend.refreshes
+
+    renewed, after = asyncio.run(main())
+    assert renewed >= 2
+    assert after == renewed  # Renewal stops on release
+
+
+def test_unreachable_backend_does_not_block(service):
+    backend = SharedBackend()
+    backend.down = True
+    service.backend = backend
+
+    async def main():
+        lease = await service.acquire_session(user(), "gemini")
+        await lease.release()
+        return lease.keys
+
+    assert asyncio.run(main()) == []
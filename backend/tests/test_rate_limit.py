@@ -0,0 +1,50 @@
+import asyncio
+
+from app.core.rate_limit import ProviderRateLimits, TokenBucket
+
+
+def test_burst_then_refusal_with_retry_after(clock):
+    bucket = TokenBucket(per_minute=60, burst=3, clock=clock)
+    assert [bucket.acquire("ip") for _ in range(3)] == [None, None, None]
+    assert bucket.acquire("ip") == 1.0  # One token per second
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(per_minute=60, burst=2, clock=clock)
+    bucket.acquire("ip")
+    bucket.acquire("ip")
+    clock.now = 0.5
+    assert bucket.acquire("ip") == 0.5
+    clock.now = 100
+    assert bucket.acquire("ip") is None
+    assert bucket.acquire("ip") is None
+    assert bucket.acquire("ip") is not None
+
+
+def test_keys_are_independent_and_bounded(clock):
+    bucket = TokenBucket(per_minute=1, burst=1, max_keys=2, clock=clock)
+    assert bucket.acquire("a") is None
+    assert bucket.acquire("b") is None
+    assert bucket.acquire("a") is not None
+    bucket.acquire("c")  # Evicts the least recently used key ("b")
+    assert bucket.acquire("b") is None
+
+
+def test_zero_rate_never_refills(clock):
+    bucket = TokenBucket(per_minute=0, burst=1, clock=clock)
+    assert bucket.acquire("k") is None
+    assert bucket.acquire("k") == 60.0
+
+
+def test_provider_limits_pace_calls():
+    limits = ProviderRateLimits({"fast": 6000}, default_per_minute=6000, burst=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(3):
+            await limits.wait("fast")
+        return loop.time() - start
+
+    # 100/s with burst 1: the 2nd and 3rd calls wait ~10 ms each
+    assert asyncio.run(run()) >= 0.015
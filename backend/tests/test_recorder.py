@@ -0,0 +1,93 @@
+import os
+import wave
+
+import numpy as np
+
+from app.audio.recorder import StereoRecorder, _Track, sweep_recordings
+
+RATE = 100  # One sample per 10 ms keeps the arithmetic readable
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wf:
+        assert (wf.getnchannels(), wf.getframerate()) == (2, RATE)
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2").reshape(-1, 2)
+
+
+def tone(value, count):
+    return np.full(count, value, dtype=np.int16)
+
+
+def test_track_take_spans_chunks_and_pads():
+    track = _Track(RATE)
+    track.append(np.array([1, 2, 3], dtype=np.int16))
+    track.append(np.array([4, 5], dtype=np.int16))
+
+    assert track.take(4).tolist() == [1, 2, 3, 4]
+    assert track.length == 1
+    assert track.take(3).tolist() == [5, 0, 0]
+    assert track.length == 0 and not track.pending
+
+
+def test_streams_are_aligned_on_the_clock(tmp_path, clock):
+    path = str(tmp_path / "session.wav")
+    recorder = StereoRecorder(path, sample_rate=RATE, clock=clock)
+
+    clock.now = 0.5
+    # A model burst arrives at once and is played back to back, after 0.5 s of silence
+    recorder.push_model(tone(2, 25), RATE)
+    recorder.push_model(tone(3, 25), RATE)
+    clock.now = 1.0
+    # The microphone chunk ends at arrival time, so it covers 0.0 - 1.0
+    recorder.push_user(tone(1, 100), RATE)
+    assert recorder.duration == 1.0  # Both channels were ready, so the batch was flushed
+    recorder.close()
+
+    frames = read_wav(path)
+    assert frames[:, 0].tolist() == [1] * 100
+    assert frames[:, 1].tolist() == [0] * 50 + [2] * 25 + [3] * 25
+
+
+def test_quiet_channel_is_padded_after_max_lag(tmp_path, clock):
+    path = str(tmp_path / "session.wav")
+    recorder = StereoRecorder(path, sample_rate=RATE, max_lag=2.0, clock=clock)
+
+    for second in (1, 2, 3):
+        clock.now = second
+        recorder.push_user(tone(second, RATE), RATE)
+    assert recorder.duration == 1.0  # Only audio older than max_lag is flushed
+    recorder.close()
+    recorder.close()  # Idempotent
+    recorder.push_user(tone(9, RATE), RATE)  # Ignored once closed
+
+    frames = read_wav(path)
+    assert frames[:, 0].tolist() == [1] * 100 + [2] * 100 + [3] * 100
+    assert not frames[:, 1].any()
+
+
+def test_idle_gap_is_filled_with_silence(tmp_path, clock):
+    path = str(tmp_path / "session.wav")
+    recorder = StereoRecorder(path, sample_rate=RATE, clock=clock)
+
+    clock.now = 1.0
+    recorder.push_user(tone(1, 100), RATE)
+    clock.now = 3.0
+    recorder.push_user(tone(2, 100), RATE)  # Nothing was captured between 1.0 and 2.0
+    recorder.close()
+
+    assert read_wav(path)[:, 0].tolist() == [1] * 100 + [0] * 100 + [2] * 100
+
+
+def test_sweep_removes_only_old_recordings(tmp_path):
+    user_dir = tmp_path / "user-1"
+    user_dir.mkdir()
+    names = ["old.wav", "old.peaks.npz", "new.wav", "notes.txt"]
+    for name in names:
+        (user_dir / name).write_bytes(b"x")
+    day = 86400
+    for name in ("old.wav", "old.peaks.npz", "notes.txt"):
+        os.utime(user_dir / name, (10 * day, 10 * day))
+    os.utime(user_dir / "new.wav", (19 * day, 19 * day))
+
+    assert sweep_recordings(str(tmp_path), max_age_days=7, now=20 * day) == 2
+    assert sorted(os.listdir(user_dir)) == ["new.wav", "notes.txt"]
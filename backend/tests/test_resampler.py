@@ -0,0 +1,39 @@
+import numpy as np
+
+from app.audio.resampler import StreamingResampler, resample_pcm16
+
+
+def _signal(n: int) -> np.ndarray:
+    t = np.arange(n)
+    return (8000 * np.sin(2 * np.pi * 440 * t / 16000)).astype(np.int16)
+
+
+def test_chunked_output_matches_one_shot():
+    samples = _signal(16000)
+    for in_rate, out_rate in [(16000, 24000), (48000, 16000), (24000, 8000), (44100, 24000)]:
+        whole = resample_pcm16(samples, in_rate, out_rate)
+        resampler = StreamingResampler(in_rate, out_rate)
+        # Uneven chunk sizes, including empty and single-sample chunks
+        sizes = [0, 1, 160, 333, 7, 1024, 2]
+        chunks, pos, i = [], 0, 0
+        while pos < len(samples):
+            size = sizes[i % len(sizes)]
+            chunks.append(resampler.process(samples[pos:pos + size]))
+            pos += size
+            i += 1
+        assert np.array_equal(np.concatenate(chunks), whole), (in_rate, out_rate)
+
+
+def test_output_length_follows_ratio():
+    out = resample_pcm16(_signal(16000), 16000, 24000)
+    assert abs(len(out) - 24000) <= 1
+
+
+def test_passthrough_and_reset():
+    samples = _signal(100)
+    assert np.array_equal(StreamingResampler(16000, 16000).process(samples), samples)
+
+    resampler = StreamingResampler(16000, 24000)
+    first = resampler.process(samples)
+    resampler.reset()
+    assert np.array_equal(resampler.process(samples), first)
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight, request_key
+
+
+def test_request_key_ignores_dict_order():
+    assert request_key("image", "m", {"a": 1, "b": 2}, "u1") == request_key("image", "m", {"b": 2, "a": 1}, "u1")
+    assert request_key("image", "m", {"a": 1}, "u1") != request_key("image", "m", {"a": 1}, "u2")
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight(ttl=0, max_entries=10)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", call) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert calls == 1
+    assert flight.stats()["sharedInFlight"] == 4
+
+
+def test_results_cached_until_ttl(clock):
+    flight = SingleFlight(ttl=10, max_entries=10, clock=clock)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def run():
+        first = await flight.do("k", call)
+        clock.now = 5
+        cached = await flight.do("k", call)
+        clock.now = 11
+        fresh = await flight.do("k", call)
+        return first, cached, fresh
+
+    assert asyncio.run(run()) == (1, 1, 2)
+    assert flight.cache_hits == 1
+
+
+def test_failures_are_not_cached():
+    flight = SingleFlight(ttl=10, max_entries=10)
+    attempts = 0
+
+    async def call():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RuntimeError("provider down")
+        return "ok"
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await flight.do("k", call)
+        return await flight.do("k", call)
+
+    assert asyncio.run(run()) == "ok"
+    assert attempts == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    flight = SingleFlight(ttl=0, max_entries=10)
+
+    async def call():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flight.do("k", call))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("k", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_cache_bounded_by_max_entries():
+    flight = SingleFlight(ttl=60, max_entries=2)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await flight.do(key, lambda key=key: asyncio.sleep(0, key))
+
+    asyncio.run(run())
+    assert flight.stats()["cached"] == 2
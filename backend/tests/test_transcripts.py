@@ -0,0 +1,81 @@
+import asyncio
+
+from app.relay.transcripts import TranscriptAggregator
+
+
+def collect(window=0.05, max_chars=200):
+    sent = []
+    aggregator = TranscriptAggregator(lambda role, text, is_final: sent.append((role, text, is_final)),
+                                      window=window, max_chars=max_chars)
+    return aggregator, sent
+
+
+def test_deltas_merge_until_the_window_expires():
+    aggregator, sent = collect(window=0.01)
+
+    async def run():
+        for delta in ("Hel", "lo", " there"):
+            aggregator.add("model", delta)
+        assert sent == []
+        await asyncio.sleep(0.03)
+
+    asyncio.run(run())
+    assert sent == [("model", "Hello there", False)]
+    assert (aggregator.deltas_in, aggregator.messages_out) == (3, 1)
+
+
+def test_sentence_boundary_and_size_flush_early():
+    aggregator, sent = collect(window=10, max_chars=5)
+
+    async def run():
+        aggregator.add("model", "你好")
+        aggregator.add("model", "。")
+        aggregator.add("user", "abc")
+        aggregator.add("user", "def")
+        aggregator.close()
+
+    asyncio.run(run())
+    assert sent == [("model", "你好。", False), ("user", "abcdef", False)]
+
+
+def test_role_switch_keeps_interleaving_order():
+    aggregator, sent = collect(window=10)
+
+    async def run():
+        aggregator.add("user", "hi")
+        aggregator.add("model", "hello")
+        aggregator.add("user", "again")
+        aggregator.flush()
+
+    asyncio.run(run())
+    assert sent == [("user", "hi", False), ("model", "hello", False), ("user", "again", False)]
+
+
+def test_final_delta_is_sent_as_final():
+    aggregator, sent = collect(window=10)
+
+    async def run():
+        aggregator.add("model", "partial ")
+        aggregator.add("model", "answer", is_final=True)
+
+    asyncio.run(run())
+    assert sent == [("model", "partial answer", True)]
+
+
+def test_close_cancels_pending_timer():
+    aggregator, sent = collect(window=0.01)
+
+    async def run():
+        aggregator.add("model", "dropped")
+        aggregator.close()
+        await asyncio.sleep(0.03)
+
+    asyncio.run(run())
+    assert sent == []
+
+
+def test_zero_window_passes_deltas_through():
+    aggregator, sent = collect(window=0)
+    aggregator.add("model", "a")
+    aggregator.add("model", "b", is_final=True)
+    assert sent == [("model", "a", False), ("model", "b", True)]
@@ -0,0 +1,146 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import user_cache
+from app.core.user_cache import TTLCache, UserSnapshot, invalidate_user, resolve_principal, resolve_user
+
+
+def make_snapshot(username, token_version=0):
+    return UserSnapshot(SimpleNamespace(
+        id=1, username=username, role="user", is_active=True, avatar_url=None,
+        settings={}, token_version=token_version,
+    ))
+
+
+@pytest.fixture
+def users(monkeypatch, clock):
+    """In-memory user table behind fresh caches; `users.loads` counts lookups"""
+    table = {}
+    loads = []
+
+    async def load(username):
+        loads.append(username)
+        await asyncio.sleep(0)
+        user = table.get(username)
+        return make_snapshot(username, user) if user is not None else None
+
+    monkeypatch.setattr(user_cache, "load_user_snapshot", load)
+    monkeypatch.setattr(user_cache, "ws_user_cache", TTLCache(60, 10, 100, clock=clock))
+    monkeypatch.setattr(user_cache, "principal_cache", TTLCache(60, 10, 100, clock=clock))
+    return SimpleNamespace(table=table, loads=loads)
+
+
+def test_ttl_cache_expires_and_evicts_lru(clock):
+    cache = TTLCache(ttl=60, negative_ttl=10, max_size=2, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", None)
+    clock.advance(11)
+    assert cache.get("b") == (False, None)  # Negative entries expire sooner
+    assert cache.get("a") == (True, 1)
+
+    cache.put("c", 3)
+    cache.get("a")
+    cache.put("d", 4)
+    assert cache.get("c") == (False, None)  # Least recently used
+    assert cache.get("a") == (True, 1)
+    clock.advance(60)
+    assert cache.get("a") == (False, None)
+
+
+def test_resolve_user_caches_hits_and_unknown_users(users):
+    users.table["alice"] = 0
+
+    async def run():
+        return [await resolve_user(name) for name in ("alice", "alice", "mallory", "mallory")]
+
+    alice, again, unknown, _ = asyncio.run(run())
+    assert alice is again and alice.username == "alice"
+    assert unknown is None
+    assert users.loads == ["alice", "mallory"]
+
+
+def test_concurrent_misses_share_one_lookup(users):
+    users.table["alice"] = 0
+
+    async def run():
+        return await asyncio.gather(*(resolve_user("alice") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len({id(user) for user in results}) == 1
+    assert users.loads == ["alice"]
+
+
+def test_newer_token_version_reloads_once(users):
+    users.table["alice"] = 0
+
+    async def run():
+        await resolve_user("alice", 0)
+        users.table["alice"] = 1  # passwd_user.py bumped the version out of process
+        stale = await resolve_user("alice", 0)
+        fresh = await resolve_user("alice", 1)
+        old = await resolve_user("alice", 0)
+        return stale, fresh, old
+
+    stale, fresh, old = asyncio.run(run())
+    assert stale is not None  # Still cached: revocation waits for the TTL
+    assert fresh.token_version == 1
+    assert old is None
+    assert users.loads == ["alice", "alice"]
+
+
+def test_invalidate_user_drops_cached_entry(users):
+    users.table["alice"] = 0
+
+    async def run():
+        await resolve_user("alice")
+        invalidate_user(None, "alice")
+        await resolve_user("alice")
+
+    asyncio.run(run())
+    assert users.loads == ["alice", "alice"]
+
+
+def test_principals_cached_per_token(users):
+    users.table["alice"] = 0
+
+    async def run():
+        first = await resolve_principal({"sub": "alice", "jti": "t1"})
+        again = await resolve_principal({"sub": "alice", "jti": "t1"})
+        other = await resolve_principal({"sub": "alice", "jti": "t2"})
+        legacy = await resolve_principal({"sub": "alice"})
+        return first, again, other, legacy
+
+    first, again, other, legacy = asyncio.run(run())
+    assert first is again
+    assert other is not None and legacy is not None
+    assert users.loads == ["alice"] * 3
+
+
+def test_principal_with_old_version_is_revoked(users):
+    users.table["alice"] = 2
+
+    async def run():
+        return (await resolve_principal({"sub": "alice", "jti": "t1", "ver": 1}),
+                await resolve_principal({"sub": "alice", "jti": "t2", "ver": 2}))
+
+    revoked, current = asyncio.run(run())
+    assert revoked is None
+    assert current.token_version == 2
+
+
+def test_invalidate_user_drops_every_token_of_the_user(users):
+    users.table["alice"] = 0
+    users.table["bob"] = 0
+
+    async def run():
+        for payload in ({"sub": "alice", "jti": "t1"}, {"sub": "alice", "jti": "t2"},
+                        {"sub": "bob", "jti": "t3"}):
+            await resolve_principal(payload)
+        invalidate_user("alice")
+        for payload in ({"sub": "alice", "jti": "t1"}, {"sub": "bob", "jti": "t3"}):
+            await resolve_principal(payload)
+
+    asyncio.run(run())
+    assert users.loads == ["alice", "alice", "bob", "alice"]
@@ -52,9 +52,14 @@ if (Test-Path $envFile) {
 }
 $envString = $envVars -join ","
 
+# Background jobs (/api/jobs) run inside the instance after the request has returned, and the
+# relay keeps realtime sessions open: CPU must stay allocated between requests, and at least
+# one instance must stay up so queued jobs are picked up when no requests arrive.
+$runtimeFlags = "--no-cpu-throttling --min-instances 1"
+
 if (-not $envString) {
     Write-Warning "No environment variables found in $envFile or file missing."
-    $backendDeployCommand = "gcloud run deploy $SERVICE_NAME --source ./backend --region $REGION --project $PROJECT_ID --allow-unauthenticated"
+    $backendDeployCommand = "gcloud run deploy $SERVICE_NAME --source ./backend --region $REGION --project $PROJECT_ID --allow-unauthenticated $runtimeFlags"
 }
 else {
     Write-Host "Found environment variables, injecting into deployment (truncated for security):"
@@ -62,7 +67,7 @@ else {
         if ($_.StartsWith("DATABASE_URL")) { Write-Host $_ } 
         else { Write-Host ($_.Split('=')[0] + "=[REDACTED]") }
     }
-    $backendDeployCommand = "gcloud run deploy $SERVICE_NAME --source ./backend --region $REGION --project $PROJECT_ID --allow-unauthenticated --set-env-vars ""$envString"""
+    $backendDeployCommand = "gcloud run deploy $SERVICE_NAME --source ./backend --region $REGION --project $PROJECT_ID --allow-unauthenticated $runtimeFlags --set-env-vars ""$envString"""
 }
 
 Write-Host "Executing: $backendDeployCommand"
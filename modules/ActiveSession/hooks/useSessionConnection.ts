@@ -40,7 +40,8 @@ export const useSessionConnection = (scenarioId: string, roleId: string) => {
 
   // Session Data
   const startTimeRef = useRef<number>(0);
-  const sessionDataRef = useRef<{ id: string }>({ id: Date.now().toString() });
+  // historyId/recordingId come from the relay's 'session.created'
+  const sessionDataRef = useRef<{ id: string, historyId?: string | null, recordingId?: string | null }>({ id: Date.now().toString() });
 
   // Transcription Storage
   const transcriptHistoryRef = useRef<ChatMessage[]>([]);
@@ -244,6 +245,9 @@ Do not break character. Speak Chinese.
           socketRef.current = null;
           setStatus('error');
           log(`Socket Error: ${err}`, 'error');
+        },
+        (info) => {
+          sessionDataRef.current = { ...sessionDataRef.current, historyId: info.historyId, recordingId: info.recordingId };
         }
       );
 
@@ -253,6 +257,7 @@ Do not break character. Speak Chinese.
       const connectConfig = {
         ...config,
         voiceId: userSettings.selectedVoice,
+        session: { scenarioId, roleId },
         audio: {
           sampleRate: config.sampleRate,
           encoding: 'pcm_s16le',
@@ -357,8 +362,12 @@ Do not break character. Speak Chinese.
       ];
     }
 
+    // Posting with the relay's record id finalizes that record; its server-side transcript
+    // wins over `messages`, which only fills in if the relay could not persist anything
+    const { id, historyId, recordingId } = sessionDataRef.current;
     return {
-      id: sessionDataRef.current.id,
+      id: historyId || id,
+      recordingId: recordingId || undefined,
       scenarioId,
       roleId,
       score: 75, // Initial placeholder score
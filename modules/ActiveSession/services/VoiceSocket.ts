@@ -1,4 +1,10 @@
 
+export interface SessionCreatedInfo {
+    sessionId: string;
+    historyId: string | null; // History record the relay persists the transcript into
+    recordingId: string | null;
+}
+
 export class VoiceSocket {
     private ws: WebSocket | null = null;
     private url: string;
@@ -6,6 +12,7 @@ export class VoiceSocket {
     private onAudioCallback: (b64: string) => void;
     private onTranscriptCallback: (role: 'user' | 'model' | 'system', text: string) => void;
     private onErrorCallback: (err: any) => void;
+    private onSessionCreatedCallback?: (info: SessionCreatedInfo) => void;
     private audioSequence: number = 0;
 
     constructor(
@@ -14,7 +21,8 @@ export class VoiceSocket {
         onLog: (msg: string, type: 'info' | 'error' | 'stream', category?: 'system' | 'transcript') => void,
         onAudio: (b64: string) => void,
         onTranscript: (role: 'user' | 'model' | 'system', text: string) => void,
-        onError: (err: any) => void
+        onError: (err: any) => void,
+        onSessionCreated?: (info: SessionCreatedInfo) => void
     ) {
         // Protocol mapping: wss://{host}/ws/{model_id}?token={token}
         const apiOverride = localStorage.getItem('VITE_API_BASE_URL');
@@ -54,6 +62,7 @@ export class VoiceSocket {
         this.onAudioCallback = onAudio;
         this.onTranscriptCallback = onTranscript;
         this.onErrorCallback = onError;
+        this.onSessionCreatedCallback = onSessionCreated;
     }
 
     connect(config: any, systemInstruction: string) {
@@ -96,7 +105,10 @@ export class VoiceSocket {
             payload: {
                 session: {
                     systemInstruction: systemInstruction,
-                    maxDuration: 600
+                    maxDuration: 600,
+                    // Lets the relay create the history record and persist the transcript as it goes
+                    scenarioId: config.session?.scenarioId,
+                    roleId: config.session?.roleId
                 },
                 audio: {
                     sampleRate: config.audio?.sampleRate || 16000,
@@ -154,6 +166,11 @@ export class VoiceSocket {
         switch (type) {
             case 'session.created':
                 this.logCallback(`Session Created: ${payload.sessionId}`, 'info', category);
+                this.onSessionCreatedCallback?.({
+                    sessionId: payload.sessionId,
+                    historyId: payload.historyId || null,
+                    recordingId: payload.recordingId || null
+                });
                 break;
 
             case 'audio.output':
@@ -8,6 +8,10 @@ import { Button } from '../../components/ui/Button';
 import { Modal } from '../../components/ui/Modal';
 import { useAuth } from '../../contexts/AuthContext';
 
+// Avatar generation runs as a background job (/api/jobs)
+const JOB_POLL_MS = 2000;
+const JOB_TIMEOUT_MS = 3 * 60 * 1000;
+
 interface RoleEditorModuleProps {
   roleId?: string;
   onBack: () => void;
@@ -215,13 +219,14 @@ Context Data:
 
       addLog(`Sending Image Generation Request (Model: ${selectedModel})...`, 'info', prompt);
 
-      const res = await fetch('/api/models/tools/image-generate', {
+      // Queued as a background job and polled, instead of holding a request open for up to a minute
+      const res = await fetch('/api/jobs', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
         },
-        body: JSON.stringify({ prompt, model: selectedModel })
+        body: JSON.stringify({ kind: 'image-generate', params: { prompt, model: selectedModel } })
       });
 
       if (!res.ok) {
@@ -229,7 +234,22 @@ Context Data:
         throw new Error(errData.detail || `Server Error: ${res.status}`);
       }
 
-      const data = await res.json();
+      let job = await res.json();
+      const deadline = Date.now() + JOB_TIMEOUT_MS;
+      while (job.status === 'queued' || job.status === 'running') {
+        if (Date.now() > deadline) throw new Error('Image generation timed out');
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_MS));
+        const poll = await fetch(`/api/jobs/${job.id}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!poll.ok) throw new Error(`Server Error: ${poll.status}`);
+        job = await poll.json();
+      }
+      if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Job ${job.status}`);
+      }
+
+      const data = job.result || {};
       if (data.image) {
         updateField('avatarImage', data.image);
         addLog('头像生成成功并已保存到角色', 'success');
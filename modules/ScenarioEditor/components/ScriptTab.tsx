@@ -18,6 +18,7 @@ interface ScriptTabProps {
   onFilesChange: (files: AttachedFile[]) => void;
   onGenerate: () => void;
   isGenerating: boolean;
+  streamingText?: string; // Partial model output while generating
   currentPrompt: string;
   onPromptChange: (prompt: string) => void;
   onLog: (msg: string, type: 'info' | 'error' | 'success') => void;
@@ -31,6 +32,7 @@ export const ScriptTab: React.FC<ScriptTabProps> = ({
   onFilesChange,
   onGenerate,
   isGenerating,
+  streamingText = '',
   currentPrompt,
   onPromptChange,
   onLog,
@@ -281,6 +283,13 @@ export const ScriptTab: React.FC<ScriptTabProps> = ({
         </button>
       </div>
 
+      {/* Live generation output */}
+      {isGenerating && streamingText && (
+        <pre className="mt-3 max-h-40 overflow-y-auto p-3 bg-slate-50 border border-slate-200 rounded-lg text-[10px] text-slate-600 leading-relaxed font-mono whitespace-pre-wrap break-words">
+          {streamingText}
+        </pre>
+      )}
+
       {/* Prompt Settings Modal */}
       <Modal
         isOpen={isPromptModalOpen}
@@ -1,5 +1,5 @@
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { ArrowLeft, FileText, Settings as SettingsIcon } from 'lucide-react';
 import { ScriptTab } from './components/ScriptTab';
 import { ConfigTab } from './components/ConfigTab';
@@ -51,6 +51,10 @@ export const ScenarioEditorModule: React.FC<ScenarioEditorModuleProps> = ({ scen
   const [attachedFiles, setAttachedFiles] = useState<AttachedFile[]>([]);
   const [generatedConfig, setGeneratedConfig] = useState<ScenarioConfig>(DEFAULT_CONFIG);
   const [isGenerating, setIsGenerating] = useState(false);
+  const [streamingText, setStreamingText] = useState('');
+  // Aborts the generation stream (and with it the upstream call) when leaving the editor
+  const generationAbort = useRef<AbortController | null>(null);
+  useEffect(() => () => generationAbort.current?.abort(), []);
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [systemPrompt, setSystemPrompt] = useState(DEFAULT_SYSTEM_PROMPT);
 
@@ -143,7 +147,11 @@ export const ScenarioEditorModule: React.FC<ScenarioEditorModuleProps> = ({ scen
       return;
     }
 
+    generationAbort.current?.abort();
+    const abort = new AbortController();
+    generationAbort.current = abort;
     setIsGenerating(true);
+    setStreamingText('');
     setGeneratedConfig(prev => ({ ...prev, description: 'AI 正在分析生成中...' }));
 
     // Determine Model from Settings (Load from API)
@@ -227,7 +235,7 @@ ${scriptContent}
 
       // Call Backend Proxy
       // Note: Backend handles API Key securely
-      const response = await fetch('/api/models/tools/scenario-generate', {
+      const response = await fetch('/api/models/tools/scenario-generate/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -236,16 +244,43 @@ ${scriptContent}
         body: JSON.stringify({
           model: selectedModel,
           contents: contents
-        })
+        }),
+        signal: abort.signal
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errDetail = await response.text();
         throw new Error(`Server Error (${response.status}): ${errDetail}`);
       }
 
-      const data = await response.json();
-      const fullText = data.text; // Backend returns { text: "..." }
+      // Server-sent events: `data: {"text": delta}` frames, then `event: done` / `event: error`
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let fullText = '';
+      let streamError: string | null = null;
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split('\n\n');
+        buffer = frames.pop() || '';
+        for (const frame of frames) {
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (!data) continue;
+          if (event === 'error') {
+            streamError = JSON.parse(data).detail;
+          } else if (!event) {
+            if (!fullText) addLog('开始接收生成内容...', 'info');
+            fullText += JSON.parse(data).text;
+          }
+        }
+        setStreamingText(fullText);
+      }
+      if (streamError) {
+        throw new Error(`Stream Error: ${streamError}`);
+      }
 
       addLog(`生成完成 (共 ${fullText.length} 字符)。开始解析...`, 'info', fullText);
 
@@ -282,9 +317,13 @@ ${scriptContent}
       }
 
     } catch (error: any) {
+      if (error.name === 'AbortError') return; // Editor closed or generation restarted
       addLog(`生成过程异常: ${error.message}`, 'error', error.stack);
     } finally {
-      setIsGenerating(false);
+      if (generationAbort.current === abort) {
+        generationAbort.current = null;
+        setIsGenerating(false);
+      }
     }
   };
 
@@ -383,6 +422,7 @@ ${scriptContent}
             onFilesChange={setAttachedFiles}
             onGenerate={handleGenerate}
             isGenerating={isGenerating}
+            streamingText={streamingText}
             currentPrompt={systemPrompt}
             onPromptChange={setSystemPrompt}
             onLog={(msg, type) => addLog(msg, type)}
@@ -26,17 +26,16 @@ export const VoiceSelector: React.FC<VoiceSelectorProps> = ({ selectedVoice, mod
       setPlayingVoiceId(voiceId);
       setIsPlaying(true);
 
-      const res = await fetch('/api/models/preview', {
-        method: 'POST',
+      // GET so repeat previews come from the browser cache
+      const params = new URLSearchParams({
+        modelId: modelId,
+        voiceId: voiceId,
+        text: "Hello! This is a preview of my voice."
+      });
+      const res = await fetch(`/api/models/preview?${params}`, {
         headers: {
-          'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
         },
-        body: JSON.stringify({
-          modelId: modelId,
-          voiceId: voiceId,
-          text: "Hello! This is a preview of my voice."
-        }),
       });
 
       if (!res.ok) {
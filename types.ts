@@ -83,7 +83,8 @@ export interface AiEvaluationResult {
 }
 
 export interface SessionReportData {
-  id: string; // Unique Session ID
+  id: string; // Unique Session ID (the relay's history record id when it created one)
+  recordingId?: string; // Relay recording to attach when saving
   scenarioId: string;
   roleId: string;
   score: number;